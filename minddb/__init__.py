@@ -5,6 +5,8 @@ import instructor
 CLIENT = None
 ASYNC_CLIENT = None
 MODEL = "claude-3-7-sonnet-latest"
+# Cheaper, faster model for light work such as reviewing triaged notes
+FAST_MODEL = "claude-3-5-haiku-latest"
 
 
 def client():
@@ -17,7 +19,12 @@ def client():
 
     global CLIENT
     if CLIENT is None:
-        CLIENT = instructor.from_anthropic(anthropic.Anthropic())
+        from minddb.llm import ratelimit
+        http_client = anthropic.DefaultHttpxClient(event_hooks={
+            'response': [ratelimit.observe_response]
+        })
+        CLIENT = instructor.from_anthropic(
+            anthropic.Anthropic(http_client=http_client))
 
     return CLIENT, MODEL
 
@@ -31,6 +38,15 @@ def async_client():
     """
     global ASYNC_CLIENT
     if ASYNC_CLIENT is None:
-        ASYNC_CLIENT = instructor.from_anthropic(anthropic.AsyncAnthropic())
+        from minddb.llm import metrics, ratelimit
+        http_client = anthropic.DefaultAsyncHttpxClient(event_hooks={
+            'response': [ratelimit.aobserve_response,
+                         metrics.aobserve_response]
+        })
+        # Transient errors are retried by minddb.llm.retries, within the
+        # process-wide retry budget
+        ASYNC_CLIENT = instructor.from_anthropic(
+            anthropic.AsyncAnthropic(http_client=http_client, max_retries=0))
+        ASYNC_CLIENT.on('parse:error', metrics.on_parse_error)
 
     return ASYNC_CLIENT, MODEL
@@ -3,6 +3,11 @@ import argparse
 import os.path
 import textwrap
 
+# Command line options that set an option of a deck, see DeckEntry
+DECK_OPTIONS = ('catalog', 'catalog_path', 'per_transcript', 'jobs',
+                'pack_tokens', 'chunk_tokens', 'batch_review',
+                'review_group', 'stream', 'triage', 'fan_out', 'resume')
+
 
 def check_catalog_exists(catalog_path, catalog_name):
     if not os.path.exists(catalog_path):
@@ -64,8 +69,64 @@ def get_catalog_props(args, check=False):
     return catalog_path, catalog_name
 
 
+def positive(value):
+    """Parse an option that takes a positive number, e.g. --jobs.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a positive number
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError("expected a positive number")
+    return number
+
+
+def fan_out(value):
+    """Parse the --fan_out option, 'fields' or a number of topics.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is neither
+    """
+    if value == 'fields':
+        return value
+    try:
+        size = int(value)
+    except ValueError:
+        size = 0
+    if size < 1:
+        raise argparse.ArgumentTypeError(
+            "expected 'fields' or a positive number of topics")
+    return size
+
+
+def get_deck_options(args):
+    """Get the deck options set on the command line.
+
+    Options that were not given are left out, so the options of a manifest
+    or the defaults of DeckEntry apply instead.
+
+    Args:
+        args: Namespace object from argparse of the create or watch command
+
+    Returns:
+        dict: Options of DeckEntry
+    """
+    options = {}
+    for name in DECK_OPTIONS:
+        value = getattr(args, name, None)
+        # Flags are False and other options None unless given
+        if value is not None and value is not False:
+            options[name] = value
+    if args.no_dedupe:
+        options['dedupe'] = False
+    return options
+
+
 def add_catalog_args(parser):
-    parser.add_argument('--catalog_path', '-p', default='.',
+    parser.add_argument('--catalog_path', '-p',
                         help='Path to the catalog. Default: current directory')
     help_text = ('Name of the catalog. Default: CamelCase(deck name) if deck '
                  'is provided')
@@ -75,6 +136,18 @@ def add_catalog_args(parser):
 
 
 
+def add_stage_args(parser):
+    parser.add_argument('--stage_config',
+                        help=('TOML file with the model, max_tokens, '
+                              'temperature, concurrency and timeout of the '
+                              'summary, notes and review stages'))
+    parser.add_argument('--set', action='append', default=[],
+                        metavar='STAGE.OPTION=VALUE',
+                        help=('Override a stage option, e.g. '
+                              'review.model=claude-3-5-haiku-latest. '
+                              'Can be repeated'))
+
+
 async def async_main():
     description = ('MindDB automates the creation of Anki flashcards from '
                    'course transcripts.')
@@ -90,8 +163,166 @@ async def async_main():
     create_parser.add_argument('--library', '-l',
                                help='Path to the library of transcripts')
     create_parser.add_argument('--deck', '-d', help='Name of the deck')
+    create_parser.add_argument('--manifest', '-m',
+                               help=('Create the decks listed in this TOML '
+                                     'manifest instead of a single deck. '
+                                     'Flags apply to decks that do not set '
+                                     'the option, over the manifest '
+                                     'defaults'))
+    create_parser.add_argument('--deck_jobs', type=positive, default=2,
+                               help=('Number of manifest decks created in '
+                                     'parallel. Default: 2'))
+    create_parser.add_argument('--per_transcript', action='store_true',
+                               help=('Process each transcript file as its '
+                                     'own job'))
+    create_parser.add_argument('--jobs', '-j', type=positive,
+                               help=('Number of transcripts or packs '
+                                     'processed in parallel with '
+                                     '--per_transcript or --pack_tokens. '
+                                     'Default: 4'))
+    create_parser.add_argument('--pack_tokens', type=int,
+                               help=('Pack the transcript files into '
+                                     'parallel jobs of about this many '
+                                     'input tokens, splitting large files'))
+    create_parser.add_argument('--chunk_tokens', type=int,
+                               help=('Summarize long transcripts in chunks of '
+                                     'about this many tokens'))
+    create_parser.add_argument('--batch_review', action='store_true',
+                               help=('Review the notes with the Message '
+                                     'Batches API'))
+    create_parser.add_argument('--review_group', type=int,
+                               help=('Number of notes reviewed per request, '
+                                     '0 to choose from token budgets. '
+                                     'Default: 1'))
+    create_parser.add_argument('--stream', action='store_true',
+                               help=('Review the notes while they are '
+                                     'generated'))
+    create_parser.add_argument('--fan_out', type=fan_out,
+                               help=('Generate the notes of each topic list '
+                                     '(fields) or of groups of this many '
+                                     'topics in parallel requests'))
+    create_parser.add_argument('--triage',
+                               choices=['full', 'fast', 'skip'],
+                               help=('Review policy for notes that pass the '
+                                     'local checks: full review, review with '
+                                     'the fast model, or skip the review. '
+                                     'Default: full'))
+    create_parser.add_argument('--no_dedupe', action='store_true',
+                               help=('Keep generated questions that are '
+                                     'near-duplicates of each other or of '
+                                     'notes in the deck'))
+    create_parser.add_argument('--hedge', action='store_true',
+                               help=('Send a duplicate of review requests '
+                                     'slower than the recent p95 latency and '
+                                     'keep the first response'))
+    create_parser.add_argument('--no_cache', action='store_true',
+                               help='Do not use cached LLM responses')
+    create_parser.add_argument('--resume', action='store_true',
+                               help=('Resume an interrupted run from its '
+                                     'last completed stage'))
+    create_parser.add_argument('--record',
+                               help=('Append every LLM response to this '
+                                     'cassette file'))
+    create_parser.add_argument('--replay',
+                               help=('Serve LLM responses from this '
+                                     'cassette file instead of the API'))
+    create_parser.add_argument('--replay_latency', type=float, default=0.0,
+                               help=('Factor applied to the recorded '
+                                     'latencies when replaying. Default: 0'))
+    create_parser.add_argument('--replay_error_rate', type=float,
+                               default=0.0,
+                               help=('Share of replayed requests failing '
+                                     'with a timeout. Default: 0'))
+    create_parser.add_argument('--metrics_file',
+                               help=('Write stage metrics to this file in '
+                                     'the OpenMetrics text format'))
+    create_parser.add_argument('--metrics_port', type=int,
+                               help=('Serve stage metrics on this local '
+                                     'port while the deck is created'))
+    add_stage_args(create_parser)
     add_catalog_args(create_parser)
 
+    # Create parser for the "watch" command
+    watch_parser = subparsers.add_parser(
+        'watch', help='Create cards for new or changed transcripts')
+    watch_parser.add_argument('--library', '-l',
+                              help='Path to the library of transcripts')
+    watch_parser.add_argument('--deck', '-d', help='Name of the deck')
+    watch_parser.add_argument('--manifest', '-m',
+                              help=('Watch the libraries of the decks listed '
+                                    'in this TOML manifest'))
+    watch_parser.add_argument('--deck_jobs', type=positive, default=2,
+                              help=('Number of decks processed in parallel. '
+                                    'Default: 2'))
+    watch_parser.add_argument('--debounce', type=float, default=5.0,
+                              help=('Seconds a file has to stay unchanged '
+                                    'before it is processed. Default: 5'))
+    watch_parser.add_argument('--poll_interval', type=float, default=10.0,
+                              help=('Seconds between two scans when inotify '
+                                    'is not available. Default: 10'))
+    watch_parser.add_argument('--polling', action='store_true',
+                              help='Poll even if inotify is available')
+    watch_parser.add_argument('--per_transcript', action='store_true',
+                              help='Process each transcript as its own job')
+    watch_parser.add_argument('--jobs', '-j', type=positive,
+                              help='Number of parallel jobs. Default: 4')
+    watch_parser.add_argument('--triage',
+                              choices=['full', 'fast', 'skip'],
+                              help='Review policy. Default: full')
+    watch_parser.add_argument('--no_dedupe', action='store_true',
+                              help='Keep near-duplicate questions')
+    add_stage_args(watch_parser)
+    add_catalog_args(watch_parser)
+
+    # Create parser for the "bench" command
+    bench_parser = subparsers.add_parser(
+        'bench', help='Benchmark deck creation with a simulated LLM')
+    bench_parser.add_argument('--transcripts', type=int, default=10,
+                              help='Transcripts per deck. Default: 10')
+    bench_parser.add_argument('--decks', type=int, default=1,
+                              help='Number of decks created. Default: 1')
+    bench_parser.add_argument('--transcript_tokens', type=int, default=4000,
+                              help=('Approximate tokens per transcript. '
+                                    'Default: 4000'))
+    bench_parser.add_argument('--latency', type=float, default=1.0,
+                              help=('Median latency of the simulated LLM in '
+                                    'seconds. Default: 1.0'))
+    bench_parser.add_argument('--latency_sigma', type=float, default=0.5,
+                              help=('Spread of the log-normal latency. '
+                                    'Default: 0.5'))
+    bench_parser.add_argument('--requests_per_minute', type=int,
+                              help='Simulated request rate limit')
+    bench_parser.add_argument('--time_scale', type=float, default=1.0,
+                              help=('Factor applied to the simulated '
+                                    'latencies and rate limit window. '
+                                    'Default: 1.0'))
+    bench_parser.add_argument('--seed', type=int, default=0,
+                              help='Seed of the simulation. Default: 0')
+    bench_parser.add_argument('--output', '-o',
+                              help='Save the results to this JSON file')
+    bench_parser.add_argument('--per_transcript', action='store_true',
+                              help='Process each transcript as its own job')
+    bench_parser.add_argument('--jobs', '-j', type=positive, default=4,
+                              help='Number of parallel jobs. Default: 4')
+    bench_parser.add_argument('--pack_tokens', type=int,
+                              help='Pack the transcripts into parallel jobs')
+    bench_parser.add_argument('--review_group', type=int, default=1,
+                              help=('Number of notes reviewed per request. '
+                                    'Default: 1'))
+    bench_parser.add_argument('--stream', action='store_true',
+                              help='Review the notes while they are generated')
+    bench_parser.add_argument('--fan_out', type=fan_out,
+                              help=('Generate the notes of topic groups in '
+                                    'parallel requests'))
+    bench_parser.add_argument('--triage', default='full',
+                              choices=['full', 'fast', 'skip'],
+                              help='Review policy. Default: full')
+    bench_parser.add_argument('--hedge', action='store_true',
+                              help='Hedge slow review requests')
+    bench_parser.add_argument('--verbose', '-v', action='store_true',
+                              help='Verbose output')
+    add_stage_args(bench_parser)
+
     # Create parser for the "notes" command
     notes_parser = subparsers.add_parser('notes', help='List notes')
     notes_parser.add_argument('--deck', '-d', help='Name of the deck')
@@ -108,6 +339,19 @@ async def async_main():
                                help='Name of the deck to delete')
     add_catalog_args(delete_parser)
 
+    # Create parser for the "cache" command
+    cache_parser = subparsers.add_parser(
+        'cache', help='Inspect and prune the LLM response cache')
+    cache_parser.add_argument('--max_entries', type=int,
+                              help='Keep at most this many entries')
+    cache_parser.add_argument('--max_size', type=int,
+                              help='Keep at most this many bytes')
+    cache_parser.add_argument('--older_than', type=int,
+                              help='Remove entries unused for this many days')
+    cache_parser.add_argument('--clear', action='store_true',
+                              help='Remove all entries')
+    add_catalog_args(cache_parser)
+
     args = parser.parse_args()
 
     if not args.command:
@@ -119,24 +363,115 @@ async def async_main():
     else:
         logging.basicConfig(level=logging.INFO)
 
+    if args.command in ('create', 'watch', 'bench'):
+        import minddb.llm.stages
+
+        try:
+            minddb.llm.stages.set_config(minddb.llm.stages.load(
+                args.stage_config, args.set))
+        except (OSError, ValueError) as e:
+            print(f'Invalid stage configuration: {e}')
+            exit(1)
+
     if args.command == 'create':
-        if args.library is None:
+        if args.manifest is None and args.library is None:
             print('Please provide a library of transcripts\n')
             create_parser.print_help()
             exit(1)
-        if args.deck is None:
+        if args.manifest is None and args.deck is None:
             print('Please provide a name for the deck\n')
             notes_parser.print_help()
             exit(1)
 
+        import minddb.llm.backends
+        import minddb.llm.cache
+        import minddb.llm.latency
+        import minddb.llm.metrics
         import minddb.mindnote
         import minddb.storage
 
-        minddb.storage.setup(*get_catalog_props(args, check=False))
-        processor = minddb.mindnote.Processor(args.library)
-        await processor.create(args.deck)
+        minddb.llm.cache.ENABLED = not args.no_cache
+        minddb.llm.latency.HEDGING = args.hedge
+        if args.replay:
+            minddb.llm.backends.set_backend(minddb.llm.backends.Replay(
+                args.replay, latency_scale=args.replay_latency,
+                error_rate=args.replay_error_rate))
+        elif args.record:
+            minddb.llm.backends.set_backend(
+                minddb.llm.backends.Recorder(args.record))
+        server = None
+        if args.metrics_port is not None:
+            server = minddb.llm.metrics.serve(args.metrics_port)
+
+        import minddb.mindnote.manifest
+
+        options = get_deck_options(args)
+        if args.manifest is not None:
+            entries = minddb.mindnote.manifest.load(args.manifest, options)
+            for entry in entries:
+                entry.catalog_path, entry.catalog = get_catalog_props(entry)
+            try:
+                await minddb.mindnote.manifest.create_all(
+                    entries, max_decks=args.deck_jobs)
+            finally:
+                if args.metrics_file:
+                    minddb.llm.metrics.write(args.metrics_file)
+                if server is not None:
+                    server.shutdown()
+            return
+
+        entry = minddb.mindnote.manifest.DeckEntry(
+            library=args.library, deck=args.deck, **options)
+        minddb.storage.setup(*get_catalog_props(entry, check=False))
+        processor = minddb.mindnote.Processor(entry.library)
+        try:
+            await processor.create(entry.deck, **entry.options())
+        finally:
+            minddb.storage.close_catalog()
+            if args.metrics_file:
+                minddb.llm.metrics.write(args.metrics_file)
+            if server is not None:
+                server.shutdown()
+
+    if args.command == 'watch':
+        if args.manifest is None and (args.library is None
+                                      or args.deck is None):
+            print('Please provide a library and a deck, or a manifest\n')
+            watch_parser.print_help()
+            exit(1)
 
-        minddb.storage.close_catalog()
+        import minddb.mindnote.manifest
+        import minddb.mindnote.watch
+
+        options = get_deck_options(args)
+        if args.manifest is not None:
+            entries = minddb.mindnote.manifest.load(args.manifest, options)
+        else:
+            entries = [minddb.mindnote.manifest.DeckEntry(
+                library=args.library, deck=args.deck, **options)]
+        for entry in entries:
+            entry.catalog_path, entry.catalog = get_catalog_props(entry)
+        await minddb.mindnote.watch.watch(
+            entries, max_decks=args.deck_jobs, debounce=args.debounce,
+            poll_interval=args.poll_interval, polling=args.polling or None)
+
+    if args.command == 'bench':
+        import json
+
+        import minddb.mindnote.benchmark
+
+        result = await minddb.mindnote.benchmark.run(
+            transcripts=args.transcripts, decks=args.decks,
+            transcript_tokens=args.transcript_tokens, latency=args.latency,
+            latency_sigma=args.latency_sigma,
+            requests_per_minute=args.requests_per_minute,
+            time_scale=args.time_scale, seed=args.seed, hedge=args.hedge,
+            per_transcript=args.per_transcript, max_jobs=args.jobs,
+            pack_tokens=args.pack_tokens, review_group=args.review_group,
+            stream=args.stream, triage=args.triage, fan_out=args.fan_out)
+        if args.output:
+            minddb.mindnote.benchmark.save(result, args.output)
+        print(json.dumps(result['results'], indent=2))
 
     if args.command == 'delete_deck':
         import minddb.storage
@@ -220,6 +555,39 @@ async def async_main():
 
         minddb.storage.close_catalog()
 
+    if args.command == 'cache':
+        if args.catalog is None:
+            print('Please provide a name for the catalog\n')
+            cache_parser.print_help()
+            exit(1)
+
+        import minddb.storage
+
+        minddb.storage.setup(*get_catalog_props(args, check=True))
+        catalog = minddb.storage.get_catalog()
+
+        prune = (args.max_entries, args.max_size, args.older_than)
+        if args.clear or any(value is not None for value in prune):
+            removed = catalog.prune_cache(max_entries=args.max_entries,
+                                          max_size=args.max_size,
+                                          older_than_days=args.older_than)
+            print(f'Removed {removed} cache entries\n')
+
+        stats = catalog.get_cache_stats()
+        print(f'{"Response model":<24}{"Entries":>10}{"Size":>14}'
+              f'{"Hits":>10}  Last used')
+        print('-' * 80)
+        for row in stats:
+            print(f'{row["response_model"]:<24}{row["entries"]:>10}'
+                  f'{row["size"]:>14}{row["hits"]:>10}  '
+                  f'{row["last_accessed"]:%Y-%m-%d %H:%M}')
+        print('-' * 80)
+        print(f'{"Total":<24}{sum(r["entries"] for r in stats):>10}'
+              f'{sum(r["size"] for r in stats):>14}'
+              f'{sum(r["hits"] for r in stats):>10}')
+
+        minddb.storage.close_catalog()
+
 
 def main():
     import asyncio
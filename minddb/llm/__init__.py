@@ -0,0 +1,5 @@
+from .ratelimit import RateLimiter, TokenBucket, get_rate_limiter
+from .calls import acreate, astream
+
+__all__ = ['RateLimiter', 'TokenBucket', 'get_rate_limiter', 'acreate',
+           'astream']
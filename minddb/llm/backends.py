@@ -0,0 +1,326 @@
+import abc
+import asyncio
+import collections
+import json
+import logging
+import math
+import random
+import threading
+import time
+
+from .ratelimit import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Backend of the structured LLM calls, None for live requests only
+_backend = None
+
+
+class Backend(abc.ABC):
+    """Backend of the structured LLM calls, see set_backend.
+
+    Live backends let the calls send their requests to the API and are
+    handed every response. Local backends serve the requests themselves.
+    """
+    replaying = False
+
+    @abc.abstractmethod
+    def record(self, key, response, latency):
+        """Record the response of a request.
+
+        Args:
+            key: Cache key of the request
+            response: Pydantic model instance returned for the request
+            latency: Seconds the request took
+        """
+
+
+class LocalBackend(Backend):
+    """Serves the requests of the structured LLM calls without the API.
+
+    The calls still wait for the rate limiter and record their metrics and
+    latencies, but bypass the response cache, so every request reaches the
+    backend.
+    """
+    replaying = True
+
+    def record(self, key, response, latency):
+        """Ignore a response, local responses are not recorded."""
+
+    @abc.abstractmethod
+    async def respond(self, key, response_model, context=None, model=None):
+        """Serve the response of a request without calling the API.
+
+        Args:
+            key: Cache key of the request
+            response_model: Pydantic model the response is validated against
+            context: Template variables of the request (optional)
+            model: Model the request is sent to (optional)
+
+        Returns:
+            BaseModel: Instance of response_model
+        """
+
+    @abc.abstractmethod
+    def stream(self, key, items_model, context=None, model=None):
+        """Serve the items of a streamed request without calling the API.
+
+        Args:
+            key: Cache key of the request
+            items_model: RootModel of the list of items
+            context: Template variables of the request (optional)
+            model: Model the request is sent to (optional)
+
+        Returns:
+            AsyncIterator: Items of the response
+        """
+
+
+class Recorder(Backend):
+    """Sends requests to the API and appends every response to a cassette.
+
+    The cassette is a JSON lines file with one response per line. Requests
+    are only identified by their cache key, the SHA-256 digest of the
+    request, so a cassette is replayed by the code that recorded it.
+    """
+    def __init__(self, path):
+        """Initialize the recorder.
+
+        Args:
+            path: Path of the cassette file, appended to if it exists
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, key, response, latency):
+        entry = {
+            'key': key,
+            'response_model': type(response).__name__,
+            'response': response.model_dump_json(),
+            'latency': latency,
+        }
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+class Replay(LocalBackend):
+    """Serves the responses of a cassette instead of calling the API.
+
+    Recorded latencies can be replayed, scaled, and timeouts can be
+    injected to reproduce slow or failing runs offline.
+    """
+
+    def __init__(self, path, latency_scale=0.0, error_rate=0.0, seed=None):
+        """Initialize the replay backend.
+
+        Args:
+            path: Path of the cassette file
+            latency_scale: Factor applied to the recorded latencies, 0 to
+                           respond immediately (default: 0.0)
+            error_rate: Share of requests failing with a timeout after
+                        their latency (default: 0.0)
+            seed: Seed of the error injection (optional)
+
+        Raises:
+            FileNotFoundError: If the cassette does not exist
+        """
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._entries = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry['key']] = entry
+        logger.info(f"Loaded {len(self._entries)} recorded responses from "
+                    f"{path}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def respond(self, key, response_model, context=None, model=None):
+        """Serve the recorded response of a request.
+
+        Raises:
+            KeyError: If the request was not recorded
+            asyncio.TimeoutError: If an error is injected
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            raise KeyError(f"No recorded response for request {key}")
+
+        delay = entry['latency'] * self.latency_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise asyncio.TimeoutError(f"Injected error for request {key}")
+        return response_model.model_validate_json(entry['response'])
+
+    async def stream(self, key, items_model, context=None, model=None):
+        """Serve the recorded items of a streamed request one by one.
+
+        The recorded latency is spread evenly over the items.
+
+        Raises:
+            KeyError: If the request was not recorded
+            asyncio.TimeoutError: If an error is injected
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            raise KeyError(f"No recorded response for request {key}")
+
+        items = items_model.model_validate_json(entry['response']).root
+        delay = entry['latency'] * self.latency_scale / max(1, len(items))
+        fail = self.error_rate and self._random.random() < self.error_rate
+        for i, item in enumerate(items):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if fail and i == len(items) // 2:
+                raise asyncio.TimeoutError(
+                    f"Injected error for request {key}")
+            yield item
+
+
+class RateLimited(Exception):
+    """Rate limit error of the fake backend, an overload like a 429."""
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limited, retry after {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+def lognormal(median, sigma=0.5):
+    """Create a sampler of log-normally distributed latencies.
+
+    Args:
+        median: Median latency in seconds
+        sigma: Standard deviation of the log latency (default: 0.5)
+
+    Returns:
+        function: Sampler taking a random.Random and returning seconds
+    """
+    def sample(rng):
+        return median * math.exp(rng.gauss(0, sigma)) if median else 0.0
+    return sample
+
+
+class FakeBackend(LocalBackend):
+    """Generates responses locally, with simulated latency and rate limits.
+
+    Requests above the rate limit wait for the retry-after time and are
+    retried like the API client does, failing once the retries are used up.
+    Rate limit headers are fed to the shared rate limiter, so it learns the
+    limits as it would from the API.
+    """
+    def __init__(self, respond, latency=None, requests_per_minute=None,
+                 max_retries=2, time_scale=1.0, seed=None):
+        """Initialize the fake backend.
+
+        Args:
+            respond: Function taking the response model and the template
+                     variables of a request and returning the response
+            latency: Sampler of the latency per request in seconds, see
+                     lognormal (default: no latency)
+            requests_per_minute: Simulated request limit (default: none)
+            max_retries: Retries of rate limited requests (default: 2)
+            time_scale: Factor applied to latencies and the rate limit
+                        window, e.g. 0.01 to run 100 times faster
+                        (default: 1.0)
+            seed: Seed of the latency samples (optional)
+        """
+        self._respond = respond
+        self._latency = latency or lognormal(0)
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.time_scale = time_scale
+        self._random = random.Random(seed)
+        # Send times per model, as the API limits each model separately
+        self._sent = collections.defaultdict(collections.deque)
+
+    def _admit(self, model=None):
+        """Take a slot of the rate limit window of a model.
+
+        Args:
+            model: Model the request is sent to (optional)
+
+        Returns:
+            float: 0 if admitted, else seconds until a slot frees up
+        """
+        if not self.requests_per_minute:
+            return 0.0
+        window = 60 * self.time_scale
+        now = time.monotonic()
+        sent = self._sent[model]
+        while sent and sent[0] <= now - window:
+            sent.popleft()
+
+        # Limits are reported per real minute, like the API does
+        headers = {
+            'anthropic-ratelimit-requests-limit':
+                str(int(self.requests_per_minute / self.time_scale)),
+            'anthropic-ratelimit-requests-remaining':
+                str(max(0, int((self.requests_per_minute - len(sent))
+                               / self.time_scale))),
+        }
+        if len(sent) >= self.requests_per_minute:
+            retry_after = sent[0] + window - now
+            headers['retry-after'] = f'{retry_after:.3f}'
+            _observe(headers, model)
+            return retry_after
+
+        sent.append(now)
+        _observe(headers, model)
+        return 0.0
+
+    async def _call(self, model=None):
+        """Wait for the rate limit and the simulated latency of a request."""
+        for attempt in range(self.max_retries + 1):
+            retry_after = self._admit(model)
+            if not retry_after:
+                break
+            if attempt == self.max_retries:
+                raise RateLimited(retry_after)
+            await asyncio.sleep(retry_after)
+
+        delay = self._latency(self._random) * self.time_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def respond(self, key, response_model, context=None, model=None):
+        await self._call(model)
+        return self._respond(response_model, context or {})
+
+    async def stream(self, key, items_model, context=None, model=None):
+        await self._call(model)
+        items = self._respond(items_model, context or {}).root
+        for item in items:
+            # Let consumers work on each item before the next arrives
+            await asyncio.sleep(0)
+            yield item
+
+
+def _observe(headers, model=None):
+    """Feed rate limit headers of the fake backend to the rate limiter of
+    the model."""
+    get_rate_limiter(model).update_from_headers(headers)
+
+
+def get_backend():
+    """Get the configured backend.
+
+    Returns:
+        Backend: Configured backend, None for live requests only
+    """
+    return _backend
+
+
+def set_backend(backend):
+    """Configure the backend of the structured LLM calls.
+
+    Args:
+        backend: Recorder, Replay or None for live requests only
+    """
+    global _backend
+    _backend = backend
@@ -0,0 +1,179 @@
+import asyncio
+import itertools
+import logging
+from types import SimpleNamespace
+
+from pydantic import ValidationError
+
+import minddb
+from . import cache, metrics, stages, usage
+from .backends import get_backend
+from .messages import render
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two status checks of a running batch
+POLL_INTERVAL = 60
+
+
+def _tool(response_model):
+    return {
+        'name': response_model.__name__,
+        'description': f'Respond with a {response_model.__name__}',
+        'input_schema': response_model.model_json_schema(),
+    }
+
+
+def _parse(result, response_model):
+    """Validate the tool call of a succeeded batch result."""
+    if result.type != 'succeeded':
+        logger.warning(f"Batch request {result.type}")
+        return None
+
+    for block in result.message.content:
+        if block.type == 'tool_use':
+            try:
+                return response_model.model_validate(block.input)
+            except ValidationError as e:
+                logger.warning(f"Invalid batch response: {e}")
+                return None
+    return None
+
+
+async def create_batch(response_model, requests, max_tokens, batches=None,
+                       poll_interval=None, stage='default', model=None,
+                       temperature=None):
+    """Run structured requests as one Message Batches job.
+
+    Responses already in the response cache are not submitted again and new
+    responses are added to it.
+
+    Args:
+        response_model: Pydantic model the responses are validated against
+        requests: List of (messages, context) tuples
+        max_tokens: Maximum number of output tokens per request
+        batches: Message Batches API (default: the async anthropic client's
+                 messages.batches, see FakeBatches for offline use)
+        poll_interval: Seconds between two status checks (default:
+                       POLL_INTERVAL)
+        stage: Pipeline stage the token usage is reported for
+        model: Model to use instead of the model of the stage (optional)
+        temperature: Sampling temperature instead of the temperature of the
+                     stage (optional)
+
+    Returns:
+        list: Response for each request, None for failed requests
+    """
+    client, default_model = minddb.async_client()
+    model, options = stages.resolve(stage, model, temperature,
+                                    default_model)
+    if batches is None:
+        batches = client.client.messages.batches
+
+    backend = get_backend()
+    if backend is not None and backend.replaying:
+        return [await backend.respond(
+                    cache.cache_key(model, messages, context, response_model,
+                                    options),
+                    response_model, context, model=model)
+                for messages, context in requests]
+
+    responses = [None] * len(requests)
+    keys = []
+    pending = []
+    for i, (messages, context) in enumerate(requests):
+        key = cache.cache_key(model, messages, context, response_model,
+                              options)
+        keys.append(key)
+        responses[i] = cache.get(key, response_model)
+        if responses[i] is not None and backend is not None:
+            backend.record(key, responses[i], 0.0)
+        if responses[i] is None:
+            pending.append({
+                'custom_id': f'request-{i}',
+                'params': {
+                    'model': model,
+                    'max_tokens': max_tokens,
+                    'messages': render(messages, context),
+                    'tools': [_tool(response_model)],
+                    'tool_choice': {'type': 'tool',
+                                    'name': response_model.__name__},
+                    **options,
+                },
+            })
+
+    if not pending:
+        return responses
+
+    if poll_interval is None:
+        poll_interval = POLL_INTERVAL
+
+    batch = await batches.create(requests=pending)
+    logger.info(f"Submitted batch {batch.id} with {len(pending)} requests")
+    while batch.processing_status != 'ended':
+        await asyncio.sleep(poll_interval)
+        batch = await batches.retrieve(batch.id)
+        logger.debug(f"Batch {batch.id}: {batch.processing_status}")
+
+    async for entry in await batches.results(batch.id):
+        i = int(entry.custom_id.split('-')[1])
+        if entry.result.type == 'succeeded':
+            usage.record(stage,
+                         getattr(entry.result.message, 'usage', None))
+        responses[i] = _parse(entry.result, response_model)
+        metrics.inc('minddb_calls', stage=stage,
+                    outcome='error' if responses[i] is None else 'ok')
+        if responses[i] is not None:
+            cache.put(keys[i], model, responses[i])
+            if backend is not None:
+                backend.record(keys[i], responses[i], 0.0)
+
+    return responses
+
+
+class FakeBatches:
+    """Local stand-in for the Message Batches API.
+
+    Answers each request with the tool input returned by a responder
+    function, so batch mode can be run and tested offline.
+    """
+    def __init__(self, respond, polls=1):
+        """Initialize the fake endpoint.
+
+        Args:
+            respond: Function mapping the params of a request to the tool
+                     input dict, or None to let the request error
+            polls: Number of status checks before a batch has ended
+                   (default: 1)
+        """
+        self._respond = respond
+        self._polls = polls
+        self._batches = {}
+        self._ids = itertools.count(1)
+
+    async def create(self, requests):
+        batch_id = f'msgbatch_fake_{next(self._ids)}'
+        self._batches[batch_id] = {'requests': list(requests), 'polls': 0}
+        return SimpleNamespace(id=batch_id, processing_status='in_progress')
+
+    async def retrieve(self, batch_id):
+        batch = self._batches[batch_id]
+        batch['polls'] += 1
+        status = 'ended' if batch['polls'] >= self._polls else 'in_progress'
+        return SimpleNamespace(id=batch_id, processing_status=status)
+
+    async def results(self, batch_id):
+        async def entries():
+            for request in self._batches[batch_id]['requests']:
+                tool_input = self._respond(request['params'])
+                if tool_input is None:
+                    result = SimpleNamespace(type='errored')
+                else:
+                    block = SimpleNamespace(type='tool_use',
+                                            input=tool_input)
+                    result = SimpleNamespace(
+                        type='succeeded',
+                        message=SimpleNamespace(content=[block]))
+                yield SimpleNamespace(custom_id=request['custom_id'],
+                                      result=result)
+        return entries()
@@ -0,0 +1,119 @@
+import hashlib
+import itertools
+import json
+import logging
+
+from pydantic import BaseModel
+
+import minddb.storage
+
+logger = logging.getLogger(__name__)
+
+# Set to False to bypass the response cache, e.g. with minddb create
+# --no_cache
+ENABLED = True
+
+# Least recently used entries above this number are evicted on insert
+MAX_ENTRIES = 10000
+
+# Inserts between evictions, the cache may exceed MAX_ENTRIES by as many
+PRUNE_INTERVAL = 100
+
+# Responses stored by this process, the first insert evicts too
+_inserts = itertools.count()
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    return str(value)
+
+
+def cache_key(model, messages, context, response_model, options=None):
+    """Get the content address of a structured request.
+
+    The key covers everything that determines the response: the model, the
+    prompt templates, the context they are rendered with, the schema of
+    the response model and the sampling options.
+
+    Args:
+        model: Name of the model
+        messages: List of chat messages (may contain jinja templates)
+        context: Template variables for the messages
+        response_model: Pydantic model the response is validated against
+        options: Sampling options of the request, e.g. temperature
+                 (optional)
+
+    Returns:
+        str: SHA-256 hex digest of the request
+    """
+    request = {
+        'model': model,
+        'messages': messages,
+        'context': context or {},
+        'schema': response_model.model_json_schema(),
+    }
+    # Requests without options keep the keys they were cached under
+    if options:
+        request['options'] = options
+    payload = json.dumps(request, sort_keys=True, default=_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _get_catalog():
+    if not ENABLED:
+        return None
+    try:
+        return minddb.storage.get_catalog()
+    except RuntimeError:
+        return None
+
+
+def get(key, response_model):
+    """Look up a cached response.
+
+    Args:
+        key: Cache key of the request
+        response_model: Pydantic model to validate the cached response with
+
+    Returns:
+        BaseModel: Cached response, None on a cache miss or if the cache is
+                   disabled or no catalog is configured
+    """
+    catalog = _get_catalog()
+    if catalog is None:
+        return None
+
+    cached = catalog.get_cached_response(key)
+    if cached is None:
+        return None
+
+    try:
+        response = response_model.model_validate_json(cached.response)
+    except ValueError:
+        logger.warning(f"Ignoring invalid cache entry {key}")
+        return None
+
+    logger.debug(f"Cache hit for {response_model.__name__} ({key[:12]})")
+    return response
+
+
+def put(key, model, response):
+    """Store a validated response in the cache.
+
+    Least recently used entries are evicted every PRUNE_INTERVAL inserts.
+
+    Args:
+        key: Cache key of the request
+        model: Name of the model that produced the response
+        response: Validated response (pydantic model instance)
+    """
+    catalog = _get_catalog()
+    if catalog is None:
+        return
+
+    prune = next(_inserts) % PRUNE_INTERVAL == 0
+    catalog.insert_cached_response(
+        key, model, type(response).__name__, response.model_dump_json(),
+        max_entries=MAX_ENTRIES if prune else None
+    )
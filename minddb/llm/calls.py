@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import RootModel
+
+import minddb
+import minddb.tools
+from . import cache, latency, metrics, retries, stages, usage
+from .backends import get_backend
+from .messages import render
+from .ratelimit import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+def _estimate_input(messages):
+    """Estimate the input tokens of rendered messages."""
+    text = ''
+    for message in messages:
+        content = message['content']
+        if isinstance(content, str):
+            text += content
+        else:
+            text += ''.join(block.get('text', '') for block in content)
+    return minddb.tools.estimate_tokens(text)
+
+
+def _estimated_usage(responses):
+    """Estimate the usage of responses that carry none."""
+    output_tokens = sum(minddb.tools.estimate_tokens(r.model_dump_json())
+                        for r in responses)
+    return SimpleNamespace(input_tokens=None, output_tokens=output_tokens)
+
+
+def _record(stage, limiter, estimate, max_tokens, completion):
+    """Settle the rate limiter and record the token usage of a response."""
+    response_usage = getattr(completion, 'usage', None)
+    limiter.settle(estimate, max_tokens, response_usage)
+    usage.record(stage, response_usage)
+
+
+@contextmanager
+def _attempt(stage, start, limiter, estimate, max_tokens):
+    """Record the metrics of an attempt of a call.
+
+    A failed attempt returns its rate limiter reservation, so its retry
+    does not wait for budget that was never used. Its timeout is recorded
+    as a latency.
+    """
+    try:
+        with metrics.timed(stage):
+            yield
+    except Exception as e:
+        limiter.refund(estimate, max_tokens)
+        if isinstance(e, asyncio.TimeoutError):
+            # Only counting answered calls would keep the timeout below the
+            # latency for good once the API slows down
+            latency.observe_timeout(stage, time.monotonic() - start)
+        raise
+
+
+async def acreate(response_model, messages, max_tokens, context=None,
+                  max_retries=2, timeout=None, stage='default', model=None,
+                  temperature=None, on_retry=None):
+    """Send a structured request through the response cache and the shared
+    rate limiter using the async client.
+
+    Transient errors are retried while the retry budget allows, and the
+    request waits while the circuit breaker is open.
+
+    Args:
+        response_model: Pydantic model the response is validated against
+        messages: List of chat messages (may contain jinja templates)
+        max_tokens: Maximum number of output tokens
+        context: Template variables for the messages (optional)
+        max_retries: Number of validation retries, drawn from the retry
+                     budget (default: 2)
+        timeout: Seconds to wait for the response, not counting the time
+                 spent waiting for the rate limiter (optional)
+        stage: Pipeline stage the token usage is reported for
+        model: Model to use instead of the model of the stage (optional)
+        temperature: Sampling temperature instead of the temperature of the
+                     stage (optional)
+        on_retry: Function called with the error of each attempt that is
+                  retried, e.g. AdaptiveLimiter.on_error (optional)
+
+    Returns:
+        BaseModel: Instance of response_model
+
+    Raises:
+        asyncio.TimeoutError: If the response took longer than timeout
+    """
+    client, default_model = minddb.async_client()
+    model, options = stages.resolve(stage, model, temperature,
+                                    default_model)
+    key = cache.cache_key(model, messages, context, response_model, options)
+    backend = get_backend()
+    replaying = backend is not None and backend.replaying
+    if not replaying:
+        response = cache.get(key, response_model)
+        if response is not None:
+            if backend is not None:
+                backend.record(key, response, 0.0)
+            return response
+
+    limiter = get_rate_limiter(model)
+    rendered = render(messages, context)
+    estimate = _estimate_input(rendered)
+
+    async def send():
+        await limiter.acquire(estimate, max_tokens)
+        start = time.monotonic()
+        if replaying:
+            with _attempt(stage, start, limiter, estimate, max_tokens):
+                response = await asyncio.wait_for(
+                    backend.respond(key, response_model, context,
+                                    model=model),
+                    timeout=timeout)
+            latency.observe(stage, time.monotonic() - start)
+            limiter.settle(estimate, max_tokens,
+                           _estimated_usage([response]))
+            return response
+
+        coro = client.messages.create_with_completion(
+            model=model,
+            max_tokens=max_tokens,
+            messages=rendered,
+            response_model=response_model,
+            max_retries=retries.validation_retries(max_retries),
+            **options,
+        )
+        with _attempt(stage, start, limiter, estimate, max_tokens):
+            response, completion = await asyncio.wait_for(coro,
+                                                          timeout=timeout)
+        latency.observe(stage, time.monotonic() - start)
+        _record(stage, limiter, estimate, max_tokens, completion)
+        cache.put(key, model, response)
+        if backend is not None:
+            backend.record(key, response, time.monotonic() - start)
+        return response
+
+    return await retries.call(send, stage, on_retry=on_retry)
+
+
+async def astream(response_model, messages, max_tokens, context=None,
+                  max_retries=2, timeout=None, stage='default', model=None,
+                  temperature=None):
+    """Stream a list of structured items, yielding each one once complete.
+
+    The complete list is cached, so a cache hit yields all items at once.
+
+    Args:
+        response_model: Pydantic model each item is validated against
+        messages: List of chat messages (may contain jinja templates)
+        max_tokens: Maximum number of output tokens
+        context: Template variables for the messages (optional)
+        max_retries: Number of validation retries (default: 2)
+        timeout: Seconds to wait for the next item (optional)
+        stage: Pipeline stage the token usage is reported for
+        model: Model to use instead of the model of the stage (optional)
+        temperature: Sampling temperature instead of the temperature of the
+                     stage (optional)
+
+    Yields:
+        BaseModel: Instances of response_model
+
+    Raises:
+        asyncio.TimeoutError: If no item arrived within timeout
+    """
+    client, default_model = minddb.async_client()
+    model, options = stages.resolve(stage, model, temperature,
+                                    default_model)
+    items_model = RootModel[List[response_model]]
+    key = cache.cache_key(model, messages, context, items_model, options)
+    backend = get_backend()
+    replaying = backend is not None and backend.replaying
+    if not replaying:
+        cached_items = cache.get(key, items_model)
+        if cached_items is not None:
+            if backend is not None:
+                backend.record(key, cached_items, 0.0)
+            for item in cached_items.root:
+                yield item
+            return
+
+    limiter = get_rate_limiter(model)
+    rendered = render(messages, context)
+    estimate = _estimate_input(rendered)
+
+    breaker = retries.get_circuit_breaker()
+    attempt = 0
+    while True:
+        probe = await breaker.acquire()
+        await limiter.acquire(estimate, max_tokens)
+        items = []
+        start = time.monotonic()
+        if replaying:
+            stream = backend.stream(key, items_model, context, model=model)
+        else:
+            stream = client.messages.create_iterable(
+                model=model,
+                max_tokens=max_tokens,
+                messages=rendered,
+                response_model=response_model,
+                max_retries=retries.validation_retries(max_retries),
+                **options,
+            )
+        try:
+            with metrics.timed(stage):
+                while True:
+                    try:
+                        item = await asyncio.wait_for(anext(stream),
+                                                      timeout=timeout)
+                    except StopAsyncIteration:
+                        break
+                    items.append(item)
+                    yield item
+        except Exception as e:
+            breaker.record(e, probe)
+            if items:
+                limiter.settle(estimate, max_tokens, _estimated_usage(items))
+            else:
+                limiter.refund(estimate, max_tokens)
+            # Items already yielded cannot be taken back
+            if items or attempt >= retries.MAX_RETRIES \
+                    or not retries.is_transient(e) \
+                    or not retries.get_retry_budget().withdraw():
+                raise
+            attempt += 1
+            metrics.inc('minddb_retries', stage=stage, reason='error')
+            logger.info(f"Retrying {stage} stream after error: {e}")
+            await asyncio.sleep(retries.backoff(attempt))
+            continue
+        except BaseException:
+            breaker.release(probe)
+            raise
+        finally:
+            await stream.aclose()
+        breaker.record(probe=probe)
+        retries.get_retry_budget().deposit()
+        break
+
+    # Streams carry no usage, so settle with the estimated output instead
+    limiter.settle(estimate, max_tokens, _estimated_usage(items))
+    if replaying:
+        return
+    cache.put(key, model, items_model(items))
+    if backend is not None:
+        backend.record(key, items_model(items), time.monotonic() - start)
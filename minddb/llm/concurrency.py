@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import anthropic
+from tqdm.asyncio import tqdm_asyncio
+
+logger = logging.getLogger(__name__)
+
+# Status codes signalling that the API is rate limiting or overloaded
+OVERLOAD_STATUS_CODES = (429, 529)
+
+
+def is_overload(exc):
+    """Check if an exception signals that we are sending too much load.
+
+    Args:
+        exc: Exception raised by an LLM call
+
+    Returns:
+        bool: True for 429/529 responses and timeouts, False otherwise
+    """
+    if isinstance(exc, (asyncio.TimeoutError, anthropic.APITimeoutError)):
+        return True
+    if isinstance(exc, anthropic.APIStatusError) or \
+            isinstance(getattr(exc, 'status_code', None), int):
+        return exc.status_code in OVERLOAD_STATUS_CODES
+    # Retry wrappers (tenacity, instructor) keep the original error as cause
+    cause = exc.__cause__ or exc.__context__
+    return cause is not None and cause is not exc and is_overload(cause)
+
+
+class AdaptiveLimiter:
+    """Concurrency limiter with additive increase, multiplicative decrease.
+
+    The limit grows by one slot per limit's worth of healthy calls and is
+    halved on overload errors (429/529) or timeouts. Calls whose latency is
+    well above the observed baseline hold the limit instead of raising it.
+    """
+    def __init__(self, initial=1, minimum=1, maximum=8, backoff=0.5,
+                 latency_tolerance=2.0):
+        """Initialize the limiter.
+
+        Args:
+            initial: Initial number of concurrent calls (default: 1)
+            minimum: Lower bound of the limit (default: 1)
+            maximum: Ceiling of the limit (default: 8)
+            backoff: Factor applied to the limit on overload (default: 0.5)
+            latency_tolerance: Latency above baseline * tolerance counts as
+                               unhealthy (default: 2.0)
+        """
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(min(max(initial, minimum), self.maximum))
+        self._active = 0
+        self._baseline = None
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self):
+        """Current number of allowed concurrent calls."""
+        return int(self._limit)
+
+    @property
+    def active(self):
+        """Number of calls currently holding a slot."""
+        return self._active
+
+    def on_success(self, latency):
+        """Record a successful call and possibly raise the limit.
+
+        Args:
+            latency: Duration of the call in seconds
+        """
+        if self._baseline is None:
+            self._baseline = latency
+        else:
+            # Track the typical latency, drifting slowly towards new values
+            self._baseline = min(latency,
+                                 0.9 * self._baseline + 0.1 * latency)
+
+        if latency > self._baseline * self.latency_tolerance:
+            return
+        self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+
+    def on_overload(self):
+        """Record an overload error or timeout and lower the limit."""
+        previous = self.limit
+        self._limit = max(self.minimum, self._limit * self.backoff)
+        if self.limit != previous:
+            logger.info(f"Overloaded, lowering concurrency from {previous} "
+                        f"to {self.limit}")
+
+    def on_error(self, exc):
+        """Record a failed call, lowering the limit if it was overloaded.
+
+        Args:
+            exc: Exception raised by the call
+        """
+        if is_overload(exc):
+            self.on_overload()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for the duration of a call.
+
+        Example:
+        >>> async with limiter.slot():
+        ...     await call()
+        """
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self._active < self.limit)
+            self._active += 1
+
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.on_error(e)
+            raise
+        else:
+            self.on_success(time.monotonic() - start)
+        finally:
+            async with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+
+async def gather(*aws, progress=False, limit=None):
+    """Run awaitables concurrently and cancel the rest if one fails.
+
+    Unlike asyncio.gather, a failure does not leave the remaining calls
+    running in the background.
+
+    Args:
+        aws: Awaitables to run
+        progress: Show a progress bar (default: False)
+        limit: Number of awaitables run at the same time (default: all)
+
+    Returns:
+        list: Results in the order of the awaitables
+    """
+    if limit:
+        semaphore = asyncio.Semaphore(limit)
+
+        async def limited(aw):
+            async with semaphore:
+                return await aw
+        aws = [limited(aw) for aw in aws]
+
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        if progress:
+            return await tqdm_asyncio.gather(*tasks)
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Number of recent latencies the percentiles of a stage are estimated from
+WINDOW = 200
+
+# Number of latencies needed before timeouts adapt and requests are hedged
+MIN_SAMPLES = 20
+
+# Adaptive timeouts are this multiple of the p95 latency of the stage
+TIMEOUT_FACTOR = 3.0
+
+# Lower bound of adaptive timeouts in seconds
+MIN_TIMEOUT = 5.0
+
+# Upper bound of the number of doublings of the timeout after timeouts in a
+# row, the timeout also never exceeds the default of the call
+MAX_DOUBLINGS = 10
+
+# Percentile of the latency after which a duplicate request is sent
+HEDGE_QUANTILE = 0.95
+
+# Send a duplicate of slow requests, set from the command line
+HEDGING = False
+
+_lock = threading.Lock()
+
+# Latency trackers per stage
+_trackers = {}
+
+
+class LatencyTracker:
+    """Estimates latency percentiles from a sliding window of recent calls.
+
+    The window follows the current behaviour of the API, so percentiles
+    recover after a slow period. Calls that timed out count with the time
+    they took, and the timeouts in a row are counted, so timeouts derived
+    from the window widen when the API slows down.
+    """
+    def __init__(self, window=WINDOW, min_samples=MIN_SAMPLES):
+        """Initialize the tracker.
+
+        Args:
+            window: Number of recent latencies kept (default: WINDOW)
+            min_samples: Number of latencies needed for an estimate
+                         (default: MIN_SAMPLES)
+        """
+        self.min_samples = min_samples
+        self.timeouts = 0
+        self._latencies = deque(maxlen=window)
+
+    def __len__(self):
+        return len(self._latencies)
+
+    def observe(self, latency):
+        """Add the latency of a successful call.
+
+        Args:
+            latency: Duration of the call in seconds
+        """
+        self._latencies.append(latency)
+        self.timeouts = 0
+
+    def observe_timeout(self, elapsed):
+        """Add a call that timed out.
+
+        Args:
+            elapsed: Seconds the call ran before it timed out, a lower bound
+                     of its latency
+        """
+        self._latencies.append(elapsed)
+        self.timeouts += 1
+
+    def quantile(self, q):
+        """Estimate a latency percentile.
+
+        Args:
+            q: Quantile between 0 and 1, e.g. 0.95
+
+        Returns:
+            float: Estimated latency in seconds, None until min_samples
+                   latencies were observed
+        """
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def get_tracker(stage):
+    """Get the latency tracker of a stage.
+
+    Args:
+        stage: Name of the pipeline stage
+
+    Returns:
+        LatencyTracker: Tracker of the stage
+    """
+    with _lock:
+        if stage not in _trackers:
+            _trackers[stage] = LatencyTracker()
+        return _trackers[stage]
+
+
+def observe(stage, latency):
+    """Add the latency of a successful call of a stage.
+
+    Args:
+        stage: Name of the pipeline stage
+        latency: Duration of the call in seconds
+    """
+    get_tracker(stage).observe(latency)
+
+
+def observe_timeout(stage, elapsed):
+    """Add a call of a stage that timed out.
+
+    Args:
+        stage: Name of the pipeline stage
+        elapsed: Seconds the call ran before it timed out
+    """
+    get_tracker(stage).observe_timeout(elapsed)
+
+
+def timeout(stage, default):
+    """Get the timeout of a call from the recent latencies of its stage.
+
+    The timeout doubles with every timeout in a row, so a stage whose calls
+    all time out after the API slowed down does not keep timing out.
+
+    Args:
+        stage: Name of the pipeline stage
+        default: Timeout in seconds until enough latencies were observed,
+                 also the upper bound of the adaptive timeout
+
+    Returns:
+        float: Timeout in seconds
+    """
+    tracker = get_tracker(stage)
+    p95 = tracker.quantile(0.95)
+    if p95 is None:
+        return default
+    widening = 2 ** min(tracker.timeouts, MAX_DOUBLINGS)
+    return min(default, max(MIN_TIMEOUT, p95 * TIMEOUT_FACTOR) * widening)
+
+
+async def hedge(factory, stage, duplicate=None):
+    """Run a call and send a duplicate if it is slower than usual.
+
+    The duplicate is sent once the call took longer than the HEDGE_QUANTILE
+    latency of its stage. The first successful response wins and the other
+    call is cancelled. Without enough latencies, or with HEDGING off, the
+    call runs alone.
+
+    Args:
+        factory: Function returning a new coroutine of the call
+        stage: Name of the pipeline stage
+        duplicate: Function returning a new coroutine of the duplicate,
+                   e.g. one that waits for a concurrency slot of its own
+                   (default: factory)
+
+    Returns:
+        The result of the first call to succeed
+
+    Raises:
+        Exception: The error of the last call to fail if both fail
+    """
+    delay = get_tracker(stage).quantile(HEDGE_QUANTILE) if HEDGING else None
+    if delay is None:
+        return await factory()
+
+    primary = asyncio.ensure_future(factory())
+    pending = {primary}
+    try:
+        # Inside the try, so cancelling the caller cancels the call too
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+
+        logger.debug(f"No response after {delay:.2f}s, hedging {stage} "
+                     f"request")
+        secondary = asyncio.ensure_future((duplicate or factory)())
+        tasks = {primary: 'primary', secondary: 'hedge'}
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    metrics.inc('minddb_hedged', stage=stage,
+                                winner=tasks[task])
+                    return task.result()
+        # Both failed, report the error of the call that failed last
+        return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def reset():
+    """Drop the latencies of all stages."""
+    with _lock:
+        _trackers.clear()
@@ -0,0 +1,58 @@
+import jinja2
+
+
+def text(content):
+    """Create a text content block.
+
+    Args:
+        content: Text of the block (may contain jinja templates)
+
+    Returns:
+        dict: Text content block
+    """
+    return {'type': 'text', 'text': content}
+
+
+def cached(content):
+    """Create a text content block closing a cacheable prompt prefix.
+
+    Everything up to and including this block is cached by the provider, so
+    large content shared between calls should go into it and come first.
+
+    Args:
+        content: Text of the block (may contain jinja templates)
+
+    Returns:
+        dict: Text content block with an ephemeral cache-control breakpoint
+    """
+    return {**text(content), 'cache_control': {'type': 'ephemeral'}}
+
+
+def _render(template, context):
+    return jinja2.Template(template).render(**context)
+
+
+def render(messages, context):
+    """Render the jinja templates of chat messages.
+
+    Args:
+        messages: List of chat messages with str or content block content
+        context: Template variables
+
+    Returns:
+        list: Messages with rendered content
+    """
+    context = context or {}
+    rendered = []
+    for message in messages:
+        content = message['content']
+        if isinstance(content, str):
+            content = _render(content, context)
+        else:
+            content = [
+                {**block, 'text': _render(block['text'], context)}
+                if block.get('type') == 'text' else block
+                for block in content
+            ]
+        rendered.append({**message, 'content': content})
+    return rendered
@@ -0,0 +1,312 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import anthropic
+
+from . import usage
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900,
+           float('inf'))
+
+# Counter families and their help texts
+COUNTERS = {
+    'minddb_calls': ('LLM requests and storage transactions by outcome '
+                     '(ok, timeout, error, cancelled)'),
+    'minddb_retries': 'Retried calls by reason (validation, error)',
+    'minddb_http_responses': 'HTTP responses from the API by status code',
+    'minddb_notes': 'Notes produced',
+    'minddb_triaged': 'Notes by result of the local review checks',
+    'minddb_duplicates': 'Generated questions dropped as near-duplicates',
+    'minddb_hedged': 'Hedged requests by the call answering first',
+    'minddb_retries_denied': 'Retries denied by the retry budget',
+    'minddb_circuit_transitions': ('Circuit breaker transitions by new state '
+                                   '(open, half_open, closed)'),
+}
+
+# Histogram families and their help texts
+HISTOGRAMS = {
+    'minddb_call_duration_seconds': ('Duration of LLM requests and storage '
+                                     'transactions'),
+}
+
+# Pipeline stage of the running call, read by the client hooks
+_stage = contextvars.ContextVar('stage', default='default')
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}
+
+
+def _labels(labels):
+    """Turn keyword labels into a hashable, sorted tuple."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """Increase a counter.
+
+    Args:
+        name: Name of the counter family, e.g. 'minddb_notes'
+        amount: Value to add (default: 1)
+        labels: Label values, e.g. stage='review'
+    """
+    with _lock:
+        _counters[name, _labels(labels)] += amount
+
+
+def observe(name, value, **labels):
+    """Add an observation to a histogram.
+
+    Args:
+        name: Name of the histogram family
+        value: Observed value
+        labels: Label values, e.g. stage='review'
+    """
+    with _lock:
+        key = (name, _labels(labels))
+        if key not in _histograms:
+            _histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+        counts, _, _ = histogram = _histograms[key]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                counts[i] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration and outcome of a call of a stage.
+
+    The stage is also made current, so retries and HTTP responses of the
+    call are attributed to it.
+
+    Args:
+        stage: Name of the pipeline stage, e.g. 'review'
+
+    Example:
+    >>> with timed('review'):
+    ...     await call()
+    """
+    token = _stage.set(stage)
+    start = time.monotonic()
+    outcome = 'cancelled'
+    try:
+        yield
+        outcome = 'ok'
+    except (asyncio.TimeoutError, anthropic.APITimeoutError):
+        outcome = 'timeout'
+        raise
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        observe('minddb_call_duration_seconds', time.monotonic() - start,
+                stage=stage)
+        inc('minddb_calls', stage=stage, outcome=outcome)
+        try:
+            _stage.reset(token)
+        except ValueError:
+            # Async generators may be closed from another context
+            pass
+
+
+def on_parse_error(error, *args, **kwargs):
+    """Count a response that failed validation and will be retried.
+
+    Registered as the instructor 'parse:error' hook.
+    """
+    inc('minddb_retries', stage=_stage.get(), reason='validation')
+
+
+async def aobserve_response(response):
+    """Count an HTTP response of the API by status code.
+
+    Registered as an httpx response event hook.
+    """
+    inc('minddb_http_responses', stage=_stage.get(),
+        code=response.status_code)
+
+
+def get_counter(name, **labels):
+    """Get the value of a counter.
+
+    Args:
+        name: Name of the counter family
+        labels: Label values, e.g. stage='review'
+
+    Returns:
+        float: Value of the counter, 0 if it was never increased
+    """
+    with _lock:
+        return _counters.get((name, _labels(labels)), 0)
+
+
+def get_histogram(name, **labels):
+    """Get the state of a histogram.
+
+    Args:
+        name: Name of the histogram family
+        labels: Label values, e.g. stage='review'
+
+    Returns:
+        tuple: (cumulative bucket counts, sum, count), None if nothing was
+               observed
+    """
+    with _lock:
+        histogram = _histograms.get((name, _labels(labels)))
+        if histogram is None:
+            return None
+        counts, total, count = histogram
+        return list(counts), total, count
+
+
+def quantile(name, q, **labels):
+    """Estimate a quantile of a histogram by interpolating in its buckets.
+
+    Args:
+        name: Name of the histogram family
+        q: Quantile between 0 and 1, e.g. 0.95
+        labels: Label values, e.g. stage='review'
+
+    Returns:
+        float: Estimated quantile, None if nothing was observed
+    """
+    histogram = get_histogram(name, **labels)
+    if histogram is None or not histogram[2]:
+        return None
+    counts, _, count = histogram
+    rank = q * count
+    lower_bound, lower_count = 0.0, 0
+    for bound, bucket_count in zip(BUCKETS, counts):
+        if bucket_count >= rank:
+            if bound == float('inf'):
+                # Nothing to interpolate towards, report the last bound
+                return lower_bound
+            share = (rank - lower_count) / (bucket_count - lower_count) \
+                if bucket_count > lower_count else 0.0
+            return lower_bound + (bound - lower_bound) * share
+        lower_bound, lower_count = bound, bucket_count
+    return lower_bound
+
+
+def _format(name, labels, value):
+    """Format one sample line."""
+    if labels:
+        label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+        name = f'{name}{{{label_text}}}'
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f'{name} {value}'
+
+
+def render():
+    """Render all metrics in the OpenMetrics text format.
+
+    Token counters are taken from the usage totals of each stage.
+
+    Returns:
+        str: Metrics exposition ending with '# EOF'
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: (list(counts), total, count)
+                      for key, (counts, total, count)
+                      in _histograms.items()}
+
+    for stage, totals in usage.get_usage().items():
+        for field in usage.FIELDS:
+            token_type = field.removesuffix('_tokens')
+            counters['minddb_tokens',
+                     _labels({'stage': stage, 'type': token_type})] = \
+                totals[field]
+
+    families = dict(COUNTERS, minddb_tokens='Tokens reported by the API')
+    lines = []
+    for family, help_text in families.items():
+        samples = sorted((labels, value)
+                         for (name, labels), value in counters.items()
+                         if name == family)
+        lines.append(f'# TYPE {family} counter')
+        lines.append(f'# HELP {family} {help_text}')
+        lines.extend(_format(f'{family}_total', labels, value)
+                     for labels, value in samples)
+
+    for family, help_text in HISTOGRAMS.items():
+        lines.append(f'# TYPE {family} histogram')
+        lines.append(f'# HELP {family} {help_text}')
+        for (name, labels), (counts, total, count) in sorted(
+                histograms.items()):
+            if name != family:
+                continue
+            for bound, bucket_count in zip(BUCKETS, counts):
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(_format(f'{family}_bucket',
+                                     labels + (('le', le),), bucket_count))
+            lines.append(_format(f'{family}_sum', labels, total))
+            lines.append(_format(f'{family}_count', labels, count))
+
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def write(path):
+    """Write the metrics to a file, replacing it atomically.
+
+    Args:
+        path: Path of the OpenMetrics text file
+    """
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(render())
+    os.replace(temp_path, path)
+    logger.info(f"Wrote metrics to {path}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve the metrics over HTTP from a background thread.
+
+    Args:
+        port: Port to listen on, 0 to pick a free one
+        host: Address to listen on (default: localhost only)
+
+    Returns:
+        ThreadingHTTPServer: Running server, stop it with shutdown()
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_port}/")
+    return server
+
+
+def reset():
+    """Reset all counters and histograms."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
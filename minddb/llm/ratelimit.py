@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Anthropic rate limit headers, keyed by the bucket they describe
+HEADER_PREFIX = 'anthropic-ratelimit-'
+BUCKETS = ('requests', 'input-tokens', 'output-tokens')
+
+# Deficits below this many tokens are rounding errors of the refill, not debt
+EPSILON = 1e-6
+
+
+class TokenBucket:
+    """Token bucket refilled continuously up to its capacity per minute.
+
+    The bucket starts without a capacity (unlimited) until a limit is known,
+    either from configuration or from the API response headers.
+    """
+    def __init__(self, capacity=None):
+        """Initialize the bucket.
+
+        Args:
+            capacity: Maximum number of tokens per minute (optional)
+        """
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self):
+        """Refill rate in tokens per second."""
+        return self.capacity / 60.0
+
+    def _refill(self, now):
+        if self.capacity is None:
+            return
+        elapsed = now - self._updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def reserve(self, amount, now=None):
+        """Take tokens out of the bucket, going into debt if necessary.
+
+        Args:
+            amount: Number of tokens to reserve
+            now: Current monotonic time (default: time.monotonic())
+
+        Returns:
+            float: Seconds to wait before the reservation is covered
+        """
+        if self.capacity is None:
+            return 0.0
+
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens > -EPSILON:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def refund(self, amount):
+        """Return unused tokens of a reservation to the bucket.
+
+        Args:
+            amount: Number of tokens to return (negative values charge more)
+        """
+        if self.capacity is None:
+            return
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def update(self, limit=None, remaining=None, now=None):
+        """Synchronize the bucket with the limits reported by the server.
+
+        Args:
+            limit: Capacity reported by the server (optional)
+            remaining: Tokens remaining according to the server (optional)
+            now: Current monotonic time (default: time.monotonic())
+        """
+        now = time.monotonic() if now is None else now
+        if limit is not None and limit != self.capacity:
+            if self.capacity is None:
+                self.tokens = limit
+                self._updated = now
+            self.capacity = limit
+        self._refill(now)
+        if remaining is not None and self.capacity is not None:
+            # The server does not know about our in-flight reservations yet,
+            # so only ever lower our own estimate.
+            self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    """Client side rate limiter for requests, input and output tokens.
+
+    Each call reserves one request, its estimated input tokens and its
+    max_tokens from the corresponding per-minute buckets and only waits when
+    one of the budgets is used up. The budgets are kept in sync with the
+    anthropic-ratelimit-* response headers and the actual token usage.
+    """
+    def __init__(self, requests_per_minute=None, input_tokens_per_minute=None,
+                 output_tokens_per_minute=None):
+        """Initialize the rate limiter.
+
+        Args:
+            requests_per_minute: Request limit (default: learned from headers)
+            input_tokens_per_minute: Input token limit (default: learned from
+                                     headers)
+            output_tokens_per_minute: Output token limit (default: learned
+                                      from headers)
+        """
+        self._buckets = {
+            'requests': TokenBucket(requests_per_minute),
+            'input-tokens': TokenBucket(input_tokens_per_minute),
+            'output-tokens': TokenBucket(output_tokens_per_minute),
+        }
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def bucket(self, name):
+        """Get a bucket by name ('requests', 'input-tokens' or
+        'output-tokens')."""
+        return self._buckets[name]
+
+    def reserve(self, input_tokens=0, output_tokens=0):
+        """Reserve budget for a single request.
+
+        Args:
+            input_tokens: Estimated number of input tokens
+            output_tokens: Maximum number of output tokens
+
+        Returns:
+            float: Seconds to wait before sending the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            delays = [
+                self._buckets['requests'].reserve(1, now),
+                self._buckets['input-tokens'].reserve(input_tokens, now),
+                self._buckets['output-tokens'].reserve(output_tokens, now),
+                self._blocked_until - now,
+            ]
+            return max(0.0, *delays)
+
+    async def acquire(self, input_tokens=0, output_tokens=0):
+        """Wait asynchronously until the request fits into the budget.
+
+        Args:
+            input_tokens: Estimated number of input tokens
+            output_tokens: Maximum number of output tokens
+        """
+        delay = self.reserve(input_tokens, output_tokens)
+        if delay > 0:
+            logger.info(f"Rate limit reached, waiting {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+    def settle(self, estimated_input, reserved_output, usage):
+        """Correct a reservation with the actual token usage of a response.
+
+        Args:
+            estimated_input: Input tokens reserved for the request
+            reserved_output: Output tokens reserved for the request
+            usage: Usage object of the response (input_tokens, output_tokens)
+        """
+        if usage is None:
+            return
+        input_tokens = getattr(usage, 'input_tokens', None)
+        output_tokens = getattr(usage, 'output_tokens', None)
+        with self._lock:
+            if input_tokens is not None:
+                self._buckets['input-tokens'].refund(
+                    estimated_input - input_tokens)
+            if output_tokens is not None:
+                self._buckets['output-tokens'].refund(
+                    reserved_output - output_tokens)
+
+    def refund(self, input_tokens=0, output_tokens=0):
+        """Return the token reservation of a request that failed.
+
+        The request itself still counts against the request budget.
+
+        Args:
+            input_tokens: Input tokens reserved for the request
+            output_tokens: Output tokens reserved for the request
+        """
+        with self._lock:
+            self._buckets['input-tokens'].refund(input_tokens)
+            self._buckets['output-tokens'].refund(output_tokens)
+
+    def pause(self, seconds):
+        """Hold back all requests for the given number of seconds.
+
+        Args:
+            seconds: Number of seconds to pause, e.g. from a retry-after header
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until,
+                                      time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        """Synchronize the buckets with the rate limit headers of a response.
+
+        Args:
+            headers: Mapping of (case-insensitive) response headers
+        """
+        headers = {k.lower(): v for k, v in headers.items()}
+        with self._lock:
+            now = time.monotonic()
+            for name in BUCKETS:
+                limit = _to_int(headers.get(f'{HEADER_PREFIX}{name}-limit'))
+                remaining = _to_int(
+                    headers.get(f'{HEADER_PREFIX}{name}-remaining'))
+                if limit is not None or remaining is not None:
+                    self._buckets[name].update(limit, remaining, now)
+
+        retry_after = _to_float(headers.get('retry-after'))
+        if retry_after is not None:
+            self.pause(retry_after)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _request_model(request):
+    """Get the model a request was sent to from its JSON body."""
+    try:
+        return json.loads(request.content).get('model')
+    except (AttributeError, RuntimeError, TypeError, ValueError):
+        # Streamed bodies are not kept and other bodies carry no model
+        return None
+
+
+def observe_response(response):
+    """httpx response event hook feeding the headers to the rate limiter of
+    the requested model."""
+    model = _request_model(response.request)
+    get_rate_limiter(model).update_from_headers(response.headers)
+
+
+async def aobserve_response(response):
+    """Async httpx response event hook feeding the headers to the rate
+    limiter of the requested model."""
+    observe_response(response)
+
+
+# Rate limiters per model, as the API limits each model separately
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model=None):
+    """Get the process wide rate limiter of a model, shared by all its LLM
+    calls.
+
+    Args:
+        model: Name of the model (default: the limiter of calls without a
+               model)
+
+    Returns:
+        RateLimiter: The shared rate limiter instance of the model
+    """
+    with _rate_limiters_lock:
+        if model not in _rate_limiters:
+            _rate_limiters[model] = RateLimiter()
+        return _rate_limiters[model]
+
+
+def reset():
+    """Drop the rate limiters of all models."""
+    with _rate_limiters_lock:
+        _rate_limiters.clear()
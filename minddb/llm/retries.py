@@ -0,0 +1,323 @@
+import asyncio
+import json
+import logging
+import random
+import time
+
+import anthropic
+from pydantic import ValidationError
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt
+
+from . import metrics
+from .concurrency import is_overload
+
+logger = logging.getLogger(__name__)
+
+# Retries of transient errors per call, if the retry budget allows
+MAX_RETRIES = 2
+
+# Share of successful calls that can be retried, e.g. 0.2 for one retry per
+# five successes
+RETRY_RATIO = 0.2
+
+# Retries available before any call succeeded, and the cap of the budget
+RETRY_RESERVE = 10
+
+# Base and maximum seconds of the jittered exponential backoff
+RETRY_WAIT = 1.0
+RETRY_MAX_WAIT = 30.0
+
+# Consecutive transient errors that open the circuit
+FAILURE_THRESHOLD = 5
+
+# Seconds the circuit stays open before a probe call, doubled after each
+# failed probe up to the maximum
+RECOVERY_TIME = 30.0
+MAX_RECOVERY_TIME = 300.0
+
+# Errors of a response that failed validation, retried by instructor
+_PARSE_ERRORS = (ValidationError, json.JSONDecodeError)
+
+# Process-wide retry budget and circuit breaker
+_retry_budget = None
+_circuit_breaker = None
+
+
+def is_transient(exc):
+    """Check if an error may go away when the call is retried.
+
+    Args:
+        exc: Exception raised by an LLM call
+
+    Returns:
+        bool: True for overload errors, timeouts, server errors and
+              connection errors
+    """
+    if is_overload(exc) or isinstance(exc, anthropic.APIConnectionError):
+        return True
+    status_code = getattr(exc, 'status_code', None)
+    if isinstance(status_code, int):
+        return status_code >= 500
+    # Retry wrappers (tenacity, instructor) keep the original error as cause
+    cause = exc.__cause__ or exc.__context__
+    return cause is not None and cause is not exc and is_transient(cause)
+
+
+def backoff(attempt):
+    """Get the jittered exponential backoff before a retry.
+
+    Args:
+        attempt: Number of the retry, starting at 1
+
+    Returns:
+        float: Seconds to wait
+    """
+    return random.uniform(0, min(RETRY_MAX_WAIT,
+                                 RETRY_WAIT * 2 ** (attempt - 1)))
+
+
+class RetryBudget:
+    """Caps retries to a share of the successful calls of the process.
+
+    Every success adds ratio retries to the budget, up to the reserve, and
+    every retry takes one. When the API degrades, the budget runs dry and
+    errors surface instead of multiplying the load.
+    """
+    def __init__(self, ratio=RETRY_RATIO, reserve=RETRY_RESERVE):
+        """Initialize the budget.
+
+        Args:
+            ratio: Retries earned per successful call (default: RETRY_RATIO)
+            reserve: Initial and maximum number of retries available
+                     (default: RETRY_RESERVE)
+        """
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = float(reserve)
+
+    @property
+    def balance(self):
+        """Number of retries currently available."""
+        return self._balance
+
+    def deposit(self):
+        """Record a successful call."""
+        self._balance = min(self.reserve, self._balance + self.ratio)
+
+    def withdraw(self):
+        """Take one retry from the budget.
+
+        Returns:
+            bool: True if the retry may be made, False if the budget is
+                  used up
+        """
+        if self._balance < 1:
+            metrics.inc('minddb_retries_denied')
+            return False
+        self._balance -= 1
+        return True
+
+
+class CircuitBreaker:
+    """Pauses all LLM calls while the API keeps failing.
+
+    After FAILURE_THRESHOLD consecutive transient errors the circuit opens
+    and calls wait. Once the recovery time passed, a single probe call is
+    let through. If it succeeds the circuit closes, otherwise it opens again
+    for twice as long.
+
+    Calls wait with acquire and report their outcome with record, see
+    call.
+    """
+    # Seconds between two checks of waiting calls
+    CHECK_INTERVAL = 0.5
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD,
+                 recovery_time=RECOVERY_TIME,
+                 max_recovery_time=MAX_RECOVERY_TIME):
+        """Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive transient errors opening the
+                               circuit (default: FAILURE_THRESHOLD)
+            recovery_time: Seconds before the first probe
+                           (default: RECOVERY_TIME)
+            max_recovery_time: Upper bound of the doubled recovery time
+                               (default: MAX_RECOVERY_TIME)
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.max_recovery_time = max_recovery_time
+        self._failures = 0
+        self._opened_at = None
+        self._open_time = recovery_time
+        self._probing = False
+
+    @property
+    def state(self):
+        """'closed', 'open' or 'half_open' while a probe call runs."""
+        if self._opened_at is None:
+            return 'closed'
+        return 'half_open' if self._probing else 'open'
+
+    async def acquire(self):
+        """Wait until a call may be made.
+
+        Returns:
+            bool: True if the call is the probe of an open circuit
+        """
+        while self._opened_at is not None:
+            remaining = self._opened_at + self._open_time - time.monotonic()
+            if remaining <= 0 and not self._probing:
+                self._probing = True
+                self._transition('half_open')
+                return True
+            await asyncio.sleep(min(self.CHECK_INTERVAL, remaining)
+                                if remaining > 0 else self.CHECK_INTERVAL)
+        return False
+
+    def record(self, exc=None, probe=False):
+        """Record the outcome of a call.
+
+        Args:
+            exc: Exception the call failed with, None if it succeeded
+            probe: Whether the call was the probe of an open circuit
+        """
+        if probe:
+            self._probing = False
+        if exc is not None and is_transient(exc):
+            self._failures += 1
+            if probe:
+                self._open_time = min(self.max_recovery_time,
+                                      self._open_time * 2)
+                self._open()
+            elif self._opened_at is None and \
+                    self._failures >= self.failure_threshold:
+                self._open()
+            return
+
+        # Any answer of the API ends a series of failures
+        self._failures = 0
+        if self._opened_at is not None and (exc is None or probe):
+            logger.info("API recovered, resuming LLM calls")
+            self._opened_at = None
+            self._open_time = self.recovery_time
+            self._transition('closed')
+
+    def release(self, probe=False):
+        """Release a call that ended without an outcome, e.g. cancelled.
+
+        Args:
+            probe: Whether the call was the probe of an open circuit
+        """
+        if probe:
+            self._probing = False
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        logger.warning(f"{self._failures} consecutive API errors, pausing "
+                       f"LLM calls for {self._open_time:.0f}s")
+        self._transition('open')
+
+    def _transition(self, state):
+        metrics.inc('minddb_circuit_transitions', state=state)
+
+
+def get_retry_budget():
+    """Get the process-wide retry budget.
+
+    Returns:
+        RetryBudget: Shared retry budget
+    """
+    global _retry_budget
+    if _retry_budget is None:
+        _retry_budget = RetryBudget()
+    return _retry_budget
+
+
+def get_circuit_breaker():
+    """Get the process-wide circuit breaker.
+
+    Returns:
+        CircuitBreaker: Shared circuit breaker
+    """
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker()
+    return _circuit_breaker
+
+
+def budgeted(exc):
+    """Retry predicate taking each retry from the budget.
+
+    Use as tenacity's retry condition, e.g. retry=retry_if_exception(
+    budgeted).
+    """
+    return get_retry_budget().withdraw()
+
+
+def validation_retries(max_retries):
+    """Create the validation retries of instructor, drawn from the budget.
+
+    Args:
+        max_retries: Maximum number of validation retries
+
+    Returns:
+        AsyncRetrying: Retrying for instructor's max_retries
+    """
+    return AsyncRetrying(
+        stop=stop_after_attempt(max(max_retries, 0) + 1),
+        retry=retry_if_exception(
+            lambda e: isinstance(e, _PARSE_ERRORS) and budgeted(e)),
+        reraise=True,
+    )
+
+
+async def call(factory, stage, max_retries=MAX_RETRIES, on_retry=None):
+    """Make a call through the circuit breaker, retrying transient errors.
+
+    Args:
+        factory: Function returning a new coroutine of the call
+        stage: Name of the pipeline stage the retries are counted for
+        max_retries: Maximum number of retries (default: MAX_RETRIES)
+        on_retry: Function called with the error of each attempt that is
+                  retried, e.g. AdaptiveLimiter.on_error (optional)
+
+    Returns:
+        The result of the call
+
+    Raises:
+        Exception: The error of the call once it cannot be retried
+    """
+    breaker = get_circuit_breaker()
+    budget = get_retry_budget()
+    attempt = 0
+    while True:
+        probe = await breaker.acquire()
+        try:
+            result = await factory()
+        except Exception as e:
+            breaker.record(e, probe)
+            if attempt >= max_retries or not is_transient(e) \
+                    or not budget.withdraw():
+                raise
+            attempt += 1
+            if on_retry is not None:
+                on_retry(e)
+            metrics.inc('minddb_retries', stage=stage, reason='error')
+            logger.info(f"Retrying {stage} call after error: {e}")
+            await asyncio.sleep(backoff(attempt))
+        except BaseException:
+            breaker.release(probe)
+            raise
+        else:
+            breaker.record(probe=probe)
+            budget.deposit()
+            return result
+
+
+def reset():
+    """Drop the retry budget and the circuit breaker."""
+    global _retry_budget, _circuit_breaker
+    _retry_budget = None
+    _circuit_breaker = None
@@ -0,0 +1,145 @@
+import logging
+import tomllib
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages that can be configured
+STAGES = ('summary', 'notes', 'review')
+
+# Process-wide configuration, set from the command line
+_config = None
+
+
+class StageConfig(BaseModel):
+    """Settings of the LLM calls of a pipeline stage.
+
+    Unset options keep the defaults of the stage. The model and temperature
+    are applied by the LLM calls, the other options by the stage itself.
+    """
+    model_config = ConfigDict(extra='forbid')
+
+    model: Optional[str] = None
+    max_tokens: Optional[int] = Field(default=None, gt=0)
+    temperature: Optional[float] = Field(default=None, ge=0, le=1)
+    concurrency: Optional[int] = Field(default=None, gt=0)
+    timeout: Optional[float] = Field(default=None, gt=0)
+
+
+class Config(BaseModel):
+    """Settings of each pipeline stage."""
+    model_config = ConfigDict(extra='forbid')
+
+    summary: StageConfig = Field(default_factory=StageConfig)
+    notes: StageConfig = Field(default_factory=StageConfig)
+    review: StageConfig = Field(default_factory=StageConfig)
+
+
+def load(path=None, overrides=()):
+    """Load the stage configuration from a TOML file and overrides.
+
+    The file has one table per stage. Overrides take precedence over the
+    file.
+
+    Example file:
+
+        [notes]
+        max_tokens = 16384
+
+        [review]
+        model = "claude-3-5-haiku-latest"
+        concurrency = 16
+
+    Args:
+        path: Path of the TOML file (optional)
+        overrides: Strings of the form STAGE.OPTION=VALUE, e.g.
+                   'review.timeout=20' (optional)
+
+    Returns:
+        Config: Configuration of the stages
+
+    Raises:
+        ValueError: If an override is malformed, or a stage, option or
+                    value is invalid
+    """
+    data = {}
+    if path is not None:
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+
+    for override in overrides:
+        key, sep, value = override.partition('=')
+        stage, dot, option = key.strip().partition('.')
+        if not sep or not dot:
+            raise ValueError(f"Expected STAGE.OPTION=VALUE, got {override}")
+        data.setdefault(stage, {})[option] = value.strip()
+
+    return Config.model_validate(data)
+
+
+def get_config():
+    """Get the process-wide stage configuration.
+
+    Returns:
+        Config: Configuration of the stages
+    """
+    global _config
+    if _config is None:
+        _config = Config()
+    return _config
+
+
+def set_config(config):
+    """Set the process-wide stage configuration.
+
+    Args:
+        config: Config to use, None for the defaults
+    """
+    global _config
+    _config = config
+    if config is not None:
+        for stage in STAGES:
+            settings = getattr(config, stage).model_dump(exclude_none=True)
+            if settings:
+                logger.info(f"Stage {stage}: {settings}")
+
+
+def get(stage):
+    """Get the settings of a stage.
+
+    Args:
+        stage: Name of the pipeline stage
+
+    Returns:
+        StageConfig: Settings of the stage, all unset for stages that
+                     cannot be configured
+    """
+    if stage not in STAGES:
+        return StageConfig()
+    return getattr(get_config(), stage)
+
+
+def resolve(stage, model=None, temperature=None, default_model=None):
+    """Resolve the model and sampling options of a call of a stage.
+
+    Arguments of the call take precedence over the settings of the stage.
+
+    Args:
+        stage: Name of the pipeline stage
+        model: Model requested by the call (optional)
+        temperature: Temperature requested by the call (optional)
+        default_model: Model used if neither the call nor the stage sets
+                       one (optional)
+
+    Returns:
+        tuple: (model, options) with the keyword arguments of the request,
+               empty if the temperature is left to the API
+    """
+    settings = get(stage)
+    model = model or settings.model or default_model
+    if temperature is None:
+        temperature = settings.temperature
+    options = {} if temperature is None else {'temperature': temperature}
+    return model, options
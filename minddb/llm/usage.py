@@ -0,0 +1,59 @@
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Token counters reported by the API, per stage
+FIELDS = ('input_tokens', 'cache_creation_input_tokens',
+          'cache_read_input_tokens', 'output_tokens')
+
+_usage = defaultdict(lambda: dict.fromkeys(FIELDS + ('requests',), 0))
+
+
+def record(stage, usage):
+    """Add the token usage of a response to the totals of a stage.
+
+    Args:
+        stage: Name of the pipeline stage, e.g. 'summary'
+        usage: Usage object of the response (optional)
+    """
+    if usage is None:
+        return
+    totals = _usage[stage]
+    totals['requests'] += 1
+    for field in FIELDS:
+        totals[field] += getattr(usage, field, None) or 0
+
+
+def get_usage():
+    """Get the token usage per stage.
+
+    Returns:
+        dict: Stage name to dict of token counters. Prompt cache hits are
+              counted in cache_read_input_tokens, misses written to the
+              cache in cache_creation_input_tokens and uncached input in
+              input_tokens.
+    """
+    return {stage: dict(totals) for stage, totals in _usage.items()}
+
+
+def reset():
+    """Reset the token usage of all stages."""
+    _usage.clear()
+
+
+def log_usage():
+    """Log the token usage and prompt cache hit rate of each stage."""
+    for stage, totals in get_usage().items():
+        cache_read = totals['cache_read_input_tokens']
+        total_input = (totals['input_tokens'] + cache_read +
+                       totals['cache_creation_input_tokens'])
+        hit_rate = cache_read / total_input if total_input else 0.0
+        logger.info(
+            f"{stage}: {totals['requests']} requests, "
+            f"{totals['input_tokens']} uncached input tokens, "
+            f"{cache_read} cache hit tokens, "
+            f"{totals['cache_creation_input_tokens']} cache miss tokens "
+            f"({hit_rate:.0%} hit rate), "
+            f"{totals['output_tokens']} output tokens"
+        )
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import logging
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+from pydantic import RootModel
+
+import minddb
+import minddb.llm.cache
+import minddb.llm.latency
+import minddb.llm.metrics
+import minddb.llm.ratelimit
+import minddb.llm.retries
+import minddb.llm.usage
+import minddb.storage
+from minddb.llm.backends import FakeBackend, get_backend, lognormal, \
+    set_backend
+from . import dedupe
+from .notes import Notes, QuizQuestion
+from .processor import Processor
+from .review import RevisedQuizQuestion, RevisedQuizQuestionGroup
+from .summary import LectureTopics
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages reported with their latencies
+STAGES = ('summary', 'notes', 'review', 'storage')
+
+# Questions generated per notes request
+QUESTIONS_PER_REQUEST = 10
+
+# Sections per synthetic transcript
+SECTIONS = 5
+
+# Vocabulary of the synthetic transcripts
+WORDS = 2000
+
+
+def _rng(*parts):
+    """Create a random generator seeded by the given values."""
+    seed = hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+    return random.Random(seed)
+
+
+def _vocabulary(seed):
+    """Create a vocabulary of made up words."""
+    rng = _rng('vocabulary', seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(5, 10)))
+            for _ in range(WORDS)]
+
+
+def _phrase(rng, vocabulary, words):
+    return ' '.join(rng.choice(vocabulary) for _ in range(words))
+
+
+def write_library(path, transcripts, tokens, seed=0):
+    """Write a library of synthetic transcripts.
+
+    Args:
+        path: Directory of the library, created if needed
+        transcripts: Number of transcript files
+        tokens: Approximate tokens per transcript
+        seed: Seed of the generated text (default: 0)
+
+    Returns:
+        Path: Directory of the library
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    vocabulary = _vocabulary(seed)
+    # About 8 characters, or 2 tokens, per word
+    words = max(1, tokens // 2 // SECTIONS)
+    for i in range(transcripts):
+        rng = _rng('transcript', seed, path.name, i)
+        sections = [f"## {_phrase(rng, vocabulary, 3).title()}\n\n"
+                    f"{_phrase(rng, vocabulary, words)}"
+                    for _ in range(SECTIONS)]
+        (path / f"lecture_{i:04d}.md").write_text('\n\n'.join(sections))
+    return path
+
+
+def _question(rng, number, words):
+    options = [_phrase(rng, words, 4) for _ in range(4)]
+    return QuizQuestion(
+        number=number,
+        question_text=f"What does {_phrase(rng, words, 6)} mean?",
+        options=[{'letter': letter, 'text': text}
+                 for letter, text in zip('abcd', options)],
+        correct_answer=rng.choice('abcd'),
+        explanation=f"The lecture explains {_phrase(rng, words, 12)}.",
+    )
+
+
+def respond(response_model, context):
+    """Generate a plausible response for the requests of the pipeline.
+
+    Args:
+        response_model: Pydantic model of the response
+        context: Template variables of the request
+
+    Returns:
+        BaseModel: Instance of response_model
+    """
+    rng = _rng(response_model.__name__, sorted(
+        (k, str(v)) for k, v in context.items()))
+    text = str(context.get('transcript') or context.get('summary') or '')
+    words = text.split() or ['lecture']
+
+    if response_model is LectureTopics:
+        return LectureTopics(
+            lecture_topic=_phrase(rng, words, 5),
+            key_concepts=[_phrase(rng, words, 3) for _ in range(5)],
+            case_studies_examples=[_phrase(rng, words, 6) for _ in range(2)],
+            methodologies_metrics=[_phrase(rng, words, 4) for _ in range(3)],
+            practical_recommendations=[_phrase(rng, words, 8)
+                                       for _ in range(3)],
+        )
+    if response_model is Notes:
+        return Notes(questions=[_question(rng, i + 1, words)
+                                for i in range(QUESTIONS_PER_REQUEST)])
+    if issubclass(response_model, RootModel):
+        # Streamed notes, a list of questions
+        return response_model([_question(rng, i + 1, words)
+                               for i in range(QUESTIONS_PER_REQUEST)])
+    if response_model is RevisedQuizQuestion:
+        return _revised(context['quiz_question'])
+    if response_model is RevisedQuizQuestionGroup:
+        return RevisedQuizQuestionGroup(reviews=[
+            {'number': i + 1, 'review': _revised(question)}
+            for i, question in enumerate(context['quiz_questions'])
+        ])
+    raise ValueError(f"No fake response for {response_model.__name__}")
+
+
+def _revised(question):
+    return RevisedQuizQuestion(
+        review_result='satisfactory',
+        justification_for_changes='None',
+        revised_quiz_question=question.model_dump(),
+    )
+
+
+def _peak_memory():
+    """Get the peak resident memory of the process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _reset():
+    """Drop the process wide state the LLM calls and decks build up."""
+    minddb.llm.latency.reset()
+    minddb.llm.retries.reset()
+    minddb.llm.metrics.reset()
+    minddb.llm.usage.reset()
+    minddb.llm.ratelimit.reset()
+    dedupe.reset()
+
+
+def _stages():
+    """Get the calls and latencies of each stage from the metrics."""
+    stages = {}
+    for stage in STAGES:
+        histogram = minddb.llm.metrics.get_histogram(
+            'minddb_call_duration_seconds', stage=stage)
+        if histogram is None:
+            continue
+        _, total, count = histogram
+        stages[stage] = {
+            'calls': count,
+            'seconds': total,
+            'p50': minddb.llm.metrics.quantile(
+                'minddb_call_duration_seconds', 0.5, stage=stage),
+            'p95': minddb.llm.metrics.quantile(
+                'minddb_call_duration_seconds', 0.95, stage=stage),
+        }
+    return stages
+
+
+def _version():
+    try:
+        return metadata.version('minddb')
+    except metadata.PackageNotFoundError:
+        return None
+
+
+async def run(transcripts=10, decks=1, transcript_tokens=4000, latency=1.0,
+              latency_sigma=0.5, requests_per_minute=None, time_scale=1.0,
+              seed=0, hedge=False, **options):
+    """Benchmark Processor.create on synthetic libraries with a fake LLM.
+
+    The decks are created in a temporary catalog, and the latencies, rate
+    limiters and other state of the LLM calls are reset afterwards. Peak
+    memory is that of the process, so measure in a process of its own.
+
+    Args:
+        transcripts: Transcripts per deck (default: 10)
+        decks: Number of decks created one after the other (default: 1)
+        transcript_tokens: Approximate tokens per transcript (default: 4000)
+        latency: Median latency of the fake LLM in seconds (default: 1.0)
+        latency_sigma: Spread of the log-normal latency (default: 0.5)
+        requests_per_minute: Simulated request rate limit (optional)
+        time_scale: Factor applied to the simulated latencies and rate
+                    limit window (default: 1.0)
+        seed: Seed of the transcripts and latencies (default: 0)
+        hedge: Hedge slow review requests (default: False)
+        options: Keyword arguments passed on to Processor.create, e.g.
+                 per_transcript
+
+    Returns:
+        dict: Configuration, environment and results of the benchmark
+    """
+    config = dict(transcripts=transcripts, decks=decks,
+                  transcript_tokens=transcript_tokens, latency=latency,
+                  latency_sigma=latency_sigma,
+                  requests_per_minute=requests_per_minute,
+                  time_scale=time_scale, seed=seed, hedge=hedge,
+                  options=options)
+
+    previous_backend = get_backend()
+    cache_enabled = minddb.llm.cache.ENABLED
+    hedging = minddb.llm.latency.HEDGING
+    set_backend(FakeBackend(respond,
+                            latency=lognormal(latency, latency_sigma),
+                            requests_per_minute=requests_per_minute,
+                            time_scale=time_scale, seed=seed))
+    minddb.llm.cache.ENABLED = False
+    minddb.llm.latency.HEDGING = hedge
+    _reset()
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # A catalog of its own, the configured catalog stays as it is
+            catalog = minddb.storage.DBStorage(tmp, 'benchmark')
+            try:
+                with minddb.storage.use_catalog(catalog):
+                    # Keep the one-off client import out of the measurement
+                    minddb.async_client()
+                    start = time.monotonic()
+                    for i in range(decks):
+                        library = write_library(
+                            Path(tmp) / f'library_{i}', transcripts,
+                            transcript_tokens, seed)
+                        await Processor(library).create(f'Benchmark {i}',
+                                                        **options)
+                    elapsed = time.monotonic() - start
+            finally:
+                catalog.close()
+        stages = _stages()
+        notes = int(minddb.llm.metrics.get_counter('minddb_notes',
+                                                   stage='storage'))
+    finally:
+        set_backend(previous_backend)
+        minddb.llm.cache.ENABLED = cache_enabled
+        minddb.llm.latency.HEDGING = hedging
+        _reset()
+
+    return {
+        'config': config,
+        'environment': {
+            'minddb': _version(),
+            'python': platform.python_version(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        },
+        'results': {
+            'elapsed_seconds': elapsed,
+            'decks_per_hour': decks / elapsed * 3600 if elapsed else None,
+            'notes': notes,
+            'notes_per_second': notes / elapsed if elapsed else None,
+            'peak_memory_bytes': _peak_memory(),
+            'sqlite_write_seconds': stages.get('storage', {}).get('seconds',
+                                                                  0.0),
+            'stages': stages,
+        },
+    }
+
+
+def save(result, path):
+    """Save a benchmark result as JSON.
+
+    Args:
+        result: Result of run
+        path: Path of the JSON file
+    """
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    logger.info(f"Saved benchmark result to {path}")
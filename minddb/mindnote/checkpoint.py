@@ -0,0 +1,126 @@
+import hashlib
+import logging
+
+import minddb.storage
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """Persists the output of each pipeline stage under a run ID.
+
+    Stage outputs are pydantic models or strings stored in the catalog, so
+    an interrupted run can pick up where it stopped.
+    """
+    def __init__(self, run_id):
+        """Initialize the checkpoint.
+
+        Args:
+            run_id: ID of the run in the catalog
+        """
+        self.run_id = run_id
+
+    @classmethod
+    def start(cls, deck_id, transcript, resume=False):
+        """Start a run for a transcript, or resume an unfinished one.
+
+        An unfinished run that already stored notes is always resumed, as
+        a new run would store its notes a second time.
+
+        Args:
+            deck_id: ID of the deck
+            transcript: Transcript the run creates notes for
+            resume: Resume the latest unfinished run for the same deck and
+                    transcript if there is one (default: False)
+
+        Returns:
+            Checkpoint: Checkpoint of the run
+        """
+        catalog = minddb.storage.get_catalog()
+        input_hash = hashlib.sha256(transcript.encode('utf-8')).hexdigest()
+
+        run = catalog.get_unfinished_run(deck_id, input_hash)
+        if run is not None:
+            if resume:
+                logger.info(f"Resuming run {run.id}")
+                return cls(run.id)
+            stored = len(catalog.get_checkpoints(run.id, 'review'))
+            if stored:
+                logger.info(f"Resuming run {run.id}, which already stored "
+                            f"{stored} notes")
+                return cls(run.id)
+        elif resume:
+            logger.info("No unfinished run found, starting a new run")
+
+        run_id = catalog.insert_run(deck_id, input_hash)
+        logger.info(f"Started run {run_id}")
+        return cls(run_id)
+
+    def load(self, stage, model=None):
+        """Load the output of a stage.
+
+        Args:
+            stage: Name of the stage
+            model: Pydantic model to validate the output with (default: the
+                   output is a string)
+
+        Returns:
+            The output of the stage, None if there is no checkpoint
+        """
+        data = self.load_items(stage, model).get(0)
+        if data is not None:
+            logger.info(f"Using {stage} checkpoint of run {self.run_id}")
+        return data
+
+    def save(self, stage, output):
+        """Save the output of a stage.
+
+        Args:
+            stage: Name of the stage
+            output: Pydantic model instance or string
+        """
+        self.save_item(stage, 0, output)
+
+    def load_items(self, stage, model=None):
+        """Load the outputs of a stage with several items.
+
+        Args:
+            stage: Name of the stage
+            model: Pydantic model to validate the outputs with (default: the
+                   outputs are strings)
+
+        Returns:
+            dict: Item index to output
+        """
+        catalog = minddb.storage.get_catalog()
+        items = catalog.get_checkpoints(self.run_id, stage)
+        if model is None:
+            return items
+        return {i: model.model_validate_json(data)
+                for i, data in items.items()}
+
+    def save_item(self, stage, item, output):
+        """Save one output of a stage with several items.
+
+        Args:
+            stage: Name of the stage
+            item: Index of the item
+            output: Pydantic model instance or string
+        """
+        if not isinstance(output, str):
+            output = output.model_dump_json()
+        catalog = minddb.storage.get_catalog()
+        catalog.save_checkpoint(self.run_id, stage, output, item=item)
+
+    def clear(self, stage):
+        """Delete the outputs of a stage.
+
+        Args:
+            stage: Name of the stage
+        """
+        minddb.storage.get_catalog().delete_checkpoints(self.run_id, stage)
+
+    def complete(self):
+        """Mark the run as completed and drop its checkpoints."""
+        minddb.storage.get_catalog().complete_run(self.run_id)
+        logger.info(f"Completed run {self.run_id}")
@@ -0,0 +1,339 @@
+import hashlib
+import itertools
+import logging
+import random
+import re
+import struct
+from collections import defaultdict
+
+import minddb.llm.metrics
+import minddb.storage
+
+logger = logging.getLogger(__name__)
+
+# Number of hash functions in a MinHash signature
+NUM_PERM = 128
+
+# Number of LSH bands, each covering NUM_PERM // BANDS signature rows. With
+# 16 bands of 8 rows, pairs above a similarity of about 0.7 become candidates
+BANDS = 16
+
+# Estimated Jaccard similarity above which two questions are duplicates
+THRESHOLD = 0.8
+
+# Length of the character shingles
+SHINGLE_SIZE = 5
+
+# Seed of the hash functions, fixed so signatures are comparable across runs
+SEED = 1
+
+_PRIME = (1 << 61) - 1
+
+# MinHash indexes per catalog and deck ID
+_indexes = {}
+
+# Keys of generated questions added to the indexes
+_draft_ids = itertools.count()
+
+
+def _shingles(text):
+    """Get the character shingles of normalized text."""
+    text = ' '.join(re.findall(r'\w+', text.lower()))
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE]
+            for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _hash(shingle):
+    """Hash a shingle to a 64 bit integer."""
+    digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class MinHashIndex:
+    """Locality sensitive hashing index of MinHash signatures.
+
+    Lookups only compare a question with the questions sharing at least one
+    band of its signature, so they stay fast as the index grows.
+    """
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD):
+        """Initialize the index.
+
+        Args:
+            num_perm: Number of hash functions per signature
+                      (default: NUM_PERM)
+            bands: Number of LSH bands, has to divide num_perm
+                   (default: BANDS)
+            threshold: Estimated similarity above which texts are
+                       duplicates (default: THRESHOLD)
+
+        Raises:
+            ValueError: If bands does not divide num_perm
+        """
+        if num_perm % bands:
+            raise ValueError(f"{bands} bands do not divide {num_perm} rows")
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        rng = random.Random(SEED)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME))
+                       for _ in range(num_perm)]
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, text):
+        """Compute the MinHash signature of a text.
+
+        Args:
+            text: Text to sign
+
+        Returns:
+            tuple: Minimum hash value per hash function
+        """
+        hashes = [_hash(shingle) for shingle in _shingles(text)]
+        return tuple(min((a * h + b) % _PRIME for h in hashes)
+                     for a, b in self._perms)
+
+    def _bands(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, key, text):
+        """Add a text to the index.
+
+        Args:
+            key: Identifier of the text
+            text: Text to index
+        """
+        self.add_signature(key, self.signature(text))
+
+    def add_signature(self, key, signature):
+        """Add the signature of a text to the index.
+
+        Args:
+            key: Identifier of the text
+            signature: MinHash signature of the text, see signature
+        """
+        self._signatures[key] = signature
+        for band, rows in self._bands(signature):
+            self._buckets[band][rows].append(key)
+
+    def query(self, text):
+        """Find indexed texts similar to a text.
+
+        Args:
+            text: Text to look up
+
+        Returns:
+            list: Keys of the texts with an estimated similarity of at least
+                  the threshold
+        """
+        signature = self.signature(text)
+        candidates = set()
+        for band, rows in self._bands(signature):
+            candidates.update(self._buckets[band].get(rows, ()))
+
+        matches = []
+        for key in candidates:
+            other = self._signatures[key]
+            similarity = sum(a == b for a, b in zip(signature, other)) \
+                / len(signature)
+            if similarity >= self.threshold:
+                matches.append(key)
+        return matches
+
+    def add_unique(self, key, text):
+        """Add a text unless a similar text is already indexed.
+
+        Args:
+            key: Identifier of the text
+            text: Text to index
+
+        Returns:
+            bool: True if the text was added, False if it is a duplicate
+        """
+        matches = self.query(text)
+        if matches:
+            logger.debug(f"Dropping near-duplicate of {matches[0]}: {text}")
+            return False
+        self.add(key, text)
+        return True
+
+    def remove(self, key):
+        """Remove a text from the index.
+
+        Args:
+            key: Identifier of the text
+        """
+        signature = self._signatures.pop(key)
+        for band, rows in self._bands(signature):
+            bucket = self._buckets[band][rows]
+            bucket.remove(key)
+            if not bucket:
+                del self._buckets[band][rows]
+
+
+class Drafts:
+    """Generated questions of a run added to the index of their deck.
+
+    Drafts are indexed as they are selected, so later drafts are compared
+    with them. Drafts that are not kept, because their review dropped them
+    or the run failed, are removed from the index on release, so they do
+    not hide questions of later runs.
+
+    Example:
+    >>> drafts = Drafts(index)
+    >>> selected = unique(questions, drafts)
+    >>> drafts.keep(0)
+    >>> drafts.release()
+    """
+    def __init__(self, index):
+        """Initialize the drafts.
+
+        Args:
+            index: MinHashIndex of the deck
+        """
+        self.index = index
+        self.keys = []
+        self._kept = set()
+
+    def add_unique(self, key, text):
+        """Add a draft unless a similar text is already indexed.
+
+        Args:
+            key: Identifier of the draft
+            text: Question of the draft
+
+        Returns:
+            bool: True if the draft was added, False if it is a duplicate
+        """
+        added = self.index.add_unique(key, text)
+        if added:
+            self.keys.append(key)
+        return added
+
+    def keep(self, selected):
+        """Keep a draft in the index, e.g. once its note is stored.
+
+        Args:
+            selected: Position of the draft among the added drafts
+        """
+        self._kept.add(selected)
+
+    def release(self):
+        """Remove the drafts that were not kept from the index."""
+        dropped = [key for i, key in enumerate(self.keys)
+                   if i not in self._kept]
+        for key in dropped:
+            self.index.remove(key)
+        if dropped:
+            logger.debug(f"Removed {len(dropped)} dropped drafts from the "
+                         f"index")
+        self.keys = []
+        self._kept = set()
+
+
+def _pack(signature):
+    """Encode a signature to store it in the catalog."""
+    return struct.pack(f'<{len(signature)}Q', *signature)
+
+
+def _unpack(data):
+    """Decode a stored signature, None if there is none."""
+    if data is None:
+        return None
+    return struct.unpack(f'<{len(data) // 8}Q', data)
+
+
+def get_index(deck_id):
+    """Get the index of a deck, built from its stored notes on first use.
+
+    The signatures of the notes are stored in the catalog, so each note is
+    only signed once.
+
+    Args:
+        deck_id: ID of the deck
+
+    Returns:
+        MinHashIndex: Index of the questions of the deck
+    """
+    catalog = minddb.storage.get_catalog()
+    key = (catalog.db_name, deck_id)
+    if key not in _indexes:
+        index = MinHashIndex()
+        stored = catalog.get_note_signatures(deck_id)
+        signed = {}
+        for note in catalog.get_notes_by_deck_id(deck_id):
+            signature = _unpack(stored.get(note.id))
+            if signature is None or len(signature) != NUM_PERM:
+                signature = index.signature(note.question)
+                signed[note.id] = _pack(signature)
+            index.add_signature(('note', note.id), signature)
+        if signed:
+            # Sign each stored note once, not once per process
+            catalog.insert_note_signatures(signed)
+        logger.info(f"Indexed {len(index)} stored questions of deck "
+                    f"{deck_id}")
+        _indexes[key] = index
+    return _indexes[key]
+
+
+def reset():
+    """Drop the indexes of all decks."""
+    _indexes.clear()
+
+
+def discard(deck_id):
+    """Drop the index of a deck of the catalog, so its next use indexes the
+    notes stored by then.
+
+    Args:
+        deck_id: ID of the deck
+    """
+    catalog = minddb.storage.get_catalog()
+    _indexes.pop((catalog.db_name, deck_id), None)
+
+
+def unique(questions, index):
+    """Select the questions that are not near-duplicates.
+
+    Questions are compared with the indexed questions and with each other.
+    Selected questions are added to the index.
+
+    Args:
+        questions: List of QuizQuestion
+        index: MinHashIndex of the deck, or Drafts of the run
+
+    Returns:
+        list[int]: Indices of the selected questions
+    """
+    selected = [i for i, question in enumerate(questions)
+                if index.add_unique(('draft', next(_draft_ids)),
+                                    question.question_text)]
+    dropped = len(questions) - len(selected)
+    if dropped:
+        logger.info(f"Dropped {dropped} near-duplicate questions")
+        minddb.llm.metrics.inc('minddb_duplicates', dropped)
+    return selected
+
+
+async def aunique(questions, index):
+    """Yield the questions of an async iterator that are not near-duplicates.
+
+    Args:
+        questions: Async iterator of QuizQuestion
+        index: MinHashIndex of the deck, or Drafts of the run
+
+    Yields:
+        QuizQuestion: Questions that are not near-duplicates
+    """
+    async for question in questions:
+        if index.add_unique(('draft', next(_draft_ids)),
+                            question.question_text):
+            yield question
+        else:
+            minddb.llm.metrics.inc('minddb_duplicates')
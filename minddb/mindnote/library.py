@@ -7,15 +7,18 @@ logger = logging.getLogger(__name__)
 
 
 class Library:
-    def __init__(self, path):
+    def __init__(self, path, filenames=None):
         """
         Initialize a Library object.
 
         Args:
             path: Path to the library directory, holding the transcripts, etc.
                  Can be absolute or relative path.
+            filenames: Only consider these files of the directory, so other
+                       files are neither read nor hashed (default: all files)
         """
         self._path = Path(path).resolve()  # Convert to absolute path
+        self._filenames = None if filenames is None else set(filenames)
         self._unlinked_transcripts = []
         self._mime_types = ['.txt', '.md']
 
@@ -34,6 +37,7 @@ class Library:
 
         files = [
             f for f in self._path.iterdir() if f.suffix in self._mime_types
+            and (self._filenames is None or f.name in self._filenames)
         ]
         files.sort()
 
@@ -62,14 +66,23 @@ class Library:
 
         return unprocessed_files
 
-    def link_transcripts(self):
-        """Link processed transcripts to the deck."""
+    def link_transcripts(self, filenames=None):
+        """Link processed transcripts to the deck.
+
+        Args:
+            filenames: Names of the files to link (default: all unlinked
+                       transcripts)
+        """
         catalog = minddb.storage.get_catalog()
+        unlinked = []
         for file in self._unlinked_transcripts:
+            if filenames is not None and file['filename'] not in filenames:
+                unlinked.append(file)
+                continue
             transcript_id = catalog.get_or_insert_transcript(**file)
             catalog.link_transcript_to_deck(file['deck_id'], transcript_id)
 
-        self._unlinked_transcripts = []
+        self._unlinked_transcripts = unlinked
 
     def get_transcript(self, deck):
         """
@@ -87,16 +100,38 @@ class Library:
                         was available
         """
 
-        transcript = []
-
-        for file_path in self._get_files(deck):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if content:  # Only add non-empty content
-                    transcript.append(f"# {file_path.name}\n\n{content}")
+        transcript = [
+            content for _, content in self.get_transcripts(deck) if content
+        ]
 
         if not transcript:
             logger.warning(f"No unprocessed content found for deck: {deck}")
             return None
 
         return "\n\n".join(transcript)
+
+    def get_transcripts(self, deck):
+        """
+        Get the unprocessed transcripts for a given deck, one per file.
+
+        Args:
+            deck: Name of the deck
+
+        Returns:
+            list[tuple[str, str]]: (filename, transcript) pairs in file
+                                   order. The transcript is empty if the
+                                   file has no content.
+
+        Raises:
+            ValueError: If no valid files found
+        """
+        transcripts = []
+
+        for file_path in self._get_files(deck):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+                if content:
+                    content = f"# {file_path.name}\n\n{content}"
+                transcripts.append((file_path.name, content))
+
+        return transcripts
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import tomllib
+from typing import Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, PositiveInt
+
+import minddb.storage
+from .processor import MAX_JOBS, Processor
+
+logger = logging.getLogger(__name__)
+
+# Number of decks created at the same time
+MAX_DECKS = 2
+
+
+class DeckEntry(BaseModel):
+    """Model representing a deck to create from a library of transcripts.
+
+    Option names and defaults follow the flags of the create command.
+    """
+    model_config = ConfigDict(extra='forbid')
+
+    library: str
+    deck: str
+    catalog: Optional[str] = None
+    catalog_path: str = '.'
+    per_transcript: bool = False
+    jobs: PositiveInt = MAX_JOBS
+    pack_tokens: Optional[int] = None
+    chunk_tokens: Optional[int] = None
+    batch_review: bool = False
+    review_group: int = 1
+    stream: bool = False
+    triage: Literal['full', 'fast', 'skip'] = 'full'
+    fan_out: Optional[Union[Literal['fields'], PositiveInt]] = None
+    dedupe: bool = True
+    resume: bool = False
+
+    def options(self):
+        """Get the keyword arguments of Processor.create for the deck.
+
+        Returns:
+            dict: Options of the deck
+        """
+        return dict(per_transcript=self.per_transcript, max_jobs=self.jobs,
+                    pack_tokens=self.pack_tokens, resume=self.resume,
+                    dedupe=self.dedupe, chunk_tokens=self.chunk_tokens,
+                    batch_review=self.batch_review,
+                    review_group=self.review_group, stream=self.stream,
+                    triage=self.triage, fan_out=self.fan_out)
+
+
+# Options holding paths, relative to the manifest or the working directory
+PATHS = ('library', 'catalog_path')
+
+
+def _resolve(options, base):
+    """Resolve the relative paths of options against a directory."""
+    return {name: os.path.join(base, value)
+            if name in PATHS and isinstance(value, str) else value
+            for name, value in options.items()}
+
+
+def load(path, options=None):
+    """Load the decks of a TOML manifest.
+
+    The manifest lists the decks as [[decks]] tables. Options of a deck
+    take precedence over the given options, e.g. from the command line,
+    which take precedence over the [defaults] table. Relative library and
+    catalog paths of the manifest are relative to the manifest, those of
+    the given options to the working directory.
+
+    Example manifest:
+
+        [defaults]
+        catalog = "Semester"
+        per_transcript = true
+
+        [[decks]]
+        library = "lectures/statistics"
+        deck = "Statistics"
+
+    Args:
+        path: Path of the manifest
+        options: Options set on the command line, applying to decks that do
+                 not set them (optional)
+
+    Returns:
+        list[DeckEntry]: Decks in manifest order
+
+    Raises:
+        ValueError: If the manifest lists no decks or an entry is invalid
+    """
+    with open(path, 'rb') as f:
+        manifest = tomllib.load(f)
+
+    decks = manifest.get('decks', [])
+    if not decks:
+        raise ValueError(f"No [[decks]] found in manifest {path}")
+
+    base = os.path.dirname(os.path.abspath(path))
+    shared = {**_resolve(manifest.get('defaults', {}), base),
+              **_resolve(options or {}, os.getcwd())}
+    entries = []
+    for deck in decks:
+        entry = DeckEntry.model_validate({**shared, **_resolve(deck, base)})
+        # The default catalog path is the directory of the manifest too
+        entry.catalog_path = os.path.join(base, entry.catalog_path)
+        entries.append(entry)
+
+    logger.info(f"Loaded {len(entries)} decks from manifest {path}")
+    return entries
+
+
+def open_catalogs(entries):
+    """Open the catalogs of the decks, one connection per catalog.
+
+    Args:
+        entries: List of DeckEntry with the catalog name set
+
+    Returns:
+        list[DBStorage]: Catalog of each deck, shared by decks of the same
+                         catalog
+
+    Raises:
+        ValueError: If the same deck of a catalog is listed twice
+    """
+    keys = [(os.path.abspath(entry.catalog_path), entry.catalog, entry.deck)
+            for entry in entries]
+    duplicates = {key for key in keys if keys.count(key) > 1}
+    if duplicates:
+        names = ', '.join(sorted(deck for _, _, deck in duplicates))
+        raise ValueError(f"Decks listed more than once: {names}")
+
+    catalogs = {}
+    for path, name, _ in keys:
+        if (path, name) not in catalogs:
+            catalogs[path, name] = minddb.storage.DBStorage(path, name)
+    return [catalogs[path, name] for path, name, _ in keys]
+
+
+async def create_all(entries, max_decks=MAX_DECKS):
+    """Create the decks of a manifest in one process.
+
+    Decks share the API clients, the rate limiter and one connection per
+    catalog. A failing deck does not stop the others.
+
+    Args:
+        entries: List of DeckEntry with the catalog name set
+        max_decks: Number of decks created at the same time
+                   (default: MAX_DECKS)
+
+    Raises:
+        ValueError: If the same deck of a catalog is listed twice
+        Exception: The first error of a failed deck, once all decks are done
+    """
+    catalogs = open_catalogs(entries)
+    semaphore = asyncio.Semaphore(max_decks)
+
+    async def create(entry, catalog):
+        async with semaphore:
+            logger.info(f"Creating deck {entry.deck} from {entry.library}")
+            with minddb.storage.use_catalog(catalog):
+                processor = Processor(entry.library)
+                await processor.create(entry.deck, **entry.options())
+
+    try:
+        results = await asyncio.gather(
+            *[create(entry, catalog)
+              for entry, catalog in zip(entries, catalogs)],
+            return_exceptions=True
+        )
+    finally:
+        for catalog in set(catalogs):
+            catalog.close()
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    for entry, result in zip(entries, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to create deck {entry.deck}: {result}")
+    if errors:
+        raise errors[0]
@@ -1,15 +1,29 @@
-import asyncio
+import inspect
 import logging
 from typing import List, Literal
 from pydantic import BaseModel, Field
 
-import minddb
+import minddb.llm
+import minddb.llm.messages
+import minddb.llm.metrics
+import minddb.llm.stages
+import minddb.mindnote.dedupe
 import minddb.mindnote.summary
 import minddb.mindnote.review
+from minddb.llm.concurrency import gather
 
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the generated notes, or for the next streamed note
+TIMEOUT = 900
+
+# Output tokens of the request generating the notes
+MAX_TOKENS = 32768
+
+# Output tokens of each request generating the notes of a group of topics
+FAN_OUT_MAX_TOKENS = 8192
+
 
 class QuizOption(BaseModel):
     """Represents a single multiple-choice option in a quiz question."""
@@ -118,32 +132,271 @@ d) [Plausible but incorrect option]
 
 Now, using ONLY the provided input information, please generate a comprehensive
 set of quiz questions following these guidelines.
+    """
+
 
-## Lecture
-{{transcript}}
+def messages():
+    """Get the messages for question generation.
+
+    The transcript comes first and closes a cacheable prefix, shared by the
+    generation requests of the same transcript, e.g. with fan_out. Topic
+    extraction responds with another tool, which precedes the messages in
+    the prefix, so it does not share it.
     """
+    return [{
+        "role": "user",
+        "content": [
+            minddb.llm.messages.cached("# Lecture Transcript\n\n"
+                                       "{{transcript}}"),
+            minddb.llm.messages.text(prompt()),
+        ]
+    }]
+
 
+async def generate(transcript, summary, max_tokens=None):
+    """Generate the notes for the topics of a summary in one request.
 
-async def get_notes(transcript):
-    summary = minddb.mindnote.summary.get_summary(transcript)
+    Args:
+        transcript: Transcript of the lecture
+        summary: Markdown summary of the topics to cover
+        max_tokens: Output tokens of the request (default: max_tokens of
+                    the notes stage, or MAX_TOKENS)
 
-    client, model = minddb.client()
-    notes = client.messages.create(
-        model=model,
-        max_tokens=32768,
-        messages=[{
-            "role": "user",
-            "content": prompt()
-        }],
+    Returns:
+        Notes: Generated notes
+    """
+    settings = minddb.llm.stages.get('notes')
+    return await minddb.llm.acreate(
+        max_tokens=max_tokens or settings.max_tokens or MAX_TOKENS,
+        messages=messages(),
         response_model=Notes,
         context={
             'transcript': transcript,
             'summary': summary,
         },
-        max_retries=2
+        max_retries=2,
+        timeout=settings.timeout or TIMEOUT,
+        stage='notes'
     )
-    # Wait for 1 minute
-    logger.info("Waiting for 1 minute...")
-    await asyncio.sleep(60)
-    logger.info("Continuing...")
-    return await minddb.mindnote.review.notes(notes.questions, summary)
+
+
+async def get_draft(transcript, summary, fan_out=None):
+    """Generate the notes, optionally fanning out over groups of topics.
+
+    With fan_out, the topics of the summary are split into groups whose
+    notes are generated concurrently with a smaller output budget each.
+    The transcript prefix of the requests is shared, so it is cached once.
+    The notes of the groups are merged and renumbered in summary order.
+
+    Args:
+        transcript: Transcript of the lecture
+        summary: Markdown summary of the key topics
+        fan_out: 'fields' for one request per topic list, or the number of
+                 topics per request (default: one request for all topics)
+
+    Returns:
+        Notes: Generated notes
+    """
+    if not fan_out:
+        return await generate(transcript, summary)
+
+    topics = minddb.mindnote.summary.parse_summary(summary)
+    groups = minddb.mindnote.summary.split_topics(
+        topics, None if fan_out == 'fields' else fan_out)
+    logger.info(f"Generating notes for {len(groups)} groups of topics...")
+
+    settings = minddb.llm.stages.get('notes')
+    max_tokens = min(FAN_OUT_MAX_TOKENS,
+                     settings.max_tokens or FAN_OUT_MAX_TOKENS)
+    drafts = await gather(*[
+        generate(transcript, minddb.mindnote.summary.format_summary(group),
+                 max_tokens=max_tokens)
+        for group in groups
+    ], limit=settings.concurrency)
+    questions = [question for draft in drafts for question in draft.questions]
+    for number, question in enumerate(questions, 1):
+        question.number = number
+    return Notes(questions=questions)
+
+
+async def get_notes(transcript, chunk_tokens=None, batch_review=False,
+                    review_group=1, stream=False, checkpoint=None,
+                    on_review=None, triage='full', index=None,
+                    sections=None, fan_out=None):
+    """Summarize a transcript, generate the notes and review them.
+
+    Args:
+        transcript: Transcript of the lecture
+        chunk_tokens: Summarize the transcript in chunks of about this many
+                      tokens (optional)
+        batch_review: Review the notes with the Message Batches API,
+                      cannot be combined with stream (default: False)
+        review_group: Number of notes reviewed per request, cannot be
+                      combined with stream (default: 1)
+        stream: Review the notes while they are generated (default: False)
+        checkpoint: Checkpoint the stage outputs are loaded from and saved
+                    to (optional)
+        on_review: Function or coroutine function called with the index and
+                   the review of each note, instead of saving the review to
+                   the checkpoint. Reviews loaded from the checkpoint are not
+                   reported again (optional)
+        triage: Review policy for notes passing the local checks, 'full',
+                'fast' or 'skip' (default: 'full')
+        index: MinHashIndex of the deck; generated questions similar to an
+               indexed question or to each other are dropped before review
+               (optional)
+        sections: Transcripts of the files making up the transcript, whose
+                  topics are cached and merged (optional)
+        fan_out: Generate the notes of each topic list ('fields') or of
+                 groups of this many topics in parallel requests, see
+                 get_draft. Cannot be combined with stream (optional)
+
+    Returns:
+        list[RevisedQuizQuestion]: Reviewed notes in the draft order, empty
+                                   if on_review is set as reported notes
+                                   are not kept
+
+    Raises:
+        ValueError: If stream is combined with fan_out, batch_review or
+                    review_group
+    """
+    if stream and fan_out:
+        raise ValueError("Notes cannot be streamed with fan_out")
+    if stream and (batch_review or review_group != 1):
+        # Streamed notes are reviewed one by one as they arrive
+        raise ValueError("Streamed notes cannot be reviewed in batches or "
+                         "groups")
+
+    summary = checkpoint.load('summary') if checkpoint else None
+    if summary is None:
+        summary = await minddb.mindnote.summary.get_summary(
+            transcript, chunk_tokens=chunk_tokens, sections=sections)
+        if checkpoint:
+            checkpoint.save('summary', summary)
+
+    draft = checkpoint.load('notes', Notes) if checkpoint else None
+    if checkpoint and draft is None:
+        drafts = checkpoint.load_items('drafts', QuizQuestion)
+        if drafts:
+            # Notes of the interrupted stream may be stored already, so
+            # generating again would store them twice
+            logger.warning(f"Generation of run {checkpoint.run_id} was "
+                           f"interrupted after {len(drafts)} notes, "
+                           f"reviewing those")
+            draft = Notes(questions=[drafts[i] for i in sorted(drafts)])
+            checkpoint.save('notes', draft)
+            checkpoint.clear('drafts')
+
+    # Notes reported to on_review are not kept, so memory stays flat while
+    # the caller stores them
+    keep = on_review is None
+    reviewed = {}
+    done = set()
+    if checkpoint:
+        if draft is None:
+            # Reviews of an earlier draft do not apply to a new one
+            checkpoint.clear('review')
+        else:
+            loaded = checkpoint.load_items(
+                'review', minddb.mindnote.review.RevisedQuizQuestion)
+            done = set(loaded)
+            if keep:
+                reviewed = loaded
+
+    async def report(index, revised):
+        if keep:
+            reviewed[index] = revised
+        if on_review is not None:
+            result = on_review(index, revised)
+            if inspect.isawaitable(result):
+                await result
+        elif checkpoint:
+            checkpoint.save_item('review', index, revised)
+
+    def results():
+        return [reviewed[i] for i in sorted(reviewed)]
+
+    # Drafts whose review dropped them or failed leave the index again
+    indexed = None if index is None else \
+        minddb.mindnote.dedupe.Drafts(index)
+    try:
+        if stream and draft is None:
+            settings = minddb.llm.stages.get('notes')
+            questions = minddb.llm.astream(
+                max_tokens=settings.max_tokens or MAX_TOKENS,
+                messages=messages(),
+                response_model=QuizQuestion,
+                context={
+                    'transcript': transcript,
+                    'summary': summary,
+                },
+                max_retries=2,
+                timeout=settings.timeout or TIMEOUT,
+                stage='notes'
+            )
+            on_stream_review = report
+            if indexed is not None:
+                questions = minddb.mindnote.dedupe.aunique(questions, indexed)
+
+                def keep_and_report(index, revised):
+                    indexed.keep(index)
+                    return report(index, revised)
+
+                on_stream_review = keep_and_report
+            if checkpoint is None:
+                await minddb.mindnote.review.stream(questions, summary,
+                                                    on_review=on_stream_review,
+                                                    triage=triage)
+                return results()
+
+            drafted = 0
+
+            async def drafting():
+                nonlocal drafted
+                async for question in questions:
+                    # Saved before its review, so a resumed run reviews the
+                    # same notes instead of generating new ones
+                    checkpoint.save_item('drafts', drafted, question)
+                    drafted += 1
+                    yield question
+
+            await minddb.mindnote.review.stream(drafting(), summary,
+                                                on_review=on_stream_review,
+                                                triage=triage)
+            minddb.llm.metrics.inc('minddb_notes', drafted, stage='notes')
+            drafts = checkpoint.load_items('drafts', QuizQuestion)
+            draft = Notes(questions=[drafts[i] for i in sorted(drafts)])
+            checkpoint.save('notes', draft)
+            checkpoint.clear('drafts')
+            return results()
+
+        if draft is None:
+            draft = await get_draft(transcript, summary, fan_out=fan_out)
+            minddb.llm.metrics.inc('minddb_notes', len(draft.questions),
+                                   stage='notes')
+            if checkpoint:
+                checkpoint.save('notes', draft)
+
+        pending = [i for i in range(len(draft.questions)) if i not in done]
+        if indexed is not None:
+            unique = minddb.mindnote.dedupe.unique(
+                [draft.questions[i] for i in pending], indexed)
+            pending = [pending[j] for j in unique]
+        if done:
+            logger.info(f"Using {len(done)} reviews from the checkpoint, "
+                        f"{len(pending)} left to review")
+
+        def on_pending_review(index, revised):
+            if indexed is not None:
+                indexed.keep(index)
+            return report(pending[index], revised)
+
+        if pending:
+            await minddb.mindnote.review.notes(
+                [draft.questions[i] for i in pending], summary,
+                batch=batch_review, group=review_group,
+                on_review=on_pending_review, triage=triage)
+        return results()
+    finally:
+        if indexed is not None:
+            indexed.release()
@@ -0,0 +1,90 @@
+import logging
+
+import minddb.tools
+from .notes import MAX_TOKENS
+from .summary import split_transcript
+
+logger = logging.getLogger(__name__)
+
+# Expected output tokens of the generated notes per transcript token
+OUTPUT_RATIO = 0.5
+
+
+def budget(max_input_tokens, max_output_tokens=MAX_TOKENS,
+           output_ratio=OUTPUT_RATIO):
+    """Get the transcript tokens that fit both token budgets of a request.
+
+    Args:
+        max_input_tokens: Input token budget per request
+        max_output_tokens: Output token budget per request
+                           (default: MAX_TOKENS)
+        output_ratio: Expected output tokens per transcript token
+                      (default: OUTPUT_RATIO)
+
+    Returns:
+        int: Transcript tokens per request
+    """
+    by_output = int(max_output_tokens / output_ratio) if output_ratio else \
+        max_input_tokens
+    return max(1, min(max_input_tokens, by_output))
+
+
+def pack(transcripts, max_input_tokens, max_output_tokens=MAX_TOKENS,
+         output_ratio=OUTPUT_RATIO):
+    """Pack transcripts into requests that fit the token budgets.
+
+    Transcripts larger than the budget are split at heading and paragraph
+    boundaries first. The pieces are then packed first fit decreasing, so
+    few requests are needed, and each pack keeps the original order.
+
+    Args:
+        transcripts: List of (filename, transcript) pairs
+        max_input_tokens: Input token budget per request
+        max_output_tokens: Output token budget per request
+                           (default: MAX_TOKENS)
+        output_ratio: Expected output tokens per transcript token
+                      (default: OUTPUT_RATIO)
+
+    Returns:
+        list[tuple[list[str], str]]: (filenames, transcript) per pack.
+                                     Empty transcripts are left out.
+    """
+    limit = budget(max_input_tokens, max_output_tokens, output_ratio)
+
+    pieces = []
+    for filename, transcript in transcripts:
+        if not transcript:
+            continue
+        parts = [transcript]
+        if minddb.tools.estimate_tokens(transcript) > limit:
+            parts = split_transcript(transcript, limit)
+            parts = [parts[0]] + [f"# {filename} (part {i + 2})\n\n{part}"
+                                  for i, part in enumerate(parts[1:])]
+        for part in parts:
+            pieces.append((len(pieces), filename, part,
+                           minddb.tools.estimate_tokens(part)))
+
+    packs = []
+    for piece in sorted(pieces, key=lambda p: p[3], reverse=True):
+        for group in packs:
+            if group['tokens'] + piece[3] <= limit:
+                break
+        else:
+            group = {'tokens': 0, 'pieces': []}
+            packs.append(group)
+        group['tokens'] += piece[3]
+        group['pieces'].append(piece)
+
+    result = []
+    for group in packs:
+        ordered = sorted(group['pieces'])
+        filenames = list(dict.fromkeys(filename for _, filename, _, _ in
+                                       ordered))
+        result.append((ordered[0][0], filenames,
+                       '\n\n'.join(part for _, _, part, _ in ordered)))
+        logger.debug(f"Pack of {group['tokens']} tokens: {filenames}")
+
+    logger.info(f"Packed {len(pieces)} transcript pieces into {len(result)} "
+                f"requests of at most {limit} tokens")
+    return [(filenames, transcript)
+            for _, filenames, transcript in sorted(result)]
@@ -1,52 +1,160 @@
+import asyncio
 import logging
+from collections import Counter
 
+import minddb.llm.usage
 import minddb.mindnote.prompts
+from .checkpoint import Checkpoint
+from .dedupe import get_index
 from .notes import get_notes
+from .packing import pack
+from .writer import NoteWriter
 
 logger = logging.getLogger(__name__)
 
+# Number of transcripts processed at the same time in per transcript mode
+MAX_JOBS = 4
+
 
 class Processor:
-    def __init__(self, library_path):
-        self._library = minddb.mindnote.Library(path=library_path)
+    def __init__(self, library_path, filenames=None):
+        self._library = minddb.mindnote.Library(path=library_path,
+                                                filenames=filenames)
 
-    async def create(self, deck_name):
+    async def create(self, deck_name, per_transcript=False, max_jobs=MAX_JOBS,
+                     resume=False, dedupe=True, pack_tokens=None, **options):
         """Create the notes
 
         Steps
         -----
         - Extract key topics
         - Create notes
+
+        Args:
+            deck_name: Name of the deck
+            per_transcript: Run a separate pipeline for each transcript file
+                            instead of one for all of them (default: False)
+            max_jobs: Number of transcripts or packs processed at the same
+                      time (default: MAX_JOBS)
+            resume: Pick up the stages an interrupted run already completed
+                    for the same transcript (default: False)
+            dedupe: Drop generated questions that are near-duplicates of
+                    each other or of notes already in the deck
+                    (default: True)
+            pack_tokens: Pack the transcript files into requests of about
+                         this many input tokens, splitting large files, and
+                         process each pack as its own job (optional)
+            options: Keyword arguments passed on to get_notes, e.g.
+                     chunk_tokens
         """
 
         logger.info(f"Creating notes for deck: {deck_name}. Bear with me...")
-        transcript = self._library.get_transcript(deck_name)
 
-        if transcript is None:
-            return
+        if dedupe:
+            deck = minddb.storage.get_catalog().get_or_create_deck(
+                name=deck_name)
+            options['index'] = get_index(deck.id)
+
+        try:
+            if pack_tokens:
+                transcripts = self._library.get_transcripts(deck_name)
+                # Files without content have nothing to pack
+                jobs = [([filename], '') for filename, transcript
+                        in transcripts if not transcript]
+                # Packed from the files read above, reading them again would
+                # hash them twice
+                jobs += pack(transcripts, pack_tokens)
+                await self._create_jobs(deck_name, jobs, max_jobs, resume,
+                                        options)
+                return
+
+            if per_transcript:
+                jobs = [([filename], transcript) for filename, transcript
+                        in self._library.get_transcripts(deck_name)]
+                await self._create_jobs(deck_name, jobs, max_jobs, resume,
+                                        options)
+                return
+
+            # The topics of each file are cached, so keep the files apart
+            sections = [
+                content for _, content
+                in self._library.get_transcripts(deck_name) if content
+            ]
+
+            if not sections:
+                logger.warning(f"No unprocessed content found for deck: "
+                               f"{deck_name}")
+                return
+
+            await self._process(deck_name, sections, resume, options)
+
+            self._library.link_transcripts()
+        finally:
+            minddb.llm.usage.log_usage()
 
-        notes = await get_notes(transcript)
+    async def _create_jobs(self, deck_name, jobs, max_jobs, resume,
+                           options):
+        """Process transcripts as independent jobs.
 
-        logger.info((f"Created {len(notes)} notes for deck: "
-                     f"{deck_name}"))
+        A transcript file is linked as soon as the notes of every job
+        containing a part of it are stored, so a failing job does not hold
+        back the others.
 
+        Args:
+            deck_name: Name of the deck
+            jobs: List of (filenames, transcript) pairs
+            max_jobs: Number of jobs processed at the same time
+            resume: Resume interrupted runs
+            options: Keyword arguments passed on to get_notes
+        """
+        semaphore = asyncio.Semaphore(max_jobs)
+        remaining = Counter(filename for filenames, _ in jobs
+                            for filename in filenames)
+
+        async def job(filenames, transcript):
+            if transcript:
+                async with semaphore:
+                    logger.info(f"Processing transcript: "
+                                f"{', '.join(filenames)}")
+                    await self._process(deck_name, [transcript], resume,
+                                        options)
+            for filename in filenames:
+                remaining[filename] -= 1
+                if not remaining[filename]:
+                    self._library.link_transcripts([filename])
+
+        results = await asyncio.gather(
+            *[job(filenames, transcript) for filenames, transcript in jobs],
+            return_exceptions=True
+        )
+
+        errors = [r for r in results if isinstance(r, Exception)]
+        for (filenames, _), result in zip(jobs, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to process {', '.join(filenames)}: "
+                             f"{result}")
+        if errors:
+            raise errors[0]
+
+    async def _process(self, deck_name, sections, resume, options):
+        """Create the notes for transcripts and store them in the deck.
+
+        The transcripts are combined into one, while their topics are
+        cached separately. Notes are stored as soon as they are reviewed,
+        along with their checkpoints. The run is completed once all notes
+        are stored.
+        """
+        transcript = "\n\n".join(sections)
         catalog = minddb.storage.get_catalog()
         deck = catalog.get_or_create_deck(name=deck_name)
         logger.debug(f"Deck ID: {deck.id}, deck name: {deck.name}")
 
-        for note in notes:
-            note_dict = note.to_dict()
-
-            # Convert Markdown bold to HTML bold in explanation
-            if 'explanation' in note_dict and note_dict['explanation']:
-                import re
-                # Find all occurrences of **word** and replace with <b>word</b>
-                note_dict['explanation'] = re.sub(
-                    r'\*\*([^*]+)\*\*',
-                    r'<b>\1</b>',
-                    note_dict['explanation']
-                )
+        checkpoint = Checkpoint.start(deck.id, transcript, resume=resume)
+        async with NoteWriter(deck.id, checkpoint=checkpoint) as writer:
+            await get_notes(transcript, sections=sections,
+                            checkpoint=checkpoint, on_review=writer.put,
+                            **options)
 
-            catalog.insert_note(**note_dict, deck_id=deck.id)
+        logger.info(f"Created {writer.written} notes for deck: {deck_name}")
 
-        self._library.link_transcripts()
+        checkpoint.complete()
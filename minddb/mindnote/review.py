@@ -1,10 +1,34 @@
-from typing import List, Literal
-from pydantic import BaseModel, Field
-from tqdm.asyncio import tqdm_asyncio
 import asyncio
-from tenacity import retry, stop_after_attempt, wait_fixed
+import inspect
+import logging
+from typing import List, Literal
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+import minddb.llm
+import minddb.llm.batches
+import minddb.llm.latency
+import minddb.llm.messages
+import minddb.llm.metrics
+import minddb.llm.stages
+import minddb.mindnote.triage
+import minddb.tools
+from minddb.llm.concurrency import AdaptiveLimiter, gather
+
+logger = logging.getLogger(__name__)
+
+# Ceiling for the number of concurrent review calls
+MAX_CONCURRENCY = 8
+
+# Seconds to wait for the review of a single question, the upper bound of
+# the timeout derived from the recent review latencies
+TIMEOUT = 30
+
+# Output tokens for the review of a single question
+REVIEW_MAX_TOKENS = 1000
 
-import minddb
+# Token budgets used to choose the number of questions per grouped request
+GROUP_INPUT_TOKENS = 20000
+GROUP_OUTPUT_TOKENS = 8000
 
 
 class QuizOption(BaseModel):
@@ -63,6 +87,42 @@ class RevisedQuizQuestion(BaseModel):
         }
 
 
+class NumberedReview(BaseModel):
+    """Review of one question of a group, identified by its number."""
+    number: int = Field(
+        description="The number of the reviewed question in the input"
+    )
+    review: RevisedQuizQuestion = Field(
+        description="The review of the question"
+    )
+
+
+class RevisedQuizQuestionGroup(BaseModel):
+    """Reviews of a group of quiz questions.
+
+    Invalid reviews are dropped instead of failing the whole group, so only
+    the affected questions have to be reviewed again.
+    """
+    reviews: List[NumberedReview] = Field(
+        description="One review per input question",
+        default_factory=list
+    )
+
+    @field_validator('reviews', mode='wrap')
+    @classmethod
+    def drop_invalid_reviews(cls, value, handler):
+        if not isinstance(value, list):
+            return handler(value)
+
+        reviews = []
+        for item in value:
+            try:
+                reviews.extend(handler([item]))
+            except ValidationError as e:
+                logger.warning(f"Dropping invalid review: {e}")
+        return reviews
+
+
 def prompt():  # noqa: E501
     return """# Review and Refine Individual Quiz Question
 
@@ -77,9 +137,6 @@ accurately reflects the lecture content and tests relevant knowledge.
 ## Lecture Context
 {{lecture_summary}}
 
-## Input
-{{quiz_question}}
-
 ## Review Criteria
 Evaluate this question on:
 
@@ -108,40 +165,441 @@ d) [OPTION d]
 **Correct Answer:** [LETTER a, b, c, or d]
 **Explanation:** [DETAILED EXPLANATION OF WHY THIS ANSWER IS CORRECT]
 ```
+"""
+
+
+def question_prompt():
+    return """## Input
+{{quiz_question}}
 
 Please provide your detailed review and refinement for this individual quiz
 question.
 """
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(10))
-async def review_note(note, lecture_summary, semaphore):
-    client, model = minddb.async_client()
+def group_prompt():
+    return """## Input
+{% for quiz_question in quiz_questions %}
+### Question {{ loop.index }}
+{{ quiz_question }}
+{% endfor %}
 
-    async with semaphore:
-        coro = client.chat.completions.create(
-            model=model,
-            messages=[{
-                "role": "user",
-                "content": prompt()
-            }],
-            max_tokens=1000,
+Review each of the questions above on its own, following the review criteria
+and output format. Return one review per question, together with the number
+of the question it belongs to.
+"""
+
+
+def group_messages():
+    """Get the messages for reviewing a group of notes in one request.
+
+    The instructions and the lecture summary form a cacheable prefix shared
+    by the group requests of a deck. The tools come before the messages in
+    the prefix, so single note reviews, with a tool of their own, do not
+    share it.
+    """
+    return [{
+        "role": "user",
+        "content": [
+            minddb.llm.messages.cached(prompt()),
+            minddb.llm.messages.text(group_prompt()),
+        ]
+    }]
+
+
+def messages():
+    """Get the messages for reviewing a single note.
+
+    The instructions and the lecture summary are the same for every note of
+    a deck and form a cacheable prefix, followed by the note itself.
+    """
+    return [{
+        "role": "user",
+        "content": [
+            minddb.llm.messages.cached(prompt()),
+            minddb.llm.messages.text(question_prompt()),
+        ]
+    }]
+
+
+def _max_tokens():
+    """Output tokens for the review of a single question."""
+    return minddb.llm.stages.get('review').max_tokens or REVIEW_MAX_TOKENS
+
+
+def _timeout():
+    """Seconds to wait for the review of a single question."""
+    return minddb.llm.stages.get('review').timeout or TIMEOUT
+
+
+def _max_concurrency(max_concurrency):
+    """Ceiling for concurrent review calls, unless set by the caller."""
+    return max_concurrency or minddb.llm.stages.get('review').concurrency \
+        or MAX_CONCURRENCY
+
+
+async def review_note(note, lecture_summary, limiter, model=None):
+    """Review a single note.
+
+    The timeout follows the recent review latencies, and slow requests are
+    hedged when hedging is on. Transient errors are retried by the LLM
+    call, with jittered exponential backoff while the retry budget
+    allows.
+
+    A hedged duplicate waits for a concurrency slot of its own, so with
+    the limiter at a limit of 1 hedging only starts once the limit grew.
+
+    Args:
+        note: QuizQuestion to review
+        lecture_summary: Summary of the lecture
+        limiter: AdaptiveLimiter shared by the review requests
+        model: Model to use instead of the default model (optional)
+
+    Returns:
+        RevisedQuizQuestion: Reviewed note
+    """
+    def request():
+        return minddb.llm.acreate(
+            messages=messages(),
+            max_tokens=_max_tokens(),
             response_model=RevisedQuizQuestion,
             context={
                 'lecture_summary': lecture_summary,
                 'quiz_question': note
-            }
+            },
+            max_retries=3,
+            timeout=minddb.llm.latency.timeout('review', _timeout()),
+            stage='review',
+            model=model,
+            # Retried overloads back off the concurrency right away
+            on_retry=limiter.on_error
         )
-        note = await asyncio.wait_for(coro, timeout=30)
-    return note
 
+    async def duplicate():
+        # A hedged request is a request of its own, within the limit too
+        async with limiter.slot():
+            return await request()
 
-async def notes(notes, lecture_summary):
-    semaphore = asyncio.Semaphore(1)
+    async with limiter.slot():
+        return await minddb.llm.latency.hedge(request, 'review',
+                                              duplicate=duplicate)
 
-    coros = []
-    for note in notes:
-        coros.append(review_note(note, lecture_summary, semaphore))
 
-    revised_notes = await tqdm_asyncio.gather(*coros)
+def accept(note):
+    """Accept a note without an LLM review.
+
+    Args:
+        note: QuizQuestion that passed the local checks
+
+    Returns:
+        RevisedQuizQuestion: The unchanged note marked as satisfactory
+    """
+    return RevisedQuizQuestion(
+        review_result='satisfactory',
+        justification_for_changes='Passed the local checks, not reviewed',
+        revised_quiz_question=note.model_dump(),
+    )
+
+
+async def review_light(note, lecture_summary, limiter, triage):
+    """Review a note that passed the local checks according to the policy.
+
+    Args:
+        note: QuizQuestion that passed the local checks
+        lecture_summary: Summary of the lecture
+        limiter: AdaptiveLimiter for the review calls
+        triage: 'skip' to accept the note as is, 'fast' to review it with
+                the fast model
+
+    Returns:
+        RevisedQuizQuestion: Reviewed note
+    """
+    if triage == 'skip':
+        return accept(note)
+    return await review_note(note, lecture_summary, limiter,
+                             model=minddb.FAST_MODEL)
+
+
+def group_size(notes, lecture_summary, max_input_tokens=GROUP_INPUT_TOKENS,
+               max_output_tokens=GROUP_OUTPUT_TOKENS):
+    """Choose the number of notes per grouped review request.
+
+    Args:
+        notes: List of QuizQuestion to review
+        lecture_summary: Summary of the lecture
+        max_input_tokens: Input token budget per request
+        max_output_tokens: Output token budget per request
+
+    Returns:
+        int: Number of notes per request (at least 1)
+    """
+    if not notes:
+        return 1
+
+    note_tokens = max(minddb.tools.estimate_tokens(str(n)) for n in notes)
+    summary_tokens = minddb.tools.estimate_tokens(lecture_summary)
+    by_input = (max_input_tokens - summary_tokens) // note_tokens
+    by_output = max_output_tokens // _max_tokens()
+    return max(1, min(len(notes), by_input, by_output))
+
+
+async def review_group(notes, lecture_summary, limiter):
+    """Review several notes in one request.
+
+    Notes without a valid review in the response are reviewed again on
+    their own. If the whole request fails, all notes are reviewed on their
+    own.
+
+    Args:
+        notes: List of QuizQuestion to review
+        lecture_summary: Summary of the lecture
+        limiter: AdaptiveLimiter shared by the review requests
+
+    Returns:
+        list[RevisedQuizQuestion]: Reviewed notes in the original order
+    """
+    reviews = {}
+    try:
+        async with limiter.slot():
+            group = await minddb.llm.acreate(
+                messages=group_messages(),
+                max_tokens=_max_tokens() * len(notes),
+                response_model=RevisedQuizQuestionGroup,
+                context={
+                    'lecture_summary': lecture_summary,
+                    'quiz_questions': notes
+                },
+                max_retries=1,
+                timeout=_timeout() * len(notes),
+                stage='review',
+                on_retry=limiter.on_error
+            )
+        reviews = {r.number: r.review for r in group.reviews}
+    except Exception as e:
+        logger.warning(f"Group review of {len(notes)} notes failed: {e}")
+
+    revised_notes = [reviews.get(i + 1) for i in range(len(notes))]
+    missing = [i for i, revised in enumerate(revised_notes) if revised is None]
+    if missing:
+        logger.info(f"Reviewing {len(missing)} notes of the group on their "
+                    f"own")
+    retried = await gather(*[
+        review_note(notes[i], lecture_summary, limiter) for i in missing
+    ])
+    for i, revised in zip(missing, retried):
+        revised_notes[i] = revised
+    return revised_notes
+
+
+async def review_batch(notes, lecture_summary, limiter, batches=None):
+    """Review all notes in one Message Batches job.
+
+    Notes whose batch request failed are reviewed again in real time.
+
+    Args:
+        notes: List of QuizQuestion to review
+        lecture_summary: Summary of the lecture
+        limiter: AdaptiveLimiter for the real time fallback
+        batches: Message Batches API (default: anthropic, see
+                 minddb.llm.batches.FakeBatches for offline use)
+
+    Returns:
+        list[RevisedQuizQuestion]: Reviewed notes in the original order
+    """
+    requests = [
+        (messages(),
+         {'lecture_summary': lecture_summary, 'quiz_question': note})
+        for note in notes
+    ]
+    revised_notes = await minddb.llm.batches.create_batch(
+        RevisedQuizQuestion, requests, max_tokens=_max_tokens(),
+        batches=batches,
+        stage='review')
+
+    failed = [i for i, revised in enumerate(revised_notes) if revised is None]
+    if failed:
+        logger.info(f"Reviewing {len(failed)} failed batch requests again")
+        retried = await gather(*[
+            review_note(notes[i], lecture_summary, limiter) for i in failed
+        ], progress=True)
+        for i, revised in zip(failed, retried):
+            revised_notes[i] = revised
+
     return revised_notes
+
+
+async def _reported(index, coro, on_review):
+    """Await reviews and report each one with its index.
+
+    Reported reviews are not kept, so the caller can store them without
+    holding every note in memory.
+
+    Returns:
+        The reviews, None if they were reported to on_review
+    """
+    revised = await coro
+    items = revised if isinstance(revised, list) else [revised]
+    minddb.llm.metrics.inc('minddb_notes', len(items), stage='review')
+    if on_review is None:
+        return revised
+    for i, item in enumerate(items):
+        result = on_review(index + i, item)
+        if inspect.isawaitable(result):
+            await result
+    return None
+
+
+def _kept(results):
+    """Drop the results of reviews that were reported instead of kept."""
+    return [result for result in results if result is not None]
+
+
+async def notes(notes, lecture_summary, max_concurrency=None, batch=False,
+                group=1, on_review=None, triage='full', limiter=None):
+    """Review notes against the lecture summary.
+
+    Args:
+        notes: List of QuizQuestion to review
+        lecture_summary: Summary of the lecture
+        max_concurrency: Ceiling for concurrent review calls (default:
+                         concurrency of the review stage, or
+                         MAX_CONCURRENCY)
+        batch: Submit all reviews as one Message Batches job instead of
+               real time requests (default: False)
+        group: Number of notes reviewed per request, 0 to choose it from
+               the token budgets (default: 1)
+        on_review: Function or coroutine function called with the index
+                   and the review of each note as soon as it is reviewed
+                   (optional)
+        triage: Review policy for notes that pass the local checks: 'full'
+                review, 'fast' review with the fast model, or 'skip' the
+                review. Notes failing a check always get a full review
+                (default: 'full')
+        limiter: AdaptiveLimiter shared with other reviews, replacing
+                 max_concurrency (optional)
+
+    Returns:
+        list[RevisedQuizQuestion]: Reviewed notes in the original order,
+                                   empty if they were reported to on_review
+    """
+    if limiter is None:
+        limiter = AdaptiveLimiter(
+            maximum=_max_concurrency(max_concurrency))
+    if triage != 'full':
+        return await _triaged(notes, lecture_summary, limiter, batch, group,
+                              on_review, triage)
+
+    if batch:
+        return await _reported(
+            0, review_batch(notes, lecture_summary, limiter),
+            on_review) or []
+
+    if group == 0:
+        group = group_size(notes, lecture_summary)
+        logger.info(f"Reviewing {group} notes per request")
+
+    if group > 1:
+        groups = await gather(*[
+            _reported(i, review_group(notes[i:i + group], lecture_summary,
+                                      limiter), on_review)
+            for i in range(0, len(notes), group)
+        ], progress=True)
+        return [revised for revised_group in _kept(groups)
+                for revised in revised_group]
+
+    coros = []
+    for i, note in enumerate(notes):
+        coros.append(_reported(
+            i, review_note(note, lecture_summary, limiter), on_review))
+
+    revised_notes = await gather(*coros, progress=True)
+    return _kept(revised_notes)
+
+
+async def _triaged(drafts, lecture_summary, limiter, batch, group,
+                   on_review, triage):
+    """Review notes passing the local checks by policy, the rest in full.
+
+    Both share the limiter, so together they stay within its concurrency.
+    """
+    passed = [minddb.mindnote.triage.passes(note, lecture_summary)
+              for note in drafts]
+    light = [i for i, ok in enumerate(passed) if ok]
+    full = [i for i, ok in enumerate(passed) if not ok]
+    logger.info(f"{len(light)} of {len(drafts)} notes passed the local "
+                f"checks, triage policy: {triage}")
+    minddb.llm.metrics.inc('minddb_triaged', len(light), result='passed')
+    minddb.llm.metrics.inc('minddb_triaged', len(full), result='failed')
+
+    def reporting(indices):
+        if on_review is None:
+            return None
+
+        def report(index, revised):
+            return on_review(indices[index], revised)
+        return report
+
+    async def review_full():
+        if not full:
+            return []
+        return await notes([drafts[i] for i in full], lecture_summary,
+                           batch=batch, group=group,
+                           on_review=reporting(full), limiter=limiter)
+
+    light_reviews, full_reviews = await asyncio.gather(
+        gather(*[
+            _reported(j, review_light(drafts[i], lecture_summary, limiter,
+                                      triage), reporting(light))
+            for j, i in enumerate(light)
+        ]),
+        review_full(),
+    )
+
+    if on_review is not None:
+        return []
+    revised = dict(zip(light, light_reviews))
+    revised.update(zip(full, full_reviews))
+    return [revised[i] for i in range(len(drafts))]
+
+
+async def stream(notes, lecture_summary, max_concurrency=None,
+                 on_review=None, triage='full'):
+    """Review notes as they arrive from an asynchronous iterator.
+
+    Each note is handed to a review task as soon as it is received, so the
+    reviews overlap with the generation of the remaining notes.
+
+    Args:
+        notes: Async iterator of QuizQuestion
+        lecture_summary: Summary of the lecture
+        max_concurrency: Ceiling for concurrent review calls (default:
+                         concurrency of the review stage, or
+                         MAX_CONCURRENCY)
+        on_review: Function or coroutine function called with the index
+                   and the review of each note as soon as it is reviewed
+                   (optional)
+        triage: Review policy for notes that pass the local checks, see
+                notes (default: 'full')
+
+    Returns:
+        list[RevisedQuizQuestion]: Reviewed notes in the order received,
+                                   empty if they were reported to on_review
+    """
+    limiter = AdaptiveLimiter(maximum=_max_concurrency(max_concurrency))
+
+    tasks = []
+    try:
+        async for note in notes:
+            if triage != 'full' and \
+                    minddb.mindnote.triage.passes(note, lecture_summary):
+                review = review_light(note, lecture_summary, limiter, triage)
+            else:
+                review = review_note(note, lecture_summary, limiter)
+            tasks.append(asyncio.create_task(_reported(
+                len(tasks), review, on_review)))
+        logger.info(f"Received {len(tasks)} notes, waiting for reviews...")
+        return _kept(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
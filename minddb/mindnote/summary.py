@@ -1,11 +1,38 @@
+import hashlib
 import logging
+import re
 from typing import List
 from pydantic import BaseModel, Field
 
 import minddb
+import minddb.llm
+import minddb.llm.cache
+import minddb.llm.messages
+import minddb.llm.stages
+import minddb.storage
+import minddb.tools
+from minddb.llm.concurrency import gather
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the topics of a transcript or chunk
+TIMEOUT = 300
+
+# Output tokens of a topic extraction request
+MAX_TOKENS = 4096
+
+# Fields of LectureTopics holding lists of topics
+TOPIC_LISTS = ('key_concepts', 'case_studies_examples',
+               'methodologies_metrics', 'practical_recommendations')
+
+# Headings of the topic lists in the markdown summary
+HEADINGS = {
+    'key_concepts': 'Key Concepts',
+    'case_studies_examples': 'Case Studies/Examples',
+    'methodologies_metrics': 'Methodologies/Metrics',
+    'practical_recommendations': 'Practical Recommendations',
+}
+
 
 class LectureTopics(BaseModel):
     """Structured representation of key topics extracted from a lecture."""
@@ -44,7 +71,7 @@ def prompt():
 # Step 1: Extract Key Topics from Lecture
 
 ## Task
-Analyze the lecture transcript below and extract:
+Analyze the lecture transcript above and extract:
 1. The main topic of the lecture
 2. A comprehensive list of key concepts, frameworks, and terminology covered
 3. Any case studies or examples mentioned
@@ -88,48 +115,319 @@ Please organize your findings in the following structure:
 4. Use the exact terminology from the lecture
 5. Keep each bullet point concise but informative
 
-Please analyze the following lecture transcript:
+Please analyze the lecture transcript above.
+    """
+
+
+def messages():
+    """Get the messages for topic extraction.
 
-{{transcript}}
+    The transcript comes first and closes a cacheable prefix, so it is shared
+    with validation retries of the same request.
     """
+    return [{
+        "role": "user",
+        "content": [
+            minddb.llm.messages.cached("# Lecture Transcript\n\n"
+                                       "{{transcript}}"),
+            minddb.llm.messages.text(prompt()),
+        ]
+    }]
 
 
-def get_summary(transcript):
-    topics = get_topics(transcript)
+async def get_summary(transcript, chunk_tokens=None, sections=None):
+    """Summarize the key topics of a transcript.
 
-    summary = f"### Lecture Topic\n{topics.lecture_topic}\n\n"
-    if topics.key_concepts:
-        summary += "### Key Concepts\n"
-        summary += '- ' + '\n- '.join(topics.key_concepts) + '\n\n'
+    Args:
+        transcript: Transcript to summarize
+        chunk_tokens: Summarize chunks of about this many tokens
+                      concurrently and merge the results (default: summarize
+                      the whole transcript in one request)
+        sections: Transcripts of the files making up the transcript. Their
+                  topics are cached in the catalog and merged, so only new
+                  or changed files are summarized (optional)
+
+    Returns:
+        str: Markdown summary of the key topics
+    """
+    if sections:
+        topics = await get_topics_cached(sections, chunk_tokens)
+    elif chunk_tokens:
+        topics = await get_topics_chunked(transcript, chunk_tokens)
+    else:
+        topics = await get_topics(transcript)
 
-    if topics.case_studies_examples:
-        summary += "### Case Studies/Examples\n"
-        summary += '- ' + '\n- '.join(topics.case_studies_examples) + '\n\n'
+    return format_summary(topics)
 
-    if topics.methodologies_metrics:
-        summary += "### Methodologies/Metrics\n"
-        summary += '- ' + '\n- '.join(topics.methodologies_metrics) + '\n\n'
 
-    if topics.practical_recommendations:
-        summary += "### Practical Recommendations\n"
-        summary += ('- ' + '\n- '.join(topics.practical_recommendations) +
-                    '\n\n')
+def format_summary(topics):
+    """Format lecture topics as a markdown summary.
+
+    Args:
+        topics: LectureTopics to format
+
+    Returns:
+        str: Markdown summary of the key topics
+    """
+    summary = f"### Lecture Topic\n{topics.lecture_topic}\n\n"
+    for field in TOPIC_LISTS:
+        entries = getattr(topics, field)
+        if entries:
+            summary += f"### {HEADINGS[field]}\n"
+            summary += '- ' + '\n- '.join(entries) + '\n\n'
 
     return summary
 
 
-def get_topics(transcript):
-    client, model = minddb.client()
-    logger.info("Extracting key topics...")
-    topics = client.messages.create(
-        model=model,
-        max_tokens=4096,
-        messages=[{
-            "role": "user",
-            "content": prompt()
-        }],
+def parse_summary(summary):
+    """Parse a markdown summary back into lecture topics.
+
+    Args:
+        summary: Markdown summary as written by format_summary
+
+    Returns:
+        LectureTopics: Topics of the summary
+    """
+    fields = {heading: field for field, heading in HEADINGS.items()}
+    fields['Lecture Topic'] = 'lecture_topic'
+    topics = {'lecture_topic': ''}
+    field = None
+    for line in summary.splitlines():
+        if line.startswith('### '):
+            field = fields.get(line[4:].strip())
+            if field and field != 'lecture_topic':
+                topics[field] = []
+        elif field == 'lecture_topic':
+            topics[field] = '\n'.join(
+                filter(None, [topics[field], line])).strip()
+        elif field and line.startswith('- '):
+            topics[field].append(line[2:])
+        elif field and line.strip() and topics[field]:
+            # Continuation of a topic spanning several lines
+            topics[field][-1] += '\n' + line
+    return LectureTopics(**topics)
+
+
+def split_topics(topics, group_size=None):
+    """Split lecture topics into groups to generate questions for.
+
+    Every group keeps the lecture topic for context.
+
+    Args:
+        topics: LectureTopics to split
+        group_size: Number of topics per group, taken in summary order
+                    across the topic lists (default: one group per topic
+                    list)
+
+    Returns:
+        list[LectureTopics]: Non-empty groups of topics
+    """
+    entries = [(field, entry) for field in TOPIC_LISTS
+               for entry in getattr(topics, field)]
+    if not entries:
+        return [topics]
+
+    if group_size:
+        groups = [entries[i:i + group_size]
+                  for i in range(0, len(entries), group_size)]
+    else:
+        groups = [[(field, entry) for entry in getattr(topics, field)]
+                  for field in TOPIC_LISTS if getattr(topics, field)]
+
+    split = []
+    for group in groups:
+        lists = {}
+        for field, entry in group:
+            lists.setdefault(field, []).append(entry)
+        split.append(LectureTopics(lecture_topic=topics.lecture_topic,
+                                   **lists))
+    return split
+
+
+def extract(transcript):
+    """Create the topic extraction request of a transcript or chunk.
+
+    Args:
+        transcript: Transcript or chunk to extract the topics of
+
+    Returns:
+        coroutine: Request returning the LectureTopics
+    """
+    settings = minddb.llm.stages.get('summary')
+    return minddb.llm.acreate(
+        max_tokens=settings.max_tokens or MAX_TOKENS,
+        messages=messages(),
         response_model=LectureTopics,
         context={'transcript': transcript},
-        max_retries=2
+        max_retries=2,
+        timeout=settings.timeout or TIMEOUT,
+        stage='summary'
     )
-    return topics
+
+
+async def get_topics(transcript):
+    logger.info("Extracting key topics...")
+    return await extract(transcript)
+
+
+def split_transcript(transcript, max_tokens):
+    """Split a transcript into chunks of about max_tokens tokens.
+
+    The transcript is split at markdown headings first and at paragraph
+    boundaries for sections that are too large. Sections are then packed
+    into chunks in their original order. A single paragraph larger than
+    max_tokens becomes a chunk of its own.
+
+    Args:
+        transcript: Transcript to split
+        max_tokens: Token budget per chunk
+
+    Returns:
+        list[str]: Chunks of the transcript
+    """
+    sections = re.split(r'\n(?=#{1,6} )', transcript)
+
+    pieces = []
+    for section in sections:
+        if minddb.tools.estimate_tokens(section) <= max_tokens:
+            pieces.append(section)
+        else:
+            pieces.extend(re.split(r'\n\s*\n', section))
+
+    chunks = []
+    current = []
+    size = 0
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        tokens = minddb.tools.estimate_tokens(piece)
+        if current and size + tokens > max_tokens:
+            chunks.append('\n\n'.join(current))
+            current = []
+            size = 0
+        current.append(piece)
+        size += tokens
+
+    if current:
+        chunks.append('\n\n'.join(current))
+
+    return chunks
+
+
+def _normalize(text):
+    return ' '.join(text.lower().split()).rstrip('.')
+
+
+def merge_topics(topics):
+    """Merge the topics of several chunks into one LectureTopics.
+
+    Topics are deduplicated ignoring case, whitespace and trailing periods,
+    keeping the first occurrence and the original order.
+
+    Args:
+        topics: List of LectureTopics
+
+    Returns:
+        LectureTopics: Merged topics
+    """
+    merged = {}
+    for field in ('lecture_topic',) + TOPIC_LISTS:
+        seen = set()
+        values = []
+        for item in topics:
+            value = getattr(item, field)
+            for entry in ([value] if isinstance(value, str) else value):
+                key = _normalize(entry)
+                if key and key not in seen:
+                    seen.add(key)
+                    values.append(entry.strip())
+        merged[field] = values
+
+    merged['lecture_topic'] = '; '.join(merged['lecture_topic'])
+    return LectureTopics(**merged)
+
+
+async def get_topics_chunked(transcript, chunk_tokens):
+    """Extract the key topics chunk by chunk and merge them.
+
+    Args:
+        transcript: Transcript to summarize
+        chunk_tokens: Token budget per chunk
+
+    Returns:
+        LectureTopics: Merged topics of all chunks
+    """
+    chunks = split_transcript(transcript, chunk_tokens)
+    logger.info(f"Extracting key topics from {len(chunks)} chunks...")
+
+    topics = await gather(
+        *[extract(chunk) for chunk in chunks],
+        limit=minddb.llm.stages.get('summary').concurrency)
+    return merge_topics(topics)
+
+
+def checksum(transcript):
+    """Get the checksum the topics of a transcript are cached under.
+
+    Args:
+        transcript: Transcript of a file
+
+    Returns:
+        str: SHA-256 hex digest of the transcript
+    """
+    return hashlib.sha256(transcript.encode('utf-8')).hexdigest()
+
+
+async def get_topics_cached(sections, chunk_tokens=None):
+    """Extract the key topics of each file, reusing cached topics.
+
+    Topics are cached in the catalog per file checksum and model, so files
+    that were summarized before are not sent again. The topics of all files
+    are merged in their original order.
+
+    Args:
+        sections: Transcripts of the files
+        chunk_tokens: Summarize large files in chunks of about this many
+                      tokens (optional)
+
+    Returns:
+        LectureTopics: Merged topics of all files
+    """
+    checksums = [checksum(section) for section in sections]
+    settings = minddb.llm.stages.get('summary')
+    model = settings.model or minddb.MODEL
+    cached = {}
+    if minddb.llm.cache.ENABLED:
+        catalog = minddb.storage.get_catalog()
+        cached = {
+            key: LectureTopics.model_validate_json(data)
+            for key, data in catalog.get_transcript_topics(
+                set(checksums), model).items()
+        }
+
+    missing = {key: section for key, section in zip(checksums, sections)
+               if key not in cached}
+    logger.info(f"Reusing the topics of {len(sections) - len(missing)} of "
+                f"{len(sections)} transcripts")
+
+    if missing:
+        if chunk_tokens:
+            extracted = await gather(*[
+                get_topics_chunked(section, chunk_tokens)
+                for section in missing.values()
+            ])
+        else:
+            extracted = await gather(*[
+                get_topics(section) for section in missing.values()
+            ], limit=settings.concurrency)
+        extracted = dict(zip(missing, extracted))
+        if minddb.llm.cache.ENABLED:
+            catalog.insert_transcript_topics(
+                {key: topics.model_dump_json()
+                 for key, topics in extracted.items()}, model)
+        cached.update(extracted)
+
+    if len(sections) == 1:
+        return cached[checksums[0]]
+    return merge_topics([cached[key] for key in checksums])
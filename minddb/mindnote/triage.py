@@ -0,0 +1,78 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Review policies for notes that pass the local checks
+POLICIES = ('full', 'fast', 'skip')
+
+# Longest option may be at most this many times as long as the shortest
+MAX_LENGTH_RATIO = 3.0
+
+# Minimum number of summary terms the explanation has to mention
+MIN_SUMMARY_TERMS = 2
+
+# Minimum length of the words counted as summary terms
+MIN_TERM_LENGTH = 5
+
+
+def _words(text):
+    """Get the lowercase words of a text."""
+    return set(re.findall(r'[a-z][a-z0-9-]+', text.lower()))
+
+
+def _normalize(text):
+    """Normalize an option for comparison."""
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def check(note, lecture_summary):
+    """Run cheap local checks on a generated note.
+
+    Args:
+        note: QuizQuestion to check
+        lecture_summary: Summary of the lecture
+
+    Returns:
+        list[str]: Names of the failed checks, empty if the note passed
+    """
+    failed = []
+    options = note.options
+
+    # Answers are mapped to the options by position, so the letters have
+    # to be in order
+    letters = [option.letter for option in options]
+    if letters != ['a', 'b', 'c', 'd'] or \
+            not all(option.text.strip() for option in options):
+        failed.append('four_options')
+
+    texts = [_normalize(option.text) for option in options]
+    if len(set(texts)) != len(texts):
+        failed.append('duplicate_options')
+
+    lengths = [len(option.text.strip()) for option in options]
+    if lengths and max(lengths) > MAX_LENGTH_RATIO * max(1, min(lengths)):
+        failed.append('option_lengths')
+
+    terms = {word for word in _words(lecture_summary)
+             if len(word) >= MIN_TERM_LENGTH}
+    if len(terms & _words(note.explanation)) < MIN_SUMMARY_TERMS:
+        failed.append('summary_terms')
+
+    return failed
+
+
+def passes(note, lecture_summary):
+    """Check if a note passes all local checks.
+
+    Args:
+        note: QuizQuestion to check
+        lecture_summary: Summary of the lecture
+
+    Returns:
+        bool: True if no check failed
+    """
+    failed = check(note, lecture_summary)
+    if failed:
+        logger.debug(f"Note failed checks {failed}: {note.question_text}")
+    return not failed
@@ -0,0 +1,301 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+import time
+
+import minddb.storage
+from . import dedupe
+from .manifest import MAX_DECKS, open_catalogs
+from .processor import Processor
+
+logger = logging.getLogger(__name__)
+
+# Seconds a file has to stay unchanged before it is processed
+DEBOUNCE = 5.0
+
+# Seconds between two scans of the library directories when polling
+POLL_INTERVAL = 10.0
+
+# Suffixes of the transcript files, as read by Library
+SUFFIXES = ('.txt', '.md')
+
+# inotify events of a file being written, or moved into the directory
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO
+
+# Event of the kernel dropping events, as the queue of the watcher was full
+_IN_Q_OVERFLOW = 0x4000
+
+_EVENT = struct.Struct('iIII')
+
+
+def _is_transcript(filename):
+    return filename.endswith(SUFFIXES) and not filename.startswith('.')
+
+
+def _inotify():
+    """Get libc with inotify support, None if it is not available."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, 'inotify_init1') else None
+
+
+class Watcher:
+    """Reports new and changed transcript files of library directories.
+
+    Uses inotify on Linux and falls back to comparing the size and
+    modification time of the files at an interval elsewhere. Files are only
+    reported once they stopped changing for the debounce time, so uploads
+    in progress are not picked up half written.
+
+    Example:
+    >>> async for directory, filenames in Watcher(['lectures']).changes():
+    ...     print(directory, filenames)
+    """
+    def __init__(self, paths, debounce=DEBOUNCE, poll_interval=POLL_INTERVAL,
+                 polling=None):
+        """Initialize the watcher.
+
+        Args:
+            paths: Directories to watch
+            debounce: Seconds a file has to stay unchanged before it is
+                      reported (default: DEBOUNCE)
+            poll_interval: Seconds between two scans when polling
+                           (default: POLL_INTERVAL)
+            polling: Poll even if inotify is available (default: poll only
+                     without inotify)
+        """
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._libc = None if polling else _inotify()
+        self._events = asyncio.Queue()
+        self._snapshots = {}
+        self._directories = {}
+
+    @property
+    def polling(self):
+        return self._libc is None
+
+    def _scan(self, path):
+        """Get the size and modification time of the transcripts of a
+        directory."""
+        snapshot = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file() and _is_transcript(entry.name):
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def _rescan(self):
+        """Report the files whose size or modification time changed since
+        the last scan."""
+        for path in self.paths:
+            snapshot = self._scan(path)
+            previous = self._snapshots.get(path, {})
+            for filename, stat in snapshot.items():
+                if previous.get(filename) != stat:
+                    self._events.put_nowait((path, filename))
+            self._snapshots[path] = snapshot
+
+    async def _poll(self):
+        """Report the files whose size or modification time changed."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self._rescan()
+
+    def _handle(self, data):
+        """Report the files of a buffer of inotify events.
+
+        If the kernel dropped events, the directories are scanned instead.
+        Files that changed since watching started are reported again then,
+        as the scans of inotify watchers are not kept up to date.
+
+        Args:
+            data: Bytes read from the inotify file descriptor
+        """
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                logger.warning("Missed inotify events, rescanning the "
+                               "directories")
+                self._rescan()
+                continue
+            filename = os.fsdecode(name)
+            if wd in self._directories and _is_transcript(filename):
+                self._events.put_nowait((self._directories[wd], filename))
+
+    def _start_inotify(self):
+        """Watch the directories with inotify.
+
+        Returns:
+            int: inotify file descriptor
+
+        Raises:
+            OSError: If a directory cannot be watched
+        """
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._directories = {}
+        for path in self.paths:
+            wd = self._libc.inotify_add_watch(fd, os.fsencode(path),
+                                              _IN_MASK)
+            if wd < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(),
+                              f'Cannot watch {path}')
+            self._directories[wd] = path
+
+        def read():
+            try:
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            self._handle(data)
+
+        asyncio.get_running_loop().add_reader(fd, read)
+        return fd
+
+    async def changes(self):
+        """Report new and changed files until cancelled.
+
+        Files present when watching starts are reported first, so files
+        added while nothing was watching are not missed.
+
+        Yields:
+            tuple[str, set[str]]: Directory and names of the files that
+                                  changed in it
+        """
+        for path in self.paths:
+            self._snapshots[path] = self._scan(path)
+            if self._snapshots[path]:
+                yield path, set(self._snapshots[path])
+
+        fd = poller = None
+        if not self.polling:
+            try:
+                fd = self._start_inotify()
+                logger.info(f"Watching {len(self.paths)} directories with "
+                            f"inotify")
+            except OSError as e:
+                logger.warning(f"Cannot use inotify, polling instead: {e}")
+                self._libc = None
+        if self.polling:
+            poller = asyncio.create_task(self._poll())
+            logger.info(f"Polling {len(self.paths)} directories every "
+                        f"{self.poll_interval}s")
+
+        pending = {}
+        try:
+            while True:
+                timeout = None
+                if pending:
+                    timeout = max(0.0, min(pending.values()) + self.debounce
+                                  - time.monotonic())
+                try:
+                    event = await asyncio.wait_for(self._events.get(),
+                                                   timeout)
+                    # A new event restarts the debounce time of the file
+                    pending[event] = time.monotonic()
+                except asyncio.TimeoutError:
+                    pass
+
+                now = time.monotonic()
+                ready = [event for event, last in pending.items()
+                         if last + self.debounce <= now]
+                batches = {}
+                for event in ready:
+                    del pending[event]
+                    path, filename = event
+                    if os.path.isfile(os.path.join(path, filename)):
+                        batches.setdefault(path, set()).add(filename)
+                for path, filenames in batches.items():
+                    yield path, filenames
+        finally:
+            if fd is not None:
+                asyncio.get_running_loop().remove_reader(fd)
+                os.close(fd)
+            if poller is not None:
+                poller.cancel()
+
+
+async def watch(entries, max_decks=MAX_DECKS, **watcher_options):
+    """Create the notes of new and changed transcripts as they arrive.
+
+    Only the reported files are read and hashed. A deck is never processed
+    twice at the same time, files changing while it runs are processed in
+    its next run. Failed runs are logged and the files are retried when
+    they change again.
+
+    Args:
+        entries: List of DeckEntry with the catalog name set
+        max_decks: Number of decks processed at the same time
+                   (default: MAX_DECKS)
+        watcher_options: Keyword arguments passed on to Watcher, e.g.
+                         debounce
+    """
+    catalogs = open_catalogs(entries)
+    semaphore = asyncio.Semaphore(max_decks)
+    pending = [set() for _ in entries]
+    running = {}
+
+    async def drain(i):
+        entry = entries[i]
+        while pending[i]:
+            filenames, pending[i] = pending[i], set()
+            async with semaphore:
+                logger.info(f"Processing {', '.join(sorted(filenames))} for "
+                            f"deck {entry.deck}")
+                try:
+                    with minddb.storage.use_catalog(catalogs[i]):
+                        processor = Processor(entry.library,
+                                              filenames=filenames)
+                        try:
+                            await processor.create(entry.deck,
+                                                   **entry.options())
+                        finally:
+                            if entry.dedupe:
+                                # The next run indexes the notes of the
+                                # deck as stored by then
+                                deck = catalogs[i].get_or_create_deck(
+                                    entry.deck)
+                                dedupe.discard(deck.id)
+                except Exception as e:
+                    logger.error(f"Failed to process "
+                                 f"{', '.join(sorted(filenames))} for deck "
+                                 f"{entry.deck}: {e}")
+        del running[i]
+
+    libraries = [os.path.abspath(entry.library) for entry in entries]
+    watcher = Watcher(sorted(set(libraries)), **watcher_options)
+    try:
+        async for path, filenames in watcher.changes():
+            for i, library in enumerate(libraries):
+                if library != path:
+                    continue
+                pending[i] |= filenames
+                if i not in running:
+                    running[i] = asyncio.create_task(drain(i))
+    finally:
+        tasks = list(running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for catalog in set(catalogs):
+            catalog.close()
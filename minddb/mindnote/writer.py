@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import re
+
+import minddb.llm.metrics
+import minddb.storage
+
+logger = logging.getLogger(__name__)
+
+# Number of reviewed notes waiting for storage before reviews block
+QUEUE_SIZE = 100
+
+# Maximum number of notes stored per transaction
+BATCH_SIZE = 50
+
+
+def format_note(note):
+    """Convert a reviewed note to the keyword arguments of insert_note.
+
+    Args:
+        note: RevisedQuizQuestion
+
+    Returns:
+        dict: Note fields with Markdown bold converted to HTML bold in the
+              explanation
+    """
+    note_dict = note.to_dict()
+
+    # Convert Markdown bold to HTML bold in explanation
+    if 'explanation' in note_dict and note_dict['explanation']:
+        # Find all occurrences of **word** and replace with <b>word</b>
+        note_dict['explanation'] = re.sub(
+            r'\*\*([^*]+)\*\*',
+            r'<b>\1</b>',
+            note_dict['explanation']
+        )
+    return note_dict
+
+
+class NoteWriter:
+    """Stores reviewed notes in the catalog while the deck is being built.
+
+    Reviews push their notes onto a bounded queue, so they wait whenever
+    storage falls behind. A single writer task drains the queue and stores
+    the notes in batched transactions, together with their review
+    checkpoints.
+
+    Example:
+    >>> async with NoteWriter(deck_id, checkpoint) as writer:
+    ...     await writer.put(0, revised)
+    """
+    def __init__(self, deck_id, checkpoint=None, queue_size=QUEUE_SIZE,
+                 batch_size=BATCH_SIZE):
+        """Initialize the writer.
+
+        Args:
+            deck_id: ID of the deck the notes are stored in
+            checkpoint: Checkpoint the reviews are saved to along with the
+                        notes (optional)
+            queue_size: Number of notes waiting for storage before put blocks
+                        (default: QUEUE_SIZE)
+            batch_size: Maximum number of notes stored per transaction
+                        (default: BATCH_SIZE)
+        """
+        self.deck_id = deck_id
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.written = 0
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._task = None
+        self._error = None
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Store what was reviewed before a failure too, it is checkpointed
+        await self._queue.put(None)
+        await self._task
+        if self._error is not None and exc is None:
+            raise self._error
+
+    async def put(self, index, note):
+        """Queue a reviewed note for storage, waiting while the queue is full.
+
+        Args:
+            index: Index of the note in the draft
+            note: RevisedQuizQuestion
+
+        Raises:
+            Exception: The error that stopped the writer, if any
+        """
+        if self._error is not None:
+            raise self._error
+        await self._queue.put((index, note))
+
+    async def _run(self):
+        """Drain the queue in batches until the end marker arrives."""
+        done = False
+        while not done:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                done = True
+            if batch and self._error is None:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    # Keep draining, so reviews waiting on put do not hang
+                    logger.error(f"Failed to store notes: {e}")
+                    self._error = e
+
+    def _write(self, batch):
+        """Store a batch of notes and their checkpoints in one transaction."""
+        checkpoints = []
+        if self.checkpoint is not None:
+            checkpoints = [
+                (self.checkpoint.run_id, 'review', index,
+                 note.model_dump_json())
+                for index, note in batch
+            ]
+        catalog = minddb.storage.get_catalog()
+        with minddb.llm.metrics.timed('storage'):
+            catalog.insert_notes(self.deck_id,
+                                 [format_note(note) for _, note in batch],
+                                 checkpoints=checkpoints)
+        minddb.llm.metrics.inc('minddb_notes', len(batch), stage='storage')
+        self.written += len(batch)
+        logger.debug(f"Stored {self.written} notes")
@@ -1,3 +1,6 @@
+import contextvars
+from contextlib import contextmanager
+
 from .db import DB
 from .db_storage import DBStorage
 from .models import Transcript
@@ -5,7 +8,10 @@ from .models import Transcript
 # Global catalog instance
 _catalog = None
 
-__all__ = ['DB', 'Transcript', 'setup', 'get_catalog']
+# Catalog of the running task, overrides the global catalog
+_current_catalog = contextvars.ContextVar('catalog', default=None)
+
+__all__ = ['DB', 'Transcript', 'setup', 'get_catalog', 'use_catalog']
 
 
 def setup(path, name):
@@ -23,12 +29,19 @@ def setup(path, name):
 def get_catalog():
     """Get the configured catalog database.
 
+    The catalog set with use_catalog takes precedence over the global
+    catalog.
+
     Returns:
         DBStorage: The configured catalog instance
 
     Raises:
         RuntimeError: If catalog is not configured
     """
+    current = _current_catalog.get()
+    if current is not None:
+        return current
+
     if _catalog is None:
         msg = "Catalog not configured. Call configure_catalog first."
         raise RuntimeError(msg)
@@ -36,6 +49,26 @@ def get_catalog():
     return _catalog
 
 
+@contextmanager
+def use_catalog(catalog):
+    """Use a catalog in the current task and the tasks it starts.
+
+    Lets tasks running at the same time work on different catalogs.
+
+    Args:
+        catalog: DBStorage to use
+
+    Example:
+    >>> with use_catalog(DBStorage(path, name)):
+    ...     await processor.create(deck_name)
+    """
+    token = _current_catalog.set(catalog)
+    try:
+        yield catalog
+    finally:
+        _current_catalog.reset(token)
+
+
 def close_catalog():
     """Close the global catalog database connection.
 
@@ -3,7 +3,8 @@ import sqlite3
 import os
 from datetime import datetime
 from contextlib import closing
-from .models import ClientImport, Deck, Note, Transcript
+from .models import (CachedResponse, ClientImport, Deck, Note, Run,
+                     Transcript)
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,15 @@ class DB:
         logger.debug("Initialized DB with database: %s", self._db_name)
         self.create_tables()
 
+    @property
+    def db_name(self):
+        """Get the path of the database, which identifies the catalog.
+
+        Returns:
+            str: Path to the SQLite database file
+        """
+        return self._db_name
+
     def connect(self):
         """Get or create a database connection.
 
@@ -186,7 +196,8 @@ class DB:
 
     def delete_deck_and_notes(self, deck_id):
         """Delete a deck, its notes and all associated entries in the following
-        tables: transcript_deck_processing, notes, note_client_imports.
+        tables: transcript_deck_processing, notes, note_client_imports,
+        note_signatures, runs, run_checkpoints.
 
         Args:
             deck_id: ID of the deck to delete
@@ -218,10 +229,28 @@ class DB:
                     )
                 """, (deck_id,))
 
+                # Delete the stored signatures of the notes in this deck
+                cursor.execute("""
+                    DELETE FROM note_signatures
+                    WHERE note_id IN (
+                        SELECT id FROM notes WHERE deck_id = ?
+                    )
+                """, (deck_id,))
+
                 # Delete all notes in the deck
                 cursor.execute("DELETE FROM notes WHERE deck_id = ?",
                                (deck_id,))
 
+                # Delete the pipeline runs of the deck and their checkpoints
+                cursor.execute("""
+                    DELETE FROM run_checkpoints
+                    WHERE run_id IN (
+                        SELECT id FROM runs WHERE deck_id = ?
+                    )
+                """, (deck_id,))
+                cursor.execute("DELETE FROM runs WHERE deck_id = ?",
+                               (deck_id,))
+
                 # Finally delete the deck itself
                 cursor.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
 
@@ -428,6 +457,40 @@ class DB:
             conn.commit()
             return cursor.lastrowid
 
+    def insert_notes(self, deck_id, notes, checkpoints=()):
+        """Insert several notes in one transaction.
+
+        Args:
+            deck_id: ID of the deck the notes belong to
+            notes: List of dicts with the keyword arguments of insert_note
+            checkpoints: (run_id, stage, item, data) tuples saved in the same
+                         transaction, so the checkpoints of a run never get
+                         ahead of or behind the stored notes (optional)
+
+        Returns:
+            int: Number of inserted notes
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.executemany("""
+                INSERT INTO notes (
+                    deck_id, question, answer_a, answer_b, answer_c, answer_d,
+                    correct_answer, explanation
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(
+                deck_id, note['question'], note.get('answer_a'),
+                note.get('answer_b'), note.get('answer_c'),
+                note.get('answer_d'), note.get('correct_answer'),
+                note['explanation']
+            ) for note in notes])
+            cursor.executemany("""
+                INSERT OR REPLACE INTO run_checkpoints (
+                    run_id, stage, item, data
+                ) VALUES (?, ?, ?, ?)
+            """, list(checkpoints))
+            conn.commit()
+            return len(notes)
+
     def get_note(self, note_id):
         """Get a note by ID.
 
@@ -633,3 +696,340 @@ class DB:
                 explanation=row[8],
                 created_at=datetime.fromisoformat(row[9]) if row[9] else None
             ) for row in cursor.fetchall()]
+
+    def get_note_signatures(self, deck_id):
+        """Get the stored MinHash signatures of the notes of a deck.
+
+        Args:
+            deck_id: ID of the deck
+
+        Returns:
+            dict: Note ID to signature, for the notes with a stored signature
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute("""
+                SELECT s.note_id, s.signature
+                FROM note_signatures s
+                JOIN notes n ON n.id = s.note_id
+                WHERE n.deck_id = ?
+            """, (deck_id,))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def insert_note_signatures(self, signatures):
+        """Store the MinHash signatures of notes.
+
+        Args:
+            signatures: Dict of note ID to signature
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO note_signatures (
+                    note_id, signature
+                ) VALUES (?, ?)
+            """, signatures.items())
+            conn.commit()
+
+    def get_cached_response(self, key):
+        """Get a cached LLM response and mark it as recently used.
+
+        Args:
+            key: Cache key of the request
+
+        Returns:
+            CachedResponse: Cached response if found, None if not found
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute("""
+                SELECT key, model, response_model, response, size, hits,
+                       created_at, accessed_at
+                FROM llm_cache WHERE key = ?
+            """, (key,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            cursor.execute("""
+                UPDATE llm_cache
+                SET hits = hits + 1, accessed_at = datetime('now')
+                WHERE key = ?
+            """, (key,))
+            conn.commit()
+            return CachedResponse(
+                key=row[0],
+                model=row[1],
+                response_model=row[2],
+                response=row[3],
+                size=row[4],
+                hits=row[5] + 1,
+                created_at=datetime.fromisoformat(row[6]),
+                accessed_at=datetime.fromisoformat(row[7]),
+            )
+
+    def insert_cached_response(self, key, model, response_model, response,
+                               max_entries=None):
+        """Insert or replace a cached LLM response.
+
+        Args:
+            key: Cache key of the request
+            model: Name of the model that produced the response
+            response_model: Name of the response model class
+            response: JSON of the validated response
+            max_entries: Evict the least recently used entries above this
+                         number of entries (optional)
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO llm_cache (
+                    key, model, response_model, response, size
+                ) VALUES (?, ?, ?, ?, ?)
+            """, (key, model, response_model, response,
+                  len(response.encode('utf-8'))))
+            conn.commit()
+
+        if max_entries is not None:
+            self.prune_cache(max_entries=max_entries)
+
+    def get_cache_stats(self):
+        """Get statistics about the LLM response cache.
+
+        Returns:
+            list[dict]: One entry per response model with the keys
+                        response_model, entries, size, hits and
+                        last_accessed
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute("""
+                SELECT response_model, COUNT(*), SUM(size), SUM(hits),
+                       MAX(accessed_at)
+                FROM llm_cache
+                GROUP BY response_model
+                ORDER BY response_model
+            """)
+            return [{
+                'response_model': row[0],
+                'entries': row[1],
+                'size': row[2],
+                'hits': row[3],
+                'last_accessed': datetime.fromisoformat(row[4]),
+            } for row in cursor.fetchall()]
+
+    def prune_cache(self, max_entries=None, max_size=None,
+                    older_than_days=None):
+        """Evict entries from the LLM response cache.
+
+        Entries not used for older_than_days are removed first, then the
+        least recently used entries until the cache fits max_entries and
+        max_size. Without arguments the cache is cleared.
+
+        Args:
+            max_entries: Maximum number of entries to keep (optional)
+            max_size: Maximum total size of the responses in bytes (optional)
+            older_than_days: Remove entries not used for this many days
+                             (optional)
+
+        Returns:
+            int: Number of entries removed
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            if max_entries is None and max_size is None and \
+                    older_than_days is None:
+                cursor.execute("DELETE FROM llm_cache")
+                conn.commit()
+                return cursor.rowcount
+
+            removed = 0
+            if older_than_days is not None:
+                cursor.execute("""
+                    DELETE FROM llm_cache
+                    WHERE accessed_at < datetime('now', ?)
+                """, (f'-{older_than_days} days',))
+                removed += cursor.rowcount
+
+            if max_entries is not None:
+                cursor.execute("""
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache
+                        ORDER BY accessed_at DESC, rowid DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                """, (max_entries,))
+                removed += cursor.rowcount
+
+            if max_size is not None:
+                cursor.execute("""
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (
+                                ORDER BY accessed_at DESC, rowid DESC
+                            ) AS total
+                            FROM llm_cache
+                        ) WHERE total > ?
+                    )
+                """, (max_size,))
+                removed += cursor.rowcount
+
+            conn.commit()
+            return removed
+
+    def insert_run(self, deck_id, input_hash):
+        """Start a new pipeline run.
+
+        Args:
+            deck_id: ID of the deck the run creates notes for
+            input_hash: Hash identifying the input of the run
+
+        Returns:
+            int: ID of the run
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute(
+                "INSERT INTO runs (deck_id, input_hash) VALUES (?, ?)",
+                (deck_id, input_hash)
+            )
+            conn.commit()
+            return cursor.lastrowid
+
+    def get_unfinished_run(self, deck_id, input_hash):
+        """Get the latest run for an input that has not completed.
+
+        Args:
+            deck_id: ID of the deck
+            input_hash: Hash identifying the input of the run
+
+        Returns:
+            Run: Run object if found, None if not found
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute("""
+                SELECT id, deck_id, input_hash, status, created_at
+                FROM runs
+                WHERE deck_id = ? AND input_hash = ? AND status = 'running'
+                ORDER BY id DESC
+                LIMIT 1
+            """, (deck_id, input_hash))
+            row = cursor.fetchone()
+            if row:
+                return Run(
+                    id=row[0],
+                    deck_id=row[1],
+                    input_hash=row[2],
+                    status=row[3],
+                    created_at=datetime.fromisoformat(row[4]),
+                )
+            return None
+
+    def complete_run(self, run_id):
+        """Mark a run as completed and drop its checkpoints.
+
+        Args:
+            run_id: ID of the run
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute(
+                "UPDATE runs SET status = 'completed' WHERE id = ?",
+                (run_id,)
+            )
+            cursor.execute("DELETE FROM run_checkpoints WHERE run_id = ?",
+                           (run_id,))
+            conn.commit()
+
+    def save_checkpoint(self, run_id, stage, data, item=0):
+        """Save the output of a pipeline stage.
+
+        Args:
+            run_id: ID of the run
+            stage: Name of the stage, e.g. 'summary'
+            data: Serialized output of the stage
+            item: Index of the item for stages with several outputs
+                  (default: 0)
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO run_checkpoints (
+                    run_id, stage, item, data
+                ) VALUES (?, ?, ?, ?)
+            """, (run_id, stage, item, data))
+            conn.commit()
+
+    def get_checkpoints(self, run_id, stage):
+        """Get the saved outputs of a pipeline stage.
+
+        Args:
+            run_id: ID of the run
+            stage: Name of the stage
+
+        Returns:
+            dict: Item index to serialized output
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute("""
+                SELECT item, data FROM run_checkpoints
+                WHERE run_id = ? AND stage = ?
+                ORDER BY item
+            """, (run_id, stage))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def delete_checkpoints(self, run_id, stage):
+        """Delete the saved outputs of a pipeline stage.
+
+        Args:
+            run_id: ID of the run
+            stage: Name of the stage
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute("""
+                DELETE FROM run_checkpoints WHERE run_id = ? AND stage = ?
+            """, (run_id, stage))
+            conn.commit()
+
+    def get_transcript_topics(self, checksums, model):
+        """Get the cached topics of transcripts.
+
+        Args:
+            checksums: Checksums of the transcripts
+            model: Name of the model that extracted the topics
+
+        Returns:
+            dict: Checksum to JSON of the LectureTopics, for the transcripts
+                  with cached topics
+        """
+        checksums = list(checksums)
+        if not checksums:
+            return {}
+        placeholders = ', '.join('?' * len(checksums))
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.execute(f"""
+                SELECT checksum, topics FROM transcript_topics
+                WHERE model = ? AND checksum IN ({placeholders})
+            """, (model, *checksums))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def insert_transcript_topics(self, topics, model):
+        """Cache the topics of transcripts.
+
+        Args:
+            topics: Dict of checksum to JSON of the LectureTopics
+            model: Name of the model that extracted the topics
+        """
+        conn = self.connect()
+        with closing(conn.cursor()) as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO transcript_topics (
+                    checksum, model, topics
+                ) VALUES (?, ?, ?)
+            """, [(checksum, model, data)
+                  for checksum, data in topics.items()])
+            conn.commit()
@@ -68,3 +68,33 @@ class ClientImport(BaseModel):
     id: Optional[int] = None
     client_id: str
     created_at: Optional[datetime] = None
+
+
+class CachedResponse(BaseModel):
+    """Model representing a cached LLM response.
+
+    The response is the validated structured output of a request, stored as
+    JSON and keyed by a hash of everything that determines the response.
+    """
+    key: str
+    model: str
+    response_model: str
+    response: str
+    size: int
+    hits: int = 0
+    created_at: datetime
+    accessed_at: datetime
+
+
+class Run(BaseModel):
+    """Model representing a run of the note pipeline for a deck.
+
+    A run groups the checkpoints of the pipeline stages, so an interrupted
+    run can be resumed. The input hash identifies the transcript the run
+    was started for.
+    """
+    id: int
+    deck_id: int
+    input_hash: str
+    status: Literal['running', 'completed']
+    created_at: datetime
@@ -50,3 +50,49 @@ CREATE TABLE IF NOT EXISTS note_client_imports (
     FOREIGN KEY (client_import_id) REFERENCES client_imports(id),
     UNIQUE(note_id, client_import_id)
 );
+
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response_model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    accessed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    deck_id INTEGER NOT NULL,
+    input_hash TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running'
+        CHECK(status IN ('running', 'completed')),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (deck_id) REFERENCES decks(id)
+);
+
+CREATE TABLE IF NOT EXISTS run_checkpoints (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    item INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (run_id) REFERENCES runs(id),
+    UNIQUE(run_id, stage, item)
+);
+
+CREATE TABLE IF NOT EXISTS transcript_topics (
+    checksum TEXT NOT NULL,
+    model TEXT NOT NULL,
+    topics TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (checksum, model)
+);
+
+CREATE TABLE IF NOT EXISTS note_signatures (
+    note_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL,
+    FOREIGN KEY (note_id) REFERENCES notes(id)
+);
@@ -33,3 +33,20 @@ def get_checksum(path):
     with open(path, 'rb') as f:
         return zlib.adler32(f.read())
     return zlib.adler32(f.read())
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a text without calling the API.
+
+    Uses the rule of thumb of roughly four characters per token for English
+    prose, which is accurate enough for budgeting requests.
+
+    Args:
+        text: Text to estimate (str or None)
+
+    Returns:
+        int: Estimated number of tokens
+    """
+    if not text:
+        return 0
+    return len(text) // 4 + 1
@@ -0,0 +1,160 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+import minddb.llm
+from minddb.llm import retries
+from minddb.llm.backends import Backend, FakeBackend, LocalBackend, \
+    RateLimited, Recorder, Replay, set_backend
+from minddb.llm.cache import cache_key
+from minddb.llm.concurrency import is_overload
+from minddb.llm.ratelimit import RateLimiter
+from minddb.mindnote.summary import LectureTopics
+
+REQUEST = dict(response_model=LectureTopics, max_tokens=100,
+               messages=[{'role': 'user', 'content': 'Topics'}])
+
+
+@pytest.fixture
+def client():
+    client = Mock()
+    with patch('minddb.async_client', return_value=(client, 'model')), \
+         patch('minddb.llm.calls.get_rate_limiter',
+               return_value=RateLimiter()), \
+         patch('minddb.llm.cache.ENABLED', False):
+        yield client
+    set_backend(None)
+    retries.reset()
+
+
+def record(client, path):
+    """Record one structured and one streamed response to a cassette."""
+    client.messages.create_with_completion = AsyncMock(return_value=(
+        LectureTopics(lecture_topic='Evals'),
+        SimpleNamespace(usage=None)))
+
+    async def create_iterable(**kwargs):
+        for topic in ['A', 'B']:
+            yield LectureTopics(lecture_topic=topic)
+
+    client.messages.create_iterable = Mock(side_effect=create_iterable)
+
+    async def run():
+        await minddb.llm.acreate(**REQUEST)
+        return [item async for item in minddb.llm.astream(**REQUEST)]
+
+    set_backend(Recorder(path))
+    asyncio.run(run())
+
+
+def test_replay_serves_recorded_responses(client, tmp_path):
+    """Test recorded responses are replayed without calling the API."""
+    # Given
+    path = tmp_path / 'cassette.jsonl'
+    record(client, path)
+    client.reset_mock()
+    set_backend(Replay(path))
+
+    async def run():
+        response = await minddb.llm.acreate(**REQUEST)
+        items = [item async for item in minddb.llm.astream(**REQUEST)]
+        return response, items
+
+    # When
+    response, items = asyncio.run(run())
+
+    # Then
+    assert response == LectureTopics(lecture_topic='Evals')
+    assert [item.lecture_topic for item in items] == ['A', 'B']
+    client.messages.create_with_completion.assert_not_called()
+    client.messages.create_iterable.assert_not_called()
+
+
+def test_replay_rejects_unrecorded_requests(client, tmp_path):
+    """Test a request missing from the cassette fails loudly."""
+    # Given
+    path = tmp_path / 'cassette.jsonl'
+    path.write_text('')
+    set_backend(Replay(path))
+
+    # When/Then
+    with pytest.raises(KeyError):
+        asyncio.run(minddb.llm.acreate(**REQUEST))
+
+
+def test_replay_injects_errors_and_latency(client, tmp_path):
+    """Test replay can simulate slow and failing requests."""
+    # Given
+    key = cache_key('model', REQUEST['messages'], None, LectureTopics)
+    path = tmp_path / 'cassette.jsonl'
+    path.write_text(json.dumps({
+        'key': key,
+        'response_model': 'LectureTopics',
+        'response': '{"lecture_topic": "Evals"}',
+        'latency': 2.0,
+    }))
+    set_backend(Replay(path, latency_scale=0.5, error_rate=1.0))
+
+    # When/Then
+    with patch('asyncio.sleep', AsyncMock()) as sleep:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(minddb.llm.acreate(**REQUEST))
+    # The recorded latency, then the latency of each retry after a backoff
+    latencies = [c.args[0] for c in sleep.await_args_list]
+    assert latencies[0] == 1.0
+    assert latencies.count(1.0) == retries.MAX_RETRIES + 1
+
+
+def test_backends_have_to_implement_their_interface():
+    """Test incomplete backends cannot be created."""
+    class Incomplete(LocalBackend):
+        async def respond(self, key, response_model, context=None,
+                          model=None):
+            return None
+
+    with pytest.raises(TypeError):
+        Backend()
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_fake_backend_generates_responses(client):
+    """Test the fake backend answers from the respond function."""
+    # Given
+    respond = Mock(return_value=LectureTopics(lecture_topic='Fake'))
+    set_backend(FakeBackend(respond))
+
+    # When
+    response = asyncio.run(minddb.llm.acreate(**REQUEST, context={'a': 1}))
+
+    # Then
+    assert response.lecture_topic == 'Fake'
+    respond.assert_called_once_with(LectureTopics, {'a': 1})
+    client.messages.create_with_completion.assert_not_called()
+
+
+def test_fake_backend_rate_limits(client):
+    """Test requests above the rate limit are retried, then fail."""
+    # Given
+    limiter = RateLimiter()
+    backend = FakeBackend(Mock(return_value=LectureTopics(lecture_topic='A')),
+                          requests_per_minute=1, max_retries=1)
+
+    async def run():
+        await backend.respond('key', LectureTopics)
+        await backend.respond('key', LectureTopics)
+
+    # When
+    with patch('minddb.llm.backends.get_rate_limiter',
+               return_value=limiter), \
+         patch('asyncio.sleep', AsyncMock()) as sleep, \
+         pytest.raises(RateLimited) as error:
+        asyncio.run(run())
+
+    # Then
+    assert is_overload(error.value)
+    sleep.assert_awaited_once()
+    assert 59 < sleep.await_args.args[0] <= 60
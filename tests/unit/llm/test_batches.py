@@ -0,0 +1,75 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from minddb.llm.batches import FakeBatches, create_batch
+from minddb.mindnote.summary import LectureTopics
+
+
+@pytest.fixture(autouse=True)
+def mock_client():
+    with patch('minddb.async_client', return_value=(Mock(), 'model')), \
+         patch('minddb.llm.cache.ENABLED', False):
+        yield
+
+
+def respond(params):
+    content = params['messages'][0]['content']
+    if 'fail' in content:
+        return None
+    return {'lecture_topic': content}
+
+
+def test_create_batch_maps_results_to_requests():
+    """Test results are validated and returned in request order."""
+    # Given
+    messages = [{'role': 'user', 'content': '{{topic}}'}]
+    requests = [(messages, {'topic': 'A'}), (messages, {'topic': 'B'})]
+    batches = FakeBatches(respond, polls=2)
+
+    # When
+    responses = asyncio.run(create_batch(
+        LectureTopics, requests, max_tokens=100, batches=batches,
+        poll_interval=0))
+
+    # Then
+    assert responses == [LectureTopics(lecture_topic='A'),
+                         LectureTopics(lecture_topic='B')]
+
+
+def test_create_batch_sends_tool_call_params():
+    """Test requests force a tool call with the response model schema."""
+    # Given
+    seen = []
+    batches = FakeBatches(lambda params: seen.append(params) or {
+        'lecture_topic': 'A'})
+    requests = [([{'role': 'user', 'content': 'A'}], {})]
+
+    # When
+    asyncio.run(create_batch(LectureTopics, requests, max_tokens=100,
+                             batches=batches, poll_interval=0))
+
+    # Then
+    assert seen[0]['model'] == 'model'
+    assert seen[0]['max_tokens'] == 100
+    assert seen[0]['tool_choice'] == {'type': 'tool',
+                                      'name': 'LectureTopics'}
+    assert seen[0]['tools'][0]['input_schema'] == \
+        LectureTopics.model_json_schema()
+
+
+def test_create_batch_returns_none_for_failed_requests():
+    """Test errored requests are returned as None."""
+    # Given
+    messages = [{'role': 'user', 'content': '{{topic}}'}]
+    requests = [(messages, {'topic': 'fail'}), (messages, {'topic': 'B'})]
+
+    # When
+    responses = asyncio.run(create_batch(
+        LectureTopics, requests, max_tokens=100,
+        batches=FakeBatches(respond), poll_interval=0))
+
+    # Then
+    assert responses[0] is None
+    assert responses[1] == LectureTopics(lecture_topic='B')
@@ -0,0 +1,127 @@
+import itertools
+from unittest.mock import Mock, patch
+
+import pytest
+
+from minddb.llm import cache
+from minddb.mindnote.summary import LectureTopics
+from minddb.storage import DB
+
+
+@pytest.fixture
+def catalog():
+    db = DB(':memory:')
+    with patch('minddb.storage.get_catalog', return_value=db):
+        yield db
+    db.close()
+
+
+def test_cache_key_is_stable():
+    """Test identical requests map to the same key."""
+    # Given
+    messages = [{'role': 'user', 'content': '{{transcript}}'}]
+
+    # When
+    first = cache.cache_key('m', messages, {'transcript': 'a'},
+                            LectureTopics)
+    second = cache.cache_key('m', messages, {'transcript': 'a'},
+                             LectureTopics)
+
+    # Then
+    assert first == second
+
+
+@pytest.mark.parametrize('model, content, transcript', [
+    ('other', '{{transcript}}', 'a'),
+    ('m', 'Summarize {{transcript}}', 'a'),
+    ('m', '{{transcript}}', 'b'),
+])
+def test_cache_key_covers_request(model, content, transcript):
+    """Test model, template and context all change the key."""
+    # Given
+    messages = [{'role': 'user', 'content': '{{transcript}}'}]
+    base = cache.cache_key('m', messages, {'transcript': 'a'}, LectureTopics)
+
+    # When
+    key = cache.cache_key(model, [{'role': 'user', 'content': content}],
+                          {'transcript': transcript}, LectureTopics)
+
+    # Then
+    assert key != base
+
+
+def test_cache_key_covers_options():
+    """Test the sampling options change the key, and no options keep it."""
+    # Given
+    messages = [{'role': 'user', 'content': '{{transcript}}'}]
+    base = cache.cache_key('m', messages, {'transcript': 'a'}, LectureTopics)
+
+    # When
+    cold = cache.cache_key('m', messages, {'transcript': 'a'}, LectureTopics,
+                           {'temperature': 0.0})
+    hot = cache.cache_key('m', messages, {'transcript': 'a'}, LectureTopics,
+                          {'temperature': 1.0})
+    none = cache.cache_key('m', messages, {'transcript': 'a'}, LectureTopics,
+                           {})
+
+    # Then
+    assert len({base, cold, hot}) == 3
+    assert none == base
+
+
+def test_cache_key_accepts_pydantic_context():
+    """Test pydantic models in the context can be hashed."""
+    topics = LectureTopics(lecture_topic='Evals')
+    assert cache.cache_key('m', [], {'topics': topics}, LectureTopics)
+
+
+def test_put_and_get_roundtrip(catalog):
+    """Test a stored response is returned as a validated model."""
+    # Given
+    topics = LectureTopics(lecture_topic='Evals', key_concepts=['Recall'])
+
+    # When
+    cache.put('key', 'm', topics)
+    cached = cache.get('key', LectureTopics)
+
+    # Then
+    assert cached == topics
+
+
+def test_put_evicts_every_prune_interval():
+    """Test the cache is pruned on the first insert and every interval."""
+    # Given
+    catalog = Mock()
+    topics = LectureTopics(lecture_topic='Evals')
+
+    # When
+    with patch('minddb.storage.get_catalog', return_value=catalog), \
+            patch.object(cache, 'PRUNE_INTERVAL', 3), \
+            patch.object(cache, '_inserts', itertools.count()):
+        for i in range(4):
+            cache.put(f'key{i}', 'm', topics)
+
+    # Then
+    limits = [c.kwargs['max_entries']
+              for c in catalog.insert_cached_response.call_args_list]
+    assert limits == [cache.MAX_ENTRIES, None, None, cache.MAX_ENTRIES]
+
+
+def test_get_returns_none_when_disabled(catalog):
+    """Test the cache is bypassed when disabled."""
+    # Given
+    cache.put('key', 'm', LectureTopics(lecture_topic='Evals'))
+
+    # When
+    with patch.object(cache, 'ENABLED', False):
+        cached = cache.get('key', LectureTopics)
+
+    # Then
+    assert cached is None
+
+
+def test_get_without_catalog_returns_none():
+    """Test the cache is skipped if no catalog is configured."""
+    with patch('minddb.storage.get_catalog',
+               Mock(side_effect=RuntimeError('not configured'))):
+        assert cache.get('key', LectureTopics) is None
@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+import minddb.llm
+from minddb.llm import retries
+from minddb.llm.backends import RateLimited
+from minddb.llm.ratelimit import RateLimiter
+from minddb.mindnote.summary import LectureTopics
+from minddb.storage import DB
+
+
+@pytest.fixture
+def catalog():
+    db = DB(':memory:')
+    with patch('minddb.storage.get_catalog', return_value=db):
+        yield db
+    db.close()
+
+
+@pytest.fixture
+def client():
+    client = Mock()
+    with patch('minddb.async_client', return_value=(client, 'model')), \
+         patch('minddb.llm.calls.get_rate_limiter',
+               return_value=RateLimiter()):
+        yield client
+
+
+def test_acreate_renders_and_caches(catalog, client):
+    """Test the request is rendered and a second call is a cache hit."""
+    # Given
+    usage = SimpleNamespace(input_tokens=10, output_tokens=5)
+    client.messages.create_with_completion = AsyncMock(return_value=(
+        LectureTopics(lecture_topic='Evals'), SimpleNamespace(usage=usage)))
+    request = dict(response_model=LectureTopics, max_tokens=100,
+                   messages=[{'role': 'user', 'content': '{{topic}}'}],
+                   context={'topic': 'Evals'})
+
+    # When
+    first = asyncio.run(minddb.llm.acreate(**request))
+    second = asyncio.run(minddb.llm.acreate(**request))
+
+    # Then
+    assert first == second == LectureTopics(lecture_topic='Evals')
+    client.messages.create_with_completion.assert_awaited_once()
+    kwargs = client.messages.create_with_completion.call_args.kwargs
+    assert kwargs['messages'] == [{'role': 'user', 'content': 'Evals'}]
+
+
+def test_astream_yields_items_and_caches_list(catalog, client):
+    """Test streamed items are yielded one by one and cached as a list."""
+    # Given
+    async def create_iterable(**kwargs):
+        for topic in ['A', 'B']:
+            yield LectureTopics(lecture_topic=topic)
+
+    client.messages.create_iterable = Mock(side_effect=create_iterable)
+    request = dict(response_model=LectureTopics, max_tokens=100,
+                   messages=[{'role': 'user', 'content': 'Topics'}])
+
+    async def collect():
+        return [item async for item in minddb.llm.astream(**request)]
+
+    # When
+    first = asyncio.run(collect())
+    second = asyncio.run(collect())
+
+    # Then
+    assert [t.lecture_topic for t in first] == ['A', 'B']
+    assert second == first
+    assert client.messages.create_iterable.call_count == 1
+
+
+def test_astream_times_out_between_items(client):
+    """Test a stream stalling longer than timeout is aborted."""
+    # Given
+    async def create_iterable(**kwargs):
+        yield LectureTopics(lecture_topic='A')
+        await asyncio.sleep(10)
+
+    client.messages.create_iterable = Mock(side_effect=create_iterable)
+
+    async def collect():
+        return [item async for item in minddb.llm.astream(
+            response_model=LectureTopics, max_tokens=100,
+            messages=[{'role': 'user', 'content': 'Topics'}],
+            timeout=0.01)]
+
+    # When/Then
+    with patch('minddb.llm.cache.ENABLED', False), \
+         pytest.raises(asyncio.TimeoutError):
+        asyncio.run(collect())
+
+
+def test_failed_attempt_refunds_its_reservation(client):
+    """Test a retry does not wait for the budget of the failed attempt."""
+    # Given
+    limiter = RateLimiter(output_tokens_per_minute=100)
+    usage = SimpleNamespace(input_tokens=10, output_tokens=5)
+    client.messages.create_with_completion = AsyncMock(side_effect=[
+        RateLimited(0),
+        (LectureTopics(lecture_topic='Evals'), SimpleNamespace(usage=usage)),
+    ])
+    retries.reset()
+
+    with patch('minddb.llm.calls.get_rate_limiter', return_value=limiter), \
+         patch('minddb.llm.cache.ENABLED', False), \
+         patch.object(retries, 'backoff', return_value=0):
+        # When
+        result = asyncio.run(asyncio.wait_for(minddb.llm.acreate(
+            response_model=LectureTopics, max_tokens=100,
+            messages=[{'role': 'user', 'content': 'Topics'}]), 1))
+    retries.reset()
+
+    # Then
+    assert result == LectureTopics(lecture_topic='Evals')
+    assert limiter.bucket('output-tokens').tokens == pytest.approx(95, 1)
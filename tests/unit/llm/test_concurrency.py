@@ -0,0 +1,177 @@
+import asyncio
+from unittest.mock import Mock
+
+import anthropic
+import pytest
+
+from minddb.llm.concurrency import AdaptiveLimiter, gather, is_overload
+
+
+def status_error(status_code):
+    response = Mock(status_code=status_code, headers={})
+    return anthropic.APIStatusError('error', response=response, body=None)
+
+
+@pytest.mark.parametrize('exc, expected', [
+    (asyncio.TimeoutError(), True),
+    (status_error(429), True),
+    (status_error(529), True),
+    (status_error(400), False),
+    (ValueError('invalid'), False),
+])
+def test_is_overload(exc, expected):
+    """Test overload errors are told apart from other failures."""
+    assert is_overload(exc) is expected
+
+
+def test_is_overload_follows_cause():
+    """Test errors wrapped by retry helpers are classified by their cause."""
+    # Given
+    try:
+        try:
+            raise status_error(429)
+        except anthropic.APIStatusError as e:
+            raise RuntimeError('retries exhausted') from e
+    except RuntimeError as e:
+        wrapped = e
+
+    # When/Then
+    assert is_overload(wrapped)
+
+
+def test_limit_grows_additively_up_to_maximum():
+    """Test healthy calls raise the limit up to the ceiling."""
+    # Given
+    limiter = AdaptiveLimiter(initial=1, maximum=3)
+
+    # When
+    for _ in range(20):
+        limiter.on_success(1.0)
+
+    # Then
+    assert limiter.limit == 3
+
+
+def test_limit_holds_on_slow_calls():
+    """Test calls well above the latency baseline do not raise the limit."""
+    # Given
+    limiter = AdaptiveLimiter(initial=2, maximum=8)
+    limiter.on_success(1.0)
+    limit = limiter._limit
+
+    # When
+    limiter.on_success(10.0)
+
+    # Then
+    assert limiter._limit == limit
+
+
+def test_limit_halves_on_overload():
+    """Test overload errors lower the limit multiplicatively."""
+    # Given
+    limiter = AdaptiveLimiter(initial=8, maximum=8)
+
+    # When
+    limiter.on_overload()
+
+    # Then
+    assert limiter.limit == 4
+
+
+def test_slot_bounds_concurrency():
+    """Test no more than limit calls run at the same time."""
+    # Given
+    limiter = AdaptiveLimiter(initial=2, maximum=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.active)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*[call() for _ in range(6)])
+
+    # When
+    asyncio.run(run())
+
+    # Then
+    assert peak == 2
+    assert limiter.active == 0
+
+
+def test_slot_backs_off_on_timeout():
+    """Test a timeout inside a slot lowers the limit and is re-raised."""
+    # Given
+    limiter = AdaptiveLimiter(initial=4, maximum=4)
+
+    async def call():
+        async with limiter.slot():
+            raise asyncio.TimeoutError()
+
+    # When
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(call())
+
+    # Then
+    assert limiter.limit == 2
+
+
+def test_gather_returns_results_in_order():
+    """Test results are returned in the order of the awaitables."""
+    async def value(v, delay):
+        await asyncio.sleep(delay)
+        return v
+
+    async def run():
+        return await gather(value(1, 0.02), value(2, 0))
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_gather_cancels_remaining_on_failure():
+    """Test a failure cancels the awaitables still running."""
+    # Given
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def fail():
+        raise ValueError('failed')
+
+    async def run():
+        await gather(slow(), fail())
+
+    # When
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+    # Then
+    assert cancelled == [True]
+
+
+def test_gather_limits_concurrency():
+    """Test no more than limit awaitables run at the same time."""
+    # Given
+    running = []
+    peak = []
+
+    async def call(i):
+        running.append(i)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(i)
+        return i
+
+    # When
+    results = asyncio.run(gather(*[call(i) for i in range(6)], limit=2))
+
+    # Then
+    assert results == list(range(6))
+    assert max(peak) == 2
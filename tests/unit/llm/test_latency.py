@@ -0,0 +1,204 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+import minddb.llm
+from minddb.llm import latency, metrics, retries
+from minddb.llm.backends import FakeBackend, lognormal, set_backend
+from minddb.llm.ratelimit import RateLimiter
+from minddb.mindnote.summary import LectureTopics
+
+
+@pytest.fixture(autouse=True)
+def reset_latencies():
+    latency.reset()
+    metrics.reset()
+    yield
+    latency.reset()
+    metrics.reset()
+
+
+def observe(stage, seconds, count=latency.MIN_SAMPLES):
+    for _ in range(count):
+        latency.observe(stage, seconds)
+
+
+def test_tracker_estimates_percentiles_of_recent_calls():
+    """Test percentiles need enough samples and follow recent latencies."""
+    # Given
+    tracker = latency.LatencyTracker(window=100, min_samples=10)
+
+    # When/Then
+    for i in range(9):
+        tracker.observe(1.0)
+    assert tracker.quantile(0.95) is None
+    for i in range(91):
+        tracker.observe(float(i))
+    assert tracker.quantile(0.5) == 41.0
+    for i in range(100):
+        tracker.observe(2.0)
+    assert tracker.quantile(0.95) == 2.0
+
+
+def test_timeout_adapts_within_bounds():
+    """Test timeouts follow the p95 latency between the bounds."""
+    # When/Then
+    assert latency.timeout('review', 30) == 30
+    observe('review', 4.0)
+    assert latency.timeout('review', 30) == 12.0
+    observe('notes', 0.1)
+    assert latency.timeout('notes', 30) == latency.MIN_TIMEOUT
+    observe('summary', 20.0)
+    assert latency.timeout('summary', 30) == 30
+
+
+def test_timeout_widens_after_timeouts_in_a_row():
+    """Test timed out calls widen the timeout until it fits the latency."""
+    # Given
+    observe('review', 1.0, count=50)
+    assert latency.timeout('review', 30) == 5.0
+
+    # When the API slows down to 8s, every call times out at first
+    timeouts = []
+    while latency.timeout('review', 30) < 8.0:
+        timeouts.append(latency.timeout('review', 30))
+        latency.observe_timeout('review', timeouts[-1])
+
+    # Then
+    assert timeouts == [5.0]
+    assert latency.timeout('review', 30) == 10.0
+    observe('review', 8.0, count=10)
+    assert latency.timeout('review', 30) == 24.0
+
+
+def test_timed_out_calls_adapt_the_timeout():
+    """Test calls recover after the latency shifts above the timeout."""
+    # Given
+    retries.reset()
+    observe('review', 0.005, count=50)
+    backend = FakeBackend(Mock(return_value=LectureTopics(lecture_topic='A')),
+                          latency=lognormal(0.05, sigma=0))
+    set_backend(backend)
+
+    async def run():
+        for attempt in range(10):
+            try:
+                return attempt, await minddb.llm.acreate(
+                    response_model=LectureTopics, max_tokens=100,
+                    messages=[{'role': 'user', 'content': 'Topics'}],
+                    timeout=latency.timeout('review', 1.0), stage='review')
+            except asyncio.TimeoutError:
+                pass
+
+    # When
+    with patch('minddb.async_client', return_value=(Mock(), 'model')), \
+         patch('minddb.llm.calls.get_rate_limiter',
+               return_value=RateLimiter()), \
+         patch('minddb.llm.cache.ENABLED', False), \
+         patch('minddb.llm.retries.backoff', return_value=0), \
+         patch('minddb.llm.latency.MIN_TIMEOUT', 0.01):
+        try:
+            attempt, response = asyncio.run(run())
+        finally:
+            set_backend(None)
+            retries.reset()
+
+    # Then
+    assert response.lecture_topic == 'A'
+    assert attempt < 3
+    assert latency.get_tracker('review').timeouts == 0
+
+
+def slow_then_fast():
+    """Create a call whose first attempt hangs and later ones answer."""
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+            return 'primary'
+        return 'hedge'
+    return call, calls
+
+
+def test_hedge_keeps_first_response():
+    """Test a slow call is duplicated and the duplicate answer is kept."""
+    # Given
+    observe('review', 0.01)
+    call, calls = slow_then_fast()
+
+    # When
+    with patch.object(latency, 'HEDGING', True):
+        result = asyncio.run(latency.hedge(call, 'review'))
+
+    # Then
+    assert result == 'hedge'
+    assert len(calls) == 2
+    assert metrics.get_counter('minddb_hedged', stage='review',
+                               winner='hedge') == 1
+
+
+def test_hedge_needs_hedging_and_latencies():
+    """Test calls are not duplicated when hedging is off or unestimated."""
+    async def run(call):
+        return await asyncio.wait_for(latency.hedge(call, 'review'), 0.1)
+
+    # Given
+    unestimated, unestimated_calls = slow_then_fast()
+    disabled, disabled_calls = slow_then_fast()
+
+    # When/Then
+    with patch.object(latency, 'HEDGING', True):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(run(unestimated))
+    observe('review', 0.01)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run(disabled))
+    assert unestimated_calls == [0]
+    assert disabled_calls == [0]
+
+
+def test_hedge_raises_when_both_calls_fail():
+    """Test the error is raised once neither call succeeded."""
+    # Given
+    observe('review', 0.01)
+
+    async def call():
+        await asyncio.sleep(0.05)
+        raise ValueError('failed')
+
+    # When/Then
+    with patch.object(latency, 'HEDGING', True):
+        with pytest.raises(ValueError):
+            asyncio.run(latency.hedge(call, 'review'))
+
+
+def test_hedge_cancels_call_when_cancelled():
+    """Test cancelling a hedged call before the delay cancels the call."""
+    # Given
+    observe('review', 10.0)
+    cancelled = []
+
+    async def call():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        task = asyncio.ensure_future(latency.hedge(call, 'review'))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return list(cancelled)
+
+    # When
+    with patch.object(latency, 'HEDGING', True):
+        result = asyncio.run(run())
+
+    # Then
+    assert result == [True]
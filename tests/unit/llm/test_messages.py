@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+from minddb.llm import usage
+from minddb.llm.messages import cached, render, text
+
+
+@pytest.fixture(autouse=True)
+def reset_usage():
+    usage.reset()
+    yield
+    usage.reset()
+
+
+def test_render_fills_string_templates():
+    """Test string message templates are rendered with the context."""
+    messages = [{'role': 'user', 'content': 'Topic: {{topic}}'}]
+    assert render(messages, {'topic': 'Evals'}) == [
+        {'role': 'user', 'content': 'Topic: Evals'}
+    ]
+
+
+def test_render_fills_content_blocks_and_keeps_cache_control():
+    """Test text blocks are rendered and keep their cache breakpoints."""
+    # Given
+    messages = [{'role': 'user', 'content': [
+        cached('{{transcript}}'),
+        text('Summarize {{topic}}'),
+    ]}]
+
+    # When
+    rendered = render(messages, {'transcript': 'T', 'topic': 'Evals'})
+
+    # Then
+    assert rendered[0]['content'] == [
+        {'type': 'text', 'text': 'T', 'cache_control': {'type': 'ephemeral'}},
+        {'type': 'text', 'text': 'Summarize Evals'},
+    ]
+    assert messages[0]['content'][0]['text'] == '{{transcript}}'
+
+
+def test_usage_is_recorded_per_stage():
+    """Test token usage including cache hits is summed per stage."""
+    # Given
+    response = SimpleNamespace(input_tokens=10, output_tokens=5,
+                               cache_creation_input_tokens=0,
+                               cache_read_input_tokens=1000)
+
+    # When
+    usage.record('review', response)
+    usage.record('review', response)
+    usage.record('summary', SimpleNamespace(input_tokens=3,
+                                            output_tokens=1))
+
+    # Then
+    totals = usage.get_usage()
+    assert totals['review']['requests'] == 2
+    assert totals['review']['cache_read_input_tokens'] == 2000
+    assert totals['summary']['cache_read_input_tokens'] == 0
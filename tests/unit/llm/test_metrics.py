@@ -0,0 +1,83 @@
+import asyncio
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from minddb.llm import metrics, usage
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    usage.reset()
+    yield
+    metrics.reset()
+    usage.reset()
+
+
+def test_timed_records_outcome_and_duration():
+    """Test a timed call counts its outcome and observes its duration."""
+    # When
+    with metrics.timed('review'):
+        pass
+    with pytest.raises(asyncio.TimeoutError):
+        with metrics.timed('review'):
+            raise asyncio.TimeoutError()
+
+    # Then
+    text = metrics.render()
+    assert 'minddb_calls_total{outcome="ok",stage="review"} 1' in text
+    assert 'minddb_calls_total{outcome="timeout",stage="review"} 1' in text
+    assert ('minddb_call_duration_seconds_count{stage="review"} 2'
+            in text)
+    assert ('minddb_call_duration_seconds_bucket{stage="review",le="+Inf"} 2'
+            in text)
+
+
+def test_parse_errors_count_as_retries_of_current_stage():
+    """Test validation retries are attributed to the running stage."""
+    # When
+    with metrics.timed('summary'):
+        metrics.on_parse_error(ValueError('invalid'))
+
+    # Then
+    assert ('minddb_retries_total{reason="validation",stage="summary"} 1'
+            in metrics.render())
+
+
+def test_render_includes_token_usage():
+    """Test token counters are exported per stage and type."""
+    # Given
+    usage.record('notes', SimpleNamespace(input_tokens=10, output_tokens=5))
+
+    # When
+    text = metrics.render()
+
+    # Then
+    assert 'minddb_tokens_total{stage="notes",type="input"} 10' in text
+    assert 'minddb_tokens_total{stage="notes",type="output"} 5' in text
+    assert text.endswith('# EOF\n')
+
+
+def test_write_and_serve(tmp_path):
+    """Test metrics are written to a file and served over HTTP."""
+    # Given
+    metrics.inc('minddb_notes', 3, stage='storage')
+    path = tmp_path / 'minddb.prom'
+
+    # When
+    metrics.write(path)
+    server = metrics.serve(0)
+    try:
+        url = f'http://127.0.0.1:{server.server_port}/metrics'
+        with urllib.request.urlopen(url) as response:
+            served = response.read().decode('utf-8')
+            content_type = response.headers['Content-Type']
+    finally:
+        server.shutdown()
+
+    # Then
+    assert 'minddb_notes_total{stage="storage"} 3' in path.read_text()
+    assert 'minddb_notes_total{stage="storage"} 3' in served
+    assert content_type.startswith('application/openmetrics-text')
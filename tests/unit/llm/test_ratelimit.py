@@ -0,0 +1,169 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from minddb.llm import ratelimit
+from minddb.llm.ratelimit import RateLimiter, TokenBucket, get_rate_limiter
+
+
+def test_bucket_without_capacity_never_waits():
+    """Test an unconfigured bucket does not limit anything."""
+    # Given
+    bucket = TokenBucket()
+
+    # When
+    delay = bucket.reserve(10 ** 9, now=0)
+
+    # Then
+    assert delay == 0
+
+
+def test_bucket_waits_only_when_exhausted():
+    """Test a bucket only delays once its capacity is used up."""
+    # Given
+    bucket = TokenBucket(60)  # one token per second
+
+    # When/Then
+    assert bucket.reserve(30, now=bucket._updated) == 0
+    assert bucket.reserve(30, now=bucket._updated) == 0
+    assert bucket.reserve(2, now=bucket._updated) == pytest.approx(2.0)
+
+
+def test_bucket_refills_over_time():
+    """Test a bucket refills at capacity per minute."""
+    # Given
+    bucket = TokenBucket(60)
+    start = bucket._updated
+    bucket.reserve(60, now=start)
+
+    # When
+    delay = bucket.reserve(10, now=start + 10)
+
+    # Then
+    assert delay == 0
+
+
+def test_update_learns_limit_and_lowers_remaining():
+    """Test header values set the capacity and lower the remaining tokens."""
+    # Given
+    bucket = TokenBucket()
+
+    # When
+    bucket.update(limit=100, remaining=40, now=0)
+
+    # Then
+    assert bucket.capacity == 100
+    assert bucket.tokens == 40
+
+
+def test_update_from_headers():
+    """Test the limiter reads the anthropic rate limit headers."""
+    # Given
+    limiter = RateLimiter()
+    headers = {
+        'Anthropic-Ratelimit-Requests-Limit': '50',
+        'Anthropic-Ratelimit-Requests-Remaining': '49',
+        'anthropic-ratelimit-input-tokens-limit': '40000',
+        'anthropic-ratelimit-input-tokens-remaining': '1000',
+        'anthropic-ratelimit-output-tokens-limit': '8000',
+        'anthropic-ratelimit-output-tokens-remaining': '8000',
+    }
+
+    # When
+    limiter.update_from_headers(headers)
+
+    # Then
+    assert limiter.bucket('requests').capacity == 50
+    assert limiter.bucket('input-tokens').tokens == pytest.approx(1000, 1)
+    assert limiter.bucket('output-tokens').capacity == 8000
+
+
+def test_retry_after_pauses_requests():
+    """Test a retry-after header holds back the next request."""
+    # Given
+    limiter = RateLimiter()
+
+    # When
+    limiter.update_from_headers({'retry-after': '5'})
+
+    # Then
+    assert limiter.reserve() == pytest.approx(5, abs=0.1)
+
+
+def test_settle_refunds_unused_output_tokens():
+    """Test actual usage returns the unused part of a reservation."""
+    # Given
+    limiter = RateLimiter(output_tokens_per_minute=1000)
+    limiter.reserve(output_tokens=1000)
+    usage = SimpleNamespace(input_tokens=0, output_tokens=100)
+
+    # When
+    limiter.settle(0, 1000, usage)
+
+    # Then
+    assert limiter.bucket('output-tokens').tokens == pytest.approx(900, 1)
+
+
+def test_refund_returns_tokens_of_failed_request():
+    """Test a failed request gives its tokens back but not its request."""
+    # Given
+    limiter = RateLimiter(requests_per_minute=10,
+                          input_tokens_per_minute=1000,
+                          output_tokens_per_minute=1000)
+    limiter.reserve(input_tokens=500, output_tokens=1000)
+
+    # When
+    limiter.refund(500, 1000)
+
+    # Then
+    assert limiter.bucket('input-tokens').tokens == pytest.approx(1000, 1)
+    assert limiter.bucket('output-tokens').tokens == pytest.approx(1000, 1)
+    assert limiter.bucket('requests').tokens == pytest.approx(9, abs=0.1)
+
+
+def test_acquire_sleeps_only_when_budget_used_up():
+    """Test acquire does not sleep while there is budget left."""
+    # Given
+    limiter = RateLimiter(requests_per_minute=60)
+
+    async def run():
+        with patch('asyncio.sleep') as mock_sleep:
+            await limiter.acquire()
+            return mock_sleep.call_count
+
+    # When/Then
+    assert asyncio.run(run()) == 0
+
+
+def test_get_rate_limiter_is_singleton():
+    """Test the rate limiter is shared across calls."""
+    assert get_rate_limiter() is get_rate_limiter()
+
+
+def test_rate_limiters_are_kept_per_model():
+    """Test each model gets its own limiter."""
+    with patch.dict(ratelimit._rate_limiters, clear=True):
+        assert get_rate_limiter('haiku') is get_rate_limiter('haiku')
+        assert get_rate_limiter('haiku') is not get_rate_limiter('sonnet')
+
+
+def test_response_headers_update_limiter_of_requested_model():
+    """Test the response hook routes the headers by the model of the
+    request."""
+    # Given
+    request = SimpleNamespace(content=json.dumps({'model': 'haiku'}).encode())
+    response = SimpleNamespace(request=request, headers={
+        'anthropic-ratelimit-requests-limit': '50',
+        'anthropic-ratelimit-requests-remaining': '10',
+    })
+
+    with patch.dict(ratelimit._rate_limiters, clear=True):
+        # When
+        asyncio.run(ratelimit.aobserve_response(response))
+
+        # Then
+        assert get_rate_limiter('haiku').bucket('requests').capacity == 50
+        assert get_rate_limiter('sonnet').bucket('requests').capacity is None
@@ -0,0 +1,147 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from minddb.llm import metrics, retries
+from minddb.llm.backends import RateLimited
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    retries.reset()
+    metrics.reset()
+    with patch.object(retries, 'backoff', return_value=0):
+        yield
+    retries.reset()
+    metrics.reset()
+
+
+def failing(*errors, result='ok'):
+    """Create a call failing with the given errors, then succeeding."""
+    errors = list(errors)
+
+    async def call():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return AsyncMock(side_effect=call)
+
+
+def test_is_transient():
+    """Test overload, server and timeout errors are transient."""
+    assert retries.is_transient(ServerError())
+    assert retries.is_transient(RateLimited(1.0))
+    assert retries.is_transient(asyncio.TimeoutError())
+    assert not retries.is_transient(ValueError())
+    try:
+        try:
+            raise ServerError()
+        except ServerError as e:
+            raise RuntimeError('retries exhausted') from e
+    except RuntimeError as e:
+        assert retries.is_transient(e)
+
+
+def test_budget_caps_retries_to_share_of_successes():
+    """Test retries are denied once the budget is used up."""
+    # Given
+    budget = retries.RetryBudget(ratio=0.5, reserve=2)
+
+    # When/Then
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    assert metrics.get_counter('minddb_retries_denied') == 2
+
+
+def test_call_retries_transient_errors():
+    """Test transient errors are retried and other errors are not."""
+    # Given
+    flaky = failing(ServerError(), ServerError())
+    broken = failing(ValueError('bad request'))
+
+    # When
+    result = asyncio.run(retries.call(flaky, 'review'))
+
+    # Then
+    assert result == 'ok'
+    assert flaky.await_count == 3
+    assert metrics.get_counter('minddb_retries', stage='review',
+                               reason='error') == 2
+    with pytest.raises(ValueError):
+        asyncio.run(retries.call(broken, 'review'))
+    assert broken.await_count == 1
+
+
+def test_call_stops_retrying_without_budget():
+    """Test an exhausted budget surfaces the error immediately."""
+    # Given
+    retries._retry_budget = retries.RetryBudget(reserve=1)
+    flaky = failing(ServerError(), ServerError())
+
+    # When/Then
+    with pytest.raises(ServerError):
+        asyncio.run(retries.call(flaky, 'review'))
+    assert flaky.await_count == 2
+
+
+def test_breaker_opens_and_probes_recovery():
+    """Test sustained errors pause calls until a probe succeeds."""
+    # Given
+    breaker = retries.CircuitBreaker(failure_threshold=2, recovery_time=0.05)
+    breaker.CHECK_INTERVAL = 0.01
+
+    async def run():
+        for _ in range(2):
+            assert not await breaker.acquire()
+            breaker.record(ServerError())
+        assert breaker.state == 'open'
+
+        start = asyncio.get_running_loop().time()
+        probe = await breaker.acquire()
+        waited = asyncio.get_running_loop().time() - start
+        assert probe and breaker.state == 'half_open'
+
+        # Other calls wait for the outcome of the probe
+        waiting = asyncio.create_task(breaker.acquire())
+        await asyncio.sleep(0.02)
+        assert not waiting.done()
+        breaker.record(probe=True)
+        assert await waiting is False
+        return waited
+
+    # When
+    waited = asyncio.run(run())
+
+    # Then
+    assert waited >= 0.04
+    assert breaker.state == 'closed'
+    assert metrics.get_counter('minddb_circuit_transitions',
+                               state='closed') == 1
+
+
+def test_breaker_failed_probe_doubles_recovery_time():
+    """Test a failed probe opens the circuit again for longer."""
+    # Given
+    breaker = retries.CircuitBreaker(failure_threshold=1, recovery_time=0.01)
+    breaker.CHECK_INTERVAL = 0.001
+
+    async def run():
+        breaker.record(ServerError())
+        probe = await breaker.acquire()
+        breaker.record(ServerError(), probe)
+
+    # When
+    asyncio.run(run())
+
+    # Then
+    assert breaker.state == 'open'
+    assert breaker._open_time == 0.02
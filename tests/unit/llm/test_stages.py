@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+import minddb.llm
+from minddb.llm import latency, stages
+from minddb.llm.ratelimit import RateLimiter
+from minddb.mindnote import review
+from minddb.mindnote.summary import LectureTopics
+from minddb.storage import DB
+
+
+@pytest.fixture(autouse=True)
+def reset_config():
+    stages.set_config(None)
+    latency.reset()
+    yield
+    stages.set_config(None)
+    latency.reset()
+
+
+def test_load_merges_file_and_overrides(tmp_path):
+    """Test overrides take precedence over the file and values are typed."""
+    # Given
+    path = tmp_path / 'stages.toml'
+    path.write_text('[review]\nmodel = "fast"\nconcurrency = 4\n')
+
+    # When
+    config = stages.load(path, ['review.concurrency=16',
+                                'notes.temperature=0.5'])
+
+    # Then
+    assert config.review.model == 'fast'
+    assert config.review.concurrency == 16
+    assert config.notes.temperature == 0.5
+    assert config.summary == stages.StageConfig()
+
+
+@pytest.mark.parametrize('override', ['review.model', 'review=fast',
+                                      'draft.model=fast',
+                                      'review.colour=blue',
+                                      'review.max_tokens=0'])
+def test_load_rejects_invalid_overrides(override):
+    """Test malformed overrides, unknown stages and options are rejected."""
+    with pytest.raises(ValueError):
+        stages.load(overrides=[override])
+
+
+def test_resolve_prefers_call_over_stage_settings():
+    """Test arguments of a call override the settings of its stage."""
+    # Given
+    stages.set_config(stages.load(overrides=['review.model=fast',
+                                             'review.temperature=0.2']))
+
+    # When
+    configured = stages.resolve('review', default_model='default')
+    explicit = stages.resolve('review', model='other', temperature=0.0,
+                              default_model='default')
+    unknown = stages.resolve('default', default_model='default')
+
+    # Then
+    assert configured == ('fast', {'temperature': 0.2})
+    assert explicit == ('other', {'temperature': 0.0})
+    assert unknown == ('default', {})
+
+
+def test_acreate_uses_model_and_temperature_of_stage():
+    """Test a call of a configured stage is sent with its settings."""
+    # Given
+    stages.set_config(stages.load(overrides=['summary.model=strong',
+                                             'summary.temperature=0.3']))
+    client = Mock()
+    usage = SimpleNamespace(input_tokens=10, output_tokens=5)
+    client.messages.create_with_completion = AsyncMock(return_value=(
+        LectureTopics(lecture_topic='Evals'), SimpleNamespace(usage=usage)))
+    db = DB(':memory:')
+
+    with patch('minddb.async_client', return_value=(client, 'model')), \
+         patch('minddb.llm.calls.get_rate_limiter',
+               return_value=RateLimiter()) as get_rate_limiter, \
+         patch('minddb.storage.get_catalog', return_value=db):
+        # When
+        asyncio.run(minddb.llm.acreate(
+            response_model=LectureTopics, max_tokens=100,
+            messages=[{'role': 'user', 'content': 'Topics'}],
+            stage='summary'))
+    db.close()
+
+    # Then
+    kwargs = client.messages.create_with_completion.call_args.kwargs
+    assert kwargs['model'] == 'strong'
+    assert kwargs['temperature'] == 0.3
+    get_rate_limiter.assert_called_once_with('strong')
+
+
+def test_review_note_uses_max_tokens_and_timeout_of_stage():
+    """Test the review stage settings replace the review defaults."""
+    # Given
+    stages.set_config(stages.load(overrides=['review.max_tokens=500',
+                                             'review.timeout=12']))
+    limiter = review.AdaptiveLimiter()
+
+    with patch('minddb.llm.acreate', AsyncMock()) as acreate:
+        # When
+        asyncio.run(review.review_note(Mock(), 'Summary', limiter))
+
+    # Then
+    assert acreate.call_args.kwargs['max_tokens'] == 500
+    assert acreate.call_args.kwargs['timeout'] == 12
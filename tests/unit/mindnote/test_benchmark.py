@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+import minddb.llm.cache
+import minddb.llm.latency
+import minddb.llm.ratelimit
+import minddb.storage
+from minddb.llm.backends import get_backend
+from minddb.mindnote import benchmark
+from minddb.mindnote.notes import Notes
+from minddb.mindnote.review import RevisedQuizQuestion
+from minddb.mindnote.summary import LectureTopics
+
+
+@pytest.fixture
+def isolated():
+    yield
+    minddb.storage.close_catalog()
+    minddb.mindnote.dedupe.reset()
+
+
+def test_write_library(tmp_path):
+    """Test synthetic libraries are reproducible."""
+    # When
+    first = benchmark.write_library(tmp_path / 'a' / 'lib', 3, 500, seed=1)
+    second = benchmark.write_library(tmp_path / 'b' / 'lib', 3, 500, seed=1)
+
+    # Then
+    files = sorted(p.name for p in first.iterdir())
+    assert files == ['lecture_0000.md', 'lecture_0001.md', 'lecture_0002.md']
+    assert (first / files[0]).read_text() == (second / files[0]).read_text()
+    assert (first / files[0]).read_text().startswith('## ')
+
+
+def test_respond_builds_valid_responses():
+    """Test the fake responses validate against the pipeline models."""
+    # When
+    topics = benchmark.respond(LectureTopics, {'transcript': 'alpha beta'})
+    notes = benchmark.respond(Notes, {'summary': 'alpha beta'})
+    revised = benchmark.respond(
+        RevisedQuizQuestion, {'quiz_question': notes.questions[0]})
+
+    # Then
+    assert topics.key_concepts
+    assert len(notes.questions) == benchmark.QUESTIONS_PER_REQUEST
+    assert len({q.question_text for q in notes.questions}) > 1
+    assert revised.revised_quiz_question.question_text == \
+        notes.questions[0].question_text
+
+
+def test_run_reports_results(isolated, tmp_path):
+    """Test a small benchmark creates notes and reports stage latencies."""
+    # Given
+    cache_enabled = minddb.llm.cache.ENABLED
+
+    # When
+    result = asyncio.run(benchmark.run(transcripts=2, decks=2,
+                                       transcript_tokens=500, latency=0.0))
+    benchmark.save(result, tmp_path / 'result.json')
+
+    # Then
+    results = result['results']
+    assert results['notes'] > 0
+    assert results['decks_per_hour'] > 0
+    assert results['peak_memory_bytes'] > 0
+    assert set(results['stages']) == {'summary', 'notes', 'review',
+                                      'storage'}
+    # One summary call per transcript of each deck
+    assert results['stages']['summary']['calls'] == 4
+    assert results['stages']['review']['p95'] is not None
+    assert result['config']['decks'] == 2
+    assert json.loads((tmp_path / 'result.json').read_text()) == result
+    assert get_backend() is None
+    assert minddb.llm.cache.ENABLED == cache_enabled
+
+
+def test_run_keeps_catalog_and_resets_state(isolated, tmp_path):
+    """Test the configured catalog stays open and no call state is left."""
+    # Given
+    catalog = minddb.storage.setup(str(tmp_path), 'configured')
+
+    # When
+    asyncio.run(benchmark.run(transcripts=1, transcript_tokens=500,
+                              latency=0.0, requests_per_minute=600))
+
+    # Then
+    assert minddb.storage.get_catalog() is catalog
+    assert catalog.list_decks() == []
+    assert minddb.llm.latency._trackers == {}
+    assert minddb.llm.ratelimit._rate_limiters == {}
+    assert minddb.mindnote.dedupe._indexes == {}
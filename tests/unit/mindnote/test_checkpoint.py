@@ -0,0 +1,152 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from minddb.mindnote import review
+from minddb.mindnote.checkpoint import Checkpoint
+from minddb.mindnote.notes import Notes, QuizQuestion, get_notes
+from minddb.storage import DB
+
+
+def question(number):
+    return {
+        'number': number,
+        'question_text': f'Q{number}',
+        'options': [{'letter': letter, 'text': letter} for letter in 'abcd'],
+        'correct_answer': 'a',
+        'explanation': 'Because',
+    }
+
+
+def revised(number):
+    return review.RevisedQuizQuestion(
+        review_result='satisfactory',
+        justification_for_changes='None',
+        revised_quiz_question=question(number),
+    )
+
+
+@pytest.fixture
+def catalog():
+    db = DB(':memory:')
+    db.create_tables()
+    with patch('minddb.storage.get_catalog', return_value=db):
+        yield db
+    db.close()
+
+
+@pytest.fixture
+def deck_id(catalog):
+    return catalog.get_or_create_deck('Deck').id
+
+
+def test_start_resumes_unfinished_run(catalog, deck_id):
+    """Test resume picks up the run of the same transcript."""
+    # Given
+    first = Checkpoint.start(deck_id, 'Transcript')
+
+    # When
+    resumed = Checkpoint.start(deck_id, 'Transcript', resume=True)
+    other = Checkpoint.start(deck_id, 'Other transcript', resume=True)
+    fresh = Checkpoint.start(deck_id, 'Transcript')
+
+    # Then
+    assert resumed.run_id == first.run_id
+    assert other.run_id != first.run_id
+    assert fresh.run_id not in (first.run_id, other.run_id)
+
+
+def test_start_resumes_run_with_stored_notes_without_resume(catalog,
+                                                            deck_id):
+    """Test a plain rerun picks up a failed run that already stored
+    notes."""
+    # Given
+    failed = Checkpoint.start(deck_id, 'Transcript')
+    failed.save_item('review', 0, revised(1))
+
+    # When
+    rerun = Checkpoint.start(deck_id, 'Transcript')
+
+    # Then
+    assert rerun.run_id == failed.run_id
+
+
+def test_get_notes_reviews_only_pending_notes(catalog, deck_id):
+    """Test a resumed run skips the stages and reviews it already saved."""
+    # Given
+    checkpoint = Checkpoint.start(deck_id, 'Transcript')
+    checkpoint.save('summary', 'Topics')
+    checkpoint.save('notes', Notes(questions=[question(1), question(2),
+                                              question(3)]))
+    checkpoint.save_item('review', 1, revised(2))
+
+    async def review_notes(notes, summary, on_review=None, **kwargs):
+        for i, note in enumerate(notes):
+            await on_review(i, revised(note.number))
+        return []
+
+    with patch('minddb.mindnote.summary.get_summary',
+               AsyncMock()) as get_summary, \
+         patch('minddb.llm.acreate', AsyncMock()) as acreate, \
+         patch('minddb.mindnote.review.notes',
+               side_effect=review_notes) as mock_review:
+        # When
+        result = asyncio.run(get_notes('Transcript', checkpoint=checkpoint))
+
+    # Then
+    get_summary.assert_not_awaited()
+    acreate.assert_not_awaited()
+    reviewed = [note.number for note in mock_review.call_args.args[0]]
+    assert reviewed == [1, 3]
+    assert [r.revised_quiz_question.question_text for r in result] == [
+        'Q1', 'Q2', 'Q3']
+    assert sorted(checkpoint.load_items('review')) == [0, 1, 2]
+
+
+def test_get_notes_resumes_interrupted_stream(catalog, deck_id):
+    """Test a resumed stream reviews the notes it drafted, storing none
+    twice."""
+    # Given
+    checkpoint = Checkpoint.start(deck_id, 'Transcript')
+    checkpoint.save('summary', 'Topics')
+    stored = []
+
+    def store(index, revised):
+        stored.append(revised.revised_quiz_question.question_text)
+        checkpoint.save_item('review', index, revised)
+
+    async def astream(**kwargs):
+        for number in (1, 2, 3):
+            yield QuizQuestion(**question(number))
+        raise RuntimeError('connection lost')
+
+    async def review_stream(notes, summary, on_review=None, **kwargs):
+        # Only the first note is reviewed before the stream breaks
+        async for note in notes:
+            if note.number == 1:
+                await on_review(0, revised(1))
+
+    async def review_notes(notes, summary, on_review=None, **kwargs):
+        for i, note in enumerate(notes):
+            await on_review(i, revised(note.number))
+        return []
+
+    with patch('minddb.llm.astream', side_effect=astream), \
+         patch('minddb.mindnote.review.stream', side_effect=review_stream):
+        with pytest.raises(RuntimeError):
+            asyncio.run(get_notes('Transcript', stream=True,
+                                  checkpoint=checkpoint, on_review=store))
+
+    # When
+    resumed = Checkpoint.start(deck_id, 'Transcript', resume=True)
+    with patch('minddb.llm.astream') as astream_again, \
+         patch('minddb.mindnote.review.notes', side_effect=review_notes):
+        result = asyncio.run(get_notes('Transcript', stream=True,
+                                       checkpoint=resumed, on_review=store))
+
+    # Then
+    astream_again.assert_not_called()
+    assert stored == ['Q1', 'Q2', 'Q3']
+    assert result == []
+    assert resumed.load_items('drafts') == {}
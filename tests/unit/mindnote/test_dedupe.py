@@ -0,0 +1,185 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from minddb.mindnote import dedupe
+from minddb.mindnote.dedupe import (Drafts, MinHashIndex, aunique,
+                                    get_index, unique)
+from minddb.mindnote.notes import Notes, QuizQuestion, get_notes
+from minddb.storage import DB
+
+
+def question(text):
+    return QuizQuestion(
+        number=1,
+        question_text=text,
+        options=[{'letter': letter, 'text': letter} for letter in 'abcd'],
+        correct_answer='a',
+        explanation='Because',
+    )
+
+
+@pytest.fixture(autouse=True)
+def reset_indexes():
+    dedupe.reset()
+    yield
+    dedupe.reset()
+
+
+def test_index_finds_near_duplicates_only():
+    """Test a reworded question matches and an unrelated one does not."""
+    # Given
+    index = MinHashIndex()
+    index.add('q1', 'What is the primary benefit of gradient descent in '
+                    'training neural networks?')
+
+    # When/Then
+    assert index.query('What is the primary benefit of gradient descent '
+                       'when training neural networks?') == ['q1']
+    assert index.query('Which metric measures the recall of a '
+                       'retrieval system?') == []
+
+
+def test_bands_have_to_divide_permutations():
+    """Test an uneven band layout is rejected."""
+    with pytest.raises(ValueError):
+        MinHashIndex(num_perm=128, bands=10)
+
+
+def test_unique_drops_duplicates_within_batch():
+    """Test near-identical questions of one draft are reduced to one."""
+    # Given
+    questions = [
+        question('What does the softmax function output for a vector?'),
+        question('What does the softmax function output for a vector ?'),
+        question('Why are embeddings normalized before cosine similarity?'),
+    ]
+
+    # When
+    selected = unique(questions, MinHashIndex())
+
+    # Then
+    assert selected == [0, 2]
+
+
+def test_get_index_includes_stored_notes():
+    """Test questions already stored for the deck count as duplicates."""
+    # Given
+    db = DB(':memory:')
+    db.create_tables()
+    deck_id = db.get_or_create_deck('Deck').id
+    db.insert_note(deck_id, 'What is the learning rate of an optimizer?',
+                   'Explanation')
+
+    with patch('minddb.storage.get_catalog', return_value=db):
+        # When
+        index = get_index(deck_id)
+        selected = unique([
+            question('What is the learning rate of an optimizer?'),
+            question('What is overfitting?'),
+        ], index)
+        cached = get_index(deck_id)
+
+    # Then
+    assert selected == [1]
+    assert cached is index
+    db.close()
+
+
+def test_get_index_signs_stored_notes_once():
+    """Test signatures are stored in the catalog and reused by new indexes."""
+    # Given
+    db = DB(':memory:')
+    db.create_tables()
+    deck_id = db.get_or_create_deck('Deck').id
+    note_id = db.insert_note(deck_id, 'What is the learning rate?',
+                             'Explanation')
+
+    with patch('minddb.storage.get_catalog', return_value=db):
+        # When
+        first = get_index(deck_id)
+        dedupe.reset()
+        with patch.object(MinHashIndex, 'signature') as signature:
+            second = get_index(deck_id)
+
+    # Then
+    assert set(db.get_note_signatures(deck_id)) == {note_id}
+    signature.assert_not_called()
+    assert second._signatures == first._signatures
+    assert second.query('What is the learning rate?') == [('note', note_id)]
+    db.close()
+
+
+def test_aunique_filters_streamed_questions():
+    """Test streamed questions are filtered as they arrive."""
+    # Given
+    async def questions():
+        yield question('What does a tokenizer split text into?')
+        yield question('what does a Tokenizer split text into!')
+        yield question('How is perplexity computed?')
+
+    async def run():
+        return [q.question_text
+                async for q in aunique(questions(), MinHashIndex())]
+
+    # When
+    result = asyncio.run(run())
+
+    # Then
+    assert result == ['What does a tokenizer split text into?',
+                      'How is perplexity computed?']
+
+
+def test_release_removes_drafts_that_were_not_kept():
+    """Test only the kept drafts stay in the index after a run."""
+    # Given
+    index = MinHashIndex()
+    index.add('stored', 'What is the learning rate of an optimizer?')
+    drafts = Drafts(index)
+    selected = unique([
+        question('What does the softmax function output for a vector?'),
+        question('Why are embeddings normalized before cosine similarity?'),
+    ], drafts)
+
+    # When
+    drafts.keep(1)
+    drafts.release()
+
+    # Then
+    assert selected == [0, 1]
+    assert len(index) == 2
+    assert index.query('What does the softmax function output for a '
+                       'vector?') == []
+    assert index.query('Why are embeddings normalized before cosine '
+                       'similarity?') != []
+
+
+def test_get_notes_removes_dropped_and_failed_drafts():
+    """Test drafts the review dropped or a failure cut off do not hide
+    questions of later runs."""
+    # Given
+    index = MinHashIndex()
+    draft = Notes(questions=[
+        question('What does the softmax function output for a vector?'),
+        question('Why are embeddings normalized before cosine similarity?'),
+        question('How is perplexity computed?'),
+    ])
+
+    async def review_notes(notes, summary, on_review=None, **kwargs):
+        # The second note is dropped, the third review fails
+        await on_review(0, 'Reviewed')
+        raise RuntimeError('Review failed')
+
+    with patch('minddb.mindnote.summary.get_summary',
+               AsyncMock(return_value='Topics')), \
+         patch('minddb.mindnote.notes.get_draft',
+               AsyncMock(return_value=draft)), \
+         patch('minddb.mindnote.review.notes', side_effect=review_notes):
+        # When
+        with pytest.raises(RuntimeError):
+            asyncio.run(get_notes('Transcript', index=index))
+
+    # Then
+    assert len(index) == 1
+    assert unique(draft.questions, index) == [1, 2]
@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from minddb.mindnote.notes import (FAN_OUT_MAX_TOKENS, MAX_TOKENS, Notes,
+                                   get_draft, get_notes)
+from minddb.mindnote.summary import LectureTopics, format_summary
+
+
+def question(text):
+    return {
+        'number': 1,
+        'question_text': text,
+        'options': [{'letter': letter, 'text': letter} for letter in 'abcd'],
+        'correct_answer': 'a',
+        'explanation': 'Because',
+    }
+
+
+async def acreate(**kwargs):
+    """Generate one question per topic of the summary."""
+    topics = [line[2:] for line in kwargs['context']['summary'].splitlines()
+              if line.startswith('- ')]
+    return Notes(questions=[question(topic) for topic in topics])
+
+
+SUMMARY = format_summary(LectureTopics(
+    lecture_topic="Evals", key_concepts=["Recall", "Precision"],
+    case_studies_examples=["Search"]))
+
+
+def test_get_draft_generates_all_topics_in_one_request():
+    """Test notes are generated in one request without fan_out."""
+    with patch('minddb.llm.acreate', side_effect=acreate) as mock_acreate:
+        # When
+        draft = asyncio.run(get_draft('Transcript', SUMMARY))
+
+    # Then
+    mock_acreate.assert_called_once()
+    assert mock_acreate.call_args.kwargs['max_tokens'] == MAX_TOKENS
+    assert len(draft.questions) == 3
+
+
+def test_get_draft_fans_out_and_renumbers():
+    """Test each topic group is generated separately and merged in order."""
+    with patch('minddb.llm.acreate', side_effect=acreate) as mock_acreate:
+        # When
+        by_field = asyncio.run(get_draft('Transcript', SUMMARY,
+                                         fan_out='fields'))
+        by_size = asyncio.run(get_draft('Transcript', SUMMARY, fan_out=1))
+
+    # Then
+    assert mock_acreate.call_count == 2 + 3
+    assert all(c.kwargs['max_tokens'] == FAN_OUT_MAX_TOKENS
+               for c in mock_acreate.call_args_list)
+    for draft in (by_field, by_size):
+        assert [q.question_text for q in draft.questions] == [
+            "Recall", "Precision", "Search"]
+        assert [q.number for q in draft.questions] == [1, 2, 3]
+
+
+def test_get_notes_rejects_streaming_with_fan_out():
+    """Test streamed generation cannot be split into topic groups."""
+    with pytest.raises(ValueError):
+        asyncio.run(get_notes('Transcript', stream=True, fan_out='fields'))
+
+
+@pytest.mark.parametrize('options', [
+    {'batch_review': True},
+    {'review_group': 4},
+    {'review_group': 0},
+])
+def test_get_notes_rejects_streaming_with_grouped_review(options):
+    """Test streamed notes cannot be reviewed in batches or groups."""
+    with pytest.raises(ValueError):
+        asyncio.run(get_notes('Transcript', stream=True, **options))
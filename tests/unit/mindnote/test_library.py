@@ -166,3 +166,86 @@ def test_get_transcript_returns_combined_content(
         assert "Content 1" in result
         assert "# test2.txt" in result
         assert "Content 2" in result
+
+
+def test_link_transcripts_only_links_given_files(library, mock_catalog):
+    """Test link_transcripts can link a subset of the transcripts."""
+    # Given
+    library._unlinked_transcripts = [
+        {'filename': 'test1.txt', 'checksum': 'abc123', 'deck_id': 1},
+        {'filename': 'test2.txt', 'checksum': 'def456', 'deck_id': 1}
+    ]
+    mock_catalog.get_or_insert_transcript.return_value = 99
+
+    with patch('minddb.storage.get_catalog', return_value=mock_catalog):
+        # When
+        library.link_transcripts(['test2.txt'])
+
+        # Then
+        mock_catalog.get_or_insert_transcript.assert_called_once_with(
+            filename='test2.txt', checksum='def456', deck_id=1)
+        assert library._unlinked_transcripts == [
+            {'filename': 'test1.txt', 'checksum': 'abc123', 'deck_id': 1}
+        ]
+
+
+@patch('pathlib.Path.exists')
+@patch('pathlib.Path.iterdir')
+@patch('minddb.storage.get_catalog')
+@patch('minddb.tools.get_checksum')
+def test_get_transcripts_returns_one_entry_per_file(
+        mock_checksum, mock_get_catalog, mock_iterdir, mock_exists,
+        library, mock_catalog):
+    """Test get_transcripts returns each unprocessed file separately."""
+    # Given
+    mock_exists.return_value = True
+    mock_iterdir.return_value = [Path('test1.txt'), Path('test2.txt')]
+    mock_get_catalog.return_value = mock_catalog
+    mock_checksum.return_value = "abc123"
+    mock_catalog.is_file_processed.return_value = False
+
+    mock_content = {
+        'test1.txt': 'Content 1',
+        'test2.txt': '  '
+    }
+
+    with patch('builtins.open', mock_open()) as mock_file:
+        def mock_read():
+            filename = mock_file.call_args[0][0].name
+            return mock_content[filename]
+
+        mock_reader = mock_file.return_value.__enter__.return_value
+        mock_reader.read.side_effect = mock_read
+
+        # When
+        result = library.get_transcripts("Test Deck")
+
+        # Then
+        assert result == [
+            ('test1.txt', '# test1.txt\n\nContent 1'),
+            ('test2.txt', ''),
+        ]
+
+
+@patch('pathlib.Path.exists')
+@patch('pathlib.Path.iterdir')
+@patch('minddb.storage.get_catalog')
+@patch('minddb.tools.get_checksum')
+def test_get_files_only_hashes_given_files(mock_checksum, mock_get_catalog,
+                                           mock_iterdir, mock_exists,
+                                           mock_catalog):
+    """Test a library limited to some files ignores the others."""
+    # Given
+    library = Library(path="dummy/path", filenames=['test2.txt'])
+    mock_exists.return_value = True
+    mock_iterdir.return_value = [Path('test1.txt'), Path('test2.txt')]
+    mock_get_catalog.return_value = mock_catalog
+    mock_checksum.return_value = "abc123"
+    mock_catalog.is_file_processed.return_value = False
+
+    # When
+    result = library._get_files("Test Deck")
+
+    # Then
+    assert result == [Path('test2.txt')]
+    mock_checksum.assert_called_once_with(Path('test2.txt'))
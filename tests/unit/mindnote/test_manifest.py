@@ -0,0 +1,149 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from pydantic import ValidationError
+
+import minddb.storage
+from minddb.mindnote import manifest
+
+MANIFEST = '''
+[defaults]
+catalog = "Semester"
+per_transcript = true
+
+[[decks]]
+library = "lectures/statistics"
+deck = "Statistics"
+
+[[decks]]
+library = "/data/ml"
+deck = "Machine Learning"
+catalog = "ML"
+jobs = 8
+'''
+
+
+def test_load_merges_defaults(tmp_path):
+    """Test deck options fall back to the caller options and the manifest
+    defaults."""
+    # Given
+    path = tmp_path / 'decks.toml'
+    path.write_text(MANIFEST)
+
+    # When
+    entries = manifest.load(path, options={'triage': 'fast', 'jobs': 2})
+
+    # Then
+    statistics, ml = entries
+    assert statistics.library == str(tmp_path / 'lectures/statistics')
+    assert statistics.catalog == 'Semester'
+    assert statistics.catalog_path == str(tmp_path) + '/.'
+    assert statistics.per_transcript is True
+    assert statistics.triage == 'fast'
+    assert statistics.options()['max_jobs'] == 2
+    assert ml.library == '/data/ml'
+    assert ml.catalog == 'ML'
+    assert ml.options()['max_jobs'] == 8
+
+
+def test_load_prefers_caller_options_over_manifest_defaults(
+        tmp_path, monkeypatch):
+    """Test flags given on the command line beat the [defaults] table and
+    their paths are relative to the working directory."""
+    # Given
+    path = tmp_path / 'manifests' / 'decks.toml'
+    path.parent.mkdir()
+    path.write_text(MANIFEST)
+    cwd = tmp_path / 'work'
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+
+    # When
+    statistics, ml = manifest.load(path, options={
+        'catalog': 'Flag', 'catalog_path': 'catalogs'})
+
+    # Then
+    assert statistics.catalog == 'Flag'
+    assert statistics.catalog_path == str(cwd / 'catalogs')
+    assert statistics.library == str(path.parent / 'lectures/statistics')
+    assert ml.catalog == 'ML'
+
+
+@pytest.mark.parametrize('content', [
+    '[defaults]\ncatalog = "A"\n',
+    '[[decks]]\nlibrary = "l"\ndeck = "d"\nunknown = 1\n',
+    '[[decks]]\nlibrary = "l"\n',
+    '[[decks]]\nlibrary = "l"\ndeck = "d"\njobs = 0\n',
+    '[[decks]]\nlibrary = "l"\ndeck = "d"\nfan_out = 0\n',
+    '[[decks]]\nlibrary = "l"\ndeck = "d"\nfan_out = -1\n',
+])
+def test_load_rejects_invalid_manifests(tmp_path, content):
+    """Test manifests without decks or with invalid entries are rejected."""
+    # Given
+    path = tmp_path / 'decks.toml'
+    path.write_text(content)
+
+    # When/Then
+    with pytest.raises((ValueError, ValidationError)):
+        manifest.load(path)
+
+
+def entry(tmp_path, deck, catalog):
+    return manifest.DeckEntry(library=str(tmp_path), deck=deck,
+                              catalog=catalog, catalog_path=str(tmp_path))
+
+
+def test_create_all_uses_catalog_per_deck(tmp_path):
+    """Test decks run concurrently, bounded, each on its own catalog."""
+    # Given
+    entries = [entry(tmp_path, 'A', 'One'), entry(tmp_path, 'B', 'One'),
+               entry(tmp_path, 'C', 'Two')]
+    used = {}
+    running = []
+    peak = []
+
+    async def create(self, deck_name, **options):
+        running.append(deck_name)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        used[deck_name] = minddb.storage.get_catalog()
+        running.remove(deck_name)
+
+    # When
+    with patch('minddb.mindnote.manifest.Processor.create', create):
+        asyncio.run(manifest.create_all(entries, max_decks=2))
+
+    # Then
+    assert used['A'] is used['B']
+    assert used['A'].name == 'One'
+    assert used['C'].name == 'Two'
+    assert max(peak) == 2
+
+
+def test_create_all_continues_after_failure(tmp_path):
+    """Test a failing deck does not stop the others."""
+    # Given
+    entries = [entry(tmp_path, 'A', 'One'), entry(tmp_path, 'B', 'One')]
+    created = []
+
+    async def create(self, deck_name, **options):
+        if deck_name == 'A':
+            raise RuntimeError('failed')
+        created.append(deck_name)
+
+    # When/Then
+    with patch('minddb.mindnote.manifest.Processor.create', create):
+        with pytest.raises(RuntimeError):
+            asyncio.run(manifest.create_all(entries))
+    assert created == ['B']
+
+
+def test_create_all_rejects_duplicate_decks(tmp_path):
+    """Test the same deck of a catalog cannot be created twice at once."""
+    # Given
+    entries = [entry(tmp_path, 'A', 'One'), entry(tmp_path, 'A', 'One')]
+
+    # When/Then
+    with pytest.raises(ValueError):
+        asyncio.run(manifest.create_all(entries))
@@ -0,0 +1,44 @@
+from minddb.mindnote.packing import budget, pack
+
+
+def transcript(name, tokens):
+    """Build a transcript of about the given number of tokens."""
+    return (name, f"# {name}\n\n" + 'word ' * (tokens * 4 // 5))
+
+
+def test_budget_respects_output_cap():
+    """Test the expected output can lower the transcript budget."""
+    assert budget(100000, max_output_tokens=1000, output_ratio=0.5) == 2000
+    assert budget(1500, max_output_tokens=1000, output_ratio=0.5) == 1500
+
+
+def test_pack_fills_requests_first_fit_decreasing():
+    """Test small files fill the room left next to larger ones."""
+    # Given
+    transcripts = [transcript('a.txt', 600), transcript('b.txt', 300),
+                   transcript('c.txt', 500), transcript('d.txt', 400),
+                   ('empty.txt', '')]
+
+    # When
+    packs = pack(transcripts, 1000, output_ratio=0)
+
+    # Then
+    assert [filenames for filenames, _ in packs] == [
+        ['a.txt', 'b.txt'], ['c.txt', 'd.txt']]
+    assert packs[0][1].index('# a.txt') < packs[0][1].index('# b.txt')
+
+
+def test_pack_splits_large_files_at_headings():
+    """Test a file over the budget is split and its parts are labeled."""
+    # Given
+    content = '\n\n'.join(f"## Section {i}\n\n" + 'word ' * 400
+                          for i in range(3))
+    transcripts = [('big.txt', f"# big.txt\n\n{content}")]
+
+    # When
+    packs = pack(transcripts, 600, output_ratio=0)
+
+    # Then
+    assert len(packs) == 3
+    assert all(filenames == ['big.txt'] for filenames, _ in packs)
+    assert packs[1][1].startswith('# big.txt (part 2)')
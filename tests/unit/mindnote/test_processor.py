@@ -0,0 +1,193 @@
+import asyncio
+from unittest.mock import ANY, AsyncMock, Mock, patch
+
+import pytest
+
+from minddb.mindnote import dedupe
+from minddb.mindnote.processor import Processor
+
+
+@pytest.fixture
+def mock_catalog():
+    catalog = Mock()
+    mock_deck = Mock()
+    mock_deck.id = 1
+    mock_deck.name = "Test Deck"
+    catalog.get_or_create_deck.return_value = mock_deck
+    catalog.get_notes_by_deck_id.return_value = []
+    catalog.get_unfinished_run.return_value = None
+    return catalog
+
+
+@pytest.fixture(autouse=True)
+def reset_indexes():
+    dedupe.reset()
+    yield
+    dedupe.reset()
+
+
+@pytest.fixture
+def processor():
+    processor = Processor(library_path="dummy/path")
+    processor._library = Mock()
+    return processor
+
+
+def mock_note(question):
+    note = Mock()
+    note.to_dict.return_value = {
+        'question': question,
+        'explanation': 'A **key** term',
+    }
+    return note
+
+
+def reviewing(make_notes):
+    """Mock get_notes reporting each note as reviewed."""
+    async def get_notes(transcript, on_review, **kwargs):
+        notes = make_notes(transcript)
+        for i, note in enumerate(notes):
+            await on_review(i, note)
+        return notes
+    return AsyncMock(side_effect=get_notes)
+
+
+def test_create_processes_combined_transcript(processor, mock_catalog):
+    """Test create runs one pipeline over the combined transcript."""
+    # Given
+    processor._library.get_transcripts.return_value = [
+        ('a.txt', "# a.txt\n\nContent"),
+    ]
+    get_notes = reviewing(lambda t: [mock_note('Q1')])
+
+    with patch('minddb.mindnote.processor.get_notes', get_notes), \
+         patch('minddb.storage.get_catalog', return_value=mock_catalog):
+        # When
+        asyncio.run(processor.create("Test Deck"))
+
+    # Then
+    get_notes.assert_awaited_once_with("# a.txt\n\nContent",
+                                       sections=["# a.txt\n\nContent"],
+                                       checkpoint=ANY, on_review=ANY,
+                                       index=ANY)
+    mock_catalog.insert_notes.assert_called_once_with(
+        1, [{'question': 'Q1', 'explanation': 'A <b>key</b> term'}],
+        checkpoints=ANY)
+    processor._library.link_transcripts.assert_called_once_with()
+
+
+def test_create_per_transcript_links_each_file(processor, mock_catalog):
+    """Test each transcript runs as its own job and links its own file."""
+    # Given
+    processor._library.get_transcripts.return_value = [
+        ('a.txt', '# a.txt\n\nA'),
+        ('b.txt', '# b.txt\n\nB'),
+        ('empty.txt', ''),
+    ]
+    get_notes = reviewing(lambda t: [mock_note(t)])
+
+    with patch('minddb.mindnote.processor.get_notes', get_notes), \
+         patch('minddb.storage.get_catalog', return_value=mock_catalog):
+        # When
+        asyncio.run(processor.create("Test Deck", per_transcript=True,
+                                     max_jobs=2))
+
+    # Then
+    assert get_notes.await_count == 2
+    assert mock_catalog.insert_notes.call_count == 2
+    linked = [c.args[0] for c in
+              processor._library.link_transcripts.call_args_list]
+    assert sorted(linked) == [['a.txt'], ['b.txt'], ['empty.txt']]
+
+
+def test_create_per_transcript_does_not_link_failed_jobs(processor,
+                                                         mock_catalog):
+    """Test a failing job is reported without linking its transcript."""
+    # Given
+    processor._library.get_transcripts.return_value = [
+        ('a.txt', '# a.txt\n\nA'),
+        ('b.txt', '# b.txt\n\nB'),
+    ]
+
+    async def get_notes(transcript, **kwargs):
+        if 'b.txt' in transcript:
+            raise RuntimeError('generation failed')
+        return [mock_note(transcript)]
+
+    with patch('minddb.mindnote.processor.get_notes', get_notes), \
+         patch('minddb.storage.get_catalog', return_value=mock_catalog):
+        # When
+        with pytest.raises(RuntimeError):
+            asyncio.run(processor.create("Test Deck", per_transcript=True))
+
+    # Then
+    processor._library.link_transcripts.assert_called_once_with(['a.txt'])
+
+
+def test_create_completes_run_after_storing_notes(processor, mock_catalog):
+    """Test the run is completed only once the notes are stored."""
+    # Given
+    processor._library.get_transcripts.return_value = [
+        ('a.txt', "# a.txt\n\nContent"),
+    ]
+    mock_catalog.insert_run.return_value = 7
+    get_notes = reviewing(lambda t: [mock_note('Q1')])
+
+    with patch('minddb.mindnote.processor.get_notes', get_notes), \
+         patch('minddb.storage.get_catalog', return_value=mock_catalog):
+        # When
+        asyncio.run(processor.create("Test Deck"))
+
+    # Then
+    assert get_notes.await_args.kwargs['checkpoint'].run_id == 7
+    mock_catalog.complete_run.assert_called_once_with(7)
+
+
+def test_create_keeps_run_open_on_failure(processor, mock_catalog):
+    """Test a failed run stays unfinished so it can be resumed."""
+    # Given
+    processor._library.get_transcripts.return_value = [
+        ('a.txt', "# a.txt\n\nContent"),
+    ]
+    get_notes = AsyncMock(side_effect=RuntimeError('review failed'))
+
+    with patch('minddb.mindnote.processor.get_notes', get_notes), \
+         patch('minddb.storage.get_catalog', return_value=mock_catalog):
+        # When
+        with pytest.raises(RuntimeError):
+            asyncio.run(processor.create("Test Deck"))
+
+    # Then
+    mock_catalog.complete_run.assert_not_called()
+
+
+def test_create_packed_links_file_after_all_its_packs(processor,
+                                                      mock_catalog):
+    """Test a file split over several packs is linked only if all succeed."""
+    # Given
+    transcripts = [('a.txt', 'A'), ('big.txt', 'Big'), ('empty.txt', '')]
+    processor._library.get_transcripts.return_value = transcripts
+    packs = [
+        (['a.txt', 'big.txt'], 'A + Big part 1'),
+        (['big.txt'], 'Big part 2 fail'),
+    ]
+
+    async def get_notes(transcript, **kwargs):
+        if 'fail' in transcript:
+            raise RuntimeError('generation failed')
+        return []
+
+    with patch('minddb.mindnote.processor.get_notes', get_notes), \
+         patch('minddb.mindnote.processor.pack',
+               return_value=packs) as mock_pack, \
+         patch('minddb.storage.get_catalog', return_value=mock_catalog):
+        # When
+        with pytest.raises(RuntimeError):
+            asyncio.run(processor.create("Test Deck", pack_tokens=1000))
+
+    # Then
+    processor._library.get_transcripts.assert_called_once_with("Test Deck")
+    mock_pack.assert_called_once_with(transcripts, 1000)
+    linked = [c.args[0] for c in
+              processor._library.link_transcripts.call_args_list]
+    assert sorted(linked) == [['a.txt'], ['empty.txt']]
@@ -0,0 +1,306 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+import minddb
+from minddb.llm.batches import FakeBatches
+from minddb.llm import latency, retries
+from minddb.llm.backends import RateLimited
+from minddb.llm.concurrency import AdaptiveLimiter
+from minddb.llm.ratelimit import RateLimiter
+from minddb.mindnote import review
+
+
+def quiz_question(text):
+    return {
+        'question_text': text,
+        'options': [{'letter': letter, 'text': letter}
+                    for letter in 'abcd'],
+        'correct_answer': 'a',
+        'explanation': 'Because',
+    }
+
+
+def revised(text):
+    return review.RevisedQuizQuestion(
+        review_result='satisfactory',
+        justification_for_changes='None',
+        revised_quiz_question=quiz_question(text),
+    )
+
+
+@pytest.fixture(autouse=True)
+def mock_client():
+    with patch('minddb.async_client', return_value=(Mock(), 'model')), \
+         patch('minddb.llm.cache.ENABLED', False):
+        yield
+
+
+def test_review_batch_falls_back_to_real_time_review():
+    """Test failed batch requests are reviewed again one by one."""
+    # Given
+    notes = ['Q1', 'Q2 fail', 'Q3']
+
+    def respond(params):
+        content = params['messages'][0]['content'][-1]['text']
+        if 'fail' in content:
+            return None
+        return {
+            'review_result': 'satisfactory',
+            'justification_for_changes': 'None',
+            'revised_quiz_question': quiz_question('ok'),
+        }
+
+    async def acreate(**kwargs):
+        return revised(kwargs['context']['quiz_question'])
+
+    with patch('minddb.llm.acreate', side_effect=acreate) as mock_acreate, \
+         patch('minddb.llm.batches.POLL_INTERVAL', 0):
+        # When
+        result = asyncio.run(review.review_batch(
+            notes, 'Summary', AdaptiveLimiter(),
+            batches=FakeBatches(respond)))
+
+    # Then
+    assert mock_acreate.call_count == 1
+    assert [r.revised_quiz_question.question_text for r in result] == [
+        'ok', 'Q2 fail', 'ok'
+    ]
+
+
+def test_group_drops_invalid_reviews():
+    """Test an invalid review does not fail the whole group."""
+    # Given
+    valid = revised('Q1').model_dump()
+    invalid = {**valid, 'review_result': 'unknown'}
+
+    # When
+    group = review.RevisedQuizQuestionGroup(reviews=[
+        {'number': 1, 'review': valid},
+        {'number': 2, 'review': invalid},
+    ])
+
+    # Then
+    assert [r.number for r in group.reviews] == [1]
+
+
+def test_group_size_respects_token_budgets():
+    """Test the group size is limited by the input and output budgets."""
+    notes = ['x' * 400] * 20
+
+    assert review.group_size(notes, '', max_input_tokens=100000,
+                             max_output_tokens=5000) == 5
+    assert review.group_size(notes, '', max_input_tokens=1010,
+                             max_output_tokens=50000) == 10
+    assert review.group_size(notes[:3], '') == 3
+    assert review.group_size(notes, 'x' * 10 ** 6) == 1
+
+
+def test_notes_reviews_groups_and_retries_missing_items():
+    """Test grouped review maps reviews by number and retries the rest."""
+    # Given
+    notes = ['Q1', 'Q2', 'Q3']
+
+    async def acreate(**kwargs):
+        if kwargs['response_model'] is review.RevisedQuizQuestionGroup:
+            questions = kwargs['context']['quiz_questions']
+            return review.RevisedQuizQuestionGroup(reviews=[
+                {'number': i + 1, 'review': revised(f'{q} grouped')}
+                for i, q in enumerate(questions) if q != 'Q2'
+            ])
+        return revised(f"{kwargs['context']['quiz_question']} single")
+
+    with patch('minddb.llm.acreate', side_effect=acreate) as mock_acreate:
+        # When
+        result = asyncio.run(review.notes(notes, 'Summary', group=3))
+
+    # Then
+    assert mock_acreate.call_count == 2
+    assert [r.revised_quiz_question.question_text for r in result] == [
+        'Q1 grouped', 'Q2 single', 'Q3 grouped'
+    ]
+
+
+@pytest.mark.parametrize('triage, reviewed', [
+    ('skip', ['Q2']),
+    ('fast', ['Q1', 'Q2', 'Q3']),
+])
+def test_notes_triage_policy(triage, reviewed):
+    """Test notes passing the local checks are reviewed by policy."""
+    # Given
+    notes = [review.QuizQuestion(**quiz_question(q))
+             for q in ['Q1', 'Q2', 'Q3']]
+    models = {}
+    reports = {}
+
+    async def acreate(**kwargs):
+        text = kwargs['context']['quiz_question'].question_text
+        models[text] = kwargs.get('model')
+        return revised(f'{text} reviewed')
+
+    with patch('minddb.llm.acreate', side_effect=acreate), \
+         patch('minddb.mindnote.triage.passes',
+               side_effect=lambda note, summary: note.question_text != 'Q2'):
+        # When
+        result = asyncio.run(review.notes(
+            notes, 'Summary', triage=triage,
+            on_review=lambda i, r: reports.update({i: r})))
+
+    # Then
+    assert sorted(models) == reviewed
+    assert models['Q2'] is None
+    assert all(models[q] == minddb.FAST_MODEL
+               for q in reviewed if q != 'Q2')
+    assert [reports[i].revised_quiz_question.question_text
+            for i in range(3)] == [
+        'Q1 reviewed' if 'Q1' in reviewed else 'Q1', 'Q2 reviewed',
+        'Q3 reviewed' if 'Q3' in reviewed else 'Q3'
+    ]
+    # Reported notes are not kept
+    assert result == []
+
+
+def test_hedged_review_waits_for_a_slot_of_its_own():
+    """Test the duplicate of a slow review stays within the limit."""
+    # Given
+    limiter = AdaptiveLimiter(initial=1, maximum=1)
+    for _ in range(latency.MIN_SAMPLES):
+        latency.observe('review', 0.01)
+    calls = []
+
+    async def acreate(**kwargs):
+        calls.append(limiter.active)
+        await asyncio.sleep(0.1)
+        return revised('Q1 reviewed')
+
+    with patch('minddb.llm.acreate', side_effect=acreate), \
+         patch.object(latency, 'HEDGING', True):
+        # When
+        result = asyncio.run(review.review_note(
+            review.QuizQuestion(**quiz_question('Q1')), 'Summary', limiter))
+    latency.reset()
+
+    # Then
+    assert result.revised_quiz_question.question_text == 'Q1 reviewed'
+    assert calls == [1]
+    assert limiter.active == 0
+
+
+def test_review_note_does_not_retry_permanent_errors():
+    """Test only the LLM call retries, and only transient errors."""
+    # Given
+    limiter = AdaptiveLimiter()
+
+    with patch('minddb.llm.acreate',
+               side_effect=ValueError('invalid request')) as acreate:
+        # When
+        with pytest.raises(ValueError):
+            asyncio.run(review.review_note(
+                review.QuizQuestion(**quiz_question('Q1')), 'Summary',
+                limiter))
+
+    # Then
+    assert acreate.call_count == 1
+
+
+def test_retried_overload_lowers_review_concurrency():
+    """Test a 429 lowers the limit even if its retry succeeds."""
+    # Given
+    limiter = AdaptiveLimiter(initial=4, maximum=8)
+    client = Mock()
+    client.messages.create_with_completion = AsyncMock(side_effect=[
+        RateLimited(0),
+        (revised('Q1 reviewed'), SimpleNamespace(usage=None)),
+    ])
+    retries.reset()
+
+    with patch('minddb.async_client', return_value=(client, 'model')), \
+         patch('minddb.llm.calls.get_rate_limiter',
+               return_value=RateLimiter()), \
+         patch.object(retries, 'backoff', return_value=0):
+        # When
+        result = asyncio.run(review.review_note(
+            review.QuizQuestion(**quiz_question('Q1')), 'Summary', limiter))
+    retries.reset()
+
+    # Then
+    assert result.revised_quiz_question.question_text == 'Q1 reviewed'
+    assert limiter.limit == 2
+
+
+def test_triaged_reviews_share_one_limiter():
+    """Test light and full reviews draw from the same concurrency limit."""
+    # Given
+    notes = [review.QuizQuestion(**quiz_question(q)) for q in ['Q1', 'Q2']]
+    limiters = []
+
+    async def review_note(note, summary, limiter, model=None):
+        limiters.append(limiter)
+        return revised(note.question_text)
+
+    with patch('minddb.mindnote.review.review_note',
+               side_effect=review_note), \
+         patch('minddb.mindnote.triage.passes',
+               side_effect=lambda note, summary: note.question_text != 'Q2'):
+        # When
+        asyncio.run(review.notes(notes, 'Summary', triage='fast'))
+
+    # Then
+    assert len(limiters) == 2
+    assert limiters[0] is limiters[1]
+
+
+def test_stream_reviews_notes_while_they_arrive():
+    """Test reviews start before the last note has been generated."""
+    # Given
+    started = []
+
+    async def generate():
+        for text in ['Q1', 'Q2']:
+            yield text
+            await asyncio.sleep(0.01)
+            # The review of the previous note has started already
+            started.append(len(reviewed))
+
+    reviewed = []
+
+    async def acreate(**kwargs):
+        reviewed.append(kwargs['context']['quiz_question'])
+        return revised(kwargs['context']['quiz_question'])
+
+    with patch('minddb.llm.acreate', side_effect=acreate):
+        # When
+        result = asyncio.run(review.stream(generate(), 'Summary'))
+
+    # Then
+    assert started == [1, 2]
+    assert [r.revised_quiz_question.question_text for r in result] == [
+        'Q1', 'Q2'
+    ]
+
+
+def test_stream_cancels_reviews_when_generation_fails():
+    """Test pending reviews are cancelled if the generation fails."""
+    # Given
+    cancelled = []
+
+    async def generate():
+        yield 'Q1'
+        await asyncio.sleep(0.01)
+        raise RuntimeError('generation failed')
+
+    async def acreate(**kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(kwargs['context']['quiz_question'])
+            raise
+
+    with patch('minddb.llm.acreate', side_effect=acreate):
+        # When/Then
+        with pytest.raises(RuntimeError):
+            asyncio.run(review.stream(generate(), 'Summary'))
+
+    assert cancelled == ['Q1']
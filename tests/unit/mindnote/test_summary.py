@@ -0,0 +1,191 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from minddb.mindnote.summary import (LectureTopics, checksum, format_summary,
+                                     get_topics_cached, get_topics_chunked,
+                                     merge_topics, parse_summary,
+                                     split_topics, split_transcript)
+from minddb.storage import DB
+
+
+def test_split_transcript_keeps_small_transcript_whole():
+    """Test a transcript within budget stays a single chunk."""
+    # Given
+    transcript = "# a.txt\n\nShort lecture."
+
+    # When
+    chunks = split_transcript(transcript, max_tokens=1000)
+
+    # Then
+    assert chunks == [transcript]
+
+
+def test_split_transcript_splits_at_headings():
+    """Test chunks are split at markdown headings."""
+    # Given
+    transcript = "# a.txt\n\n" + "a" * 400 + "\n\n# b.txt\n\n" + "b" * 400
+
+    # When
+    chunks = split_transcript(transcript, max_tokens=120)
+
+    # Then
+    assert len(chunks) == 2
+    assert chunks[0].startswith("# a.txt")
+    assert chunks[1].startswith("# b.txt")
+
+
+def test_split_transcript_splits_large_sections_at_paragraphs():
+    """Test sections above the budget are split at paragraph boundaries."""
+    # Given
+    paragraphs = ["p%d " % i + "x" * 200 for i in range(4)]
+    transcript = "# a.txt\n\n" + "\n\n".join(paragraphs)
+
+    # When
+    chunks = split_transcript(transcript, max_tokens=120)
+
+    # Then
+    assert len(chunks) > 1
+    assert "\n\n".join(chunks) == transcript
+
+
+def test_merge_topics_deduplicates_lists():
+    """Test merging keeps the first occurrence of duplicate topics."""
+    # Given
+    first = LectureTopics(lecture_topic="Evals",
+                          key_concepts=["Leading metrics", "Recall"])
+    second = LectureTopics(lecture_topic="evals",
+                           key_concepts=["leading  metrics.", "Precision"],
+                           case_studies_examples=["Search"])
+
+    # When
+    merged = merge_topics([first, second])
+
+    # Then
+    assert merged.lecture_topic == "Evals"
+    assert merged.key_concepts == ["Leading metrics", "Recall", "Precision"]
+    assert merged.case_studies_examples == ["Search"]
+
+
+def test_format_summary_skips_empty_sections():
+    """Test the summary only lists sections with topics."""
+    # Given
+    topics = LectureTopics(lecture_topic="Evals", key_concepts=["Recall"])
+
+    # When
+    summary = format_summary(topics)
+
+    # Then
+    assert "### Lecture Topic\nEvals" in summary
+    assert "- Recall" in summary
+    assert "Case Studies" not in summary
+
+
+def test_get_topics_chunked_merges_chunk_topics():
+    """Test each chunk is summarized and the results are merged."""
+    # Given
+    transcript = "# a.txt\n\n" + "a" * 400 + "\n\n# b.txt\n\n" + "b" * 400
+
+    async def acreate(**kwargs):
+        name = kwargs['context']['transcript'].split('\n')[0]
+        return LectureTopics(lecture_topic="Evals", key_concepts=[name])
+
+    with patch('minddb.llm.acreate', side_effect=acreate) as mock_acreate:
+        # When
+        topics = asyncio.run(get_topics_chunked(transcript, 120))
+
+    # Then
+    assert mock_acreate.call_count == 2
+    assert topics.key_concepts == ["# a.txt", "# b.txt"]
+
+
+@pytest.fixture
+def catalog():
+    catalog = DB(':memory:')
+    catalog.create_tables()
+    with patch('minddb.storage.get_catalog', return_value=catalog):
+        yield catalog
+    catalog.close()
+
+
+def test_get_topics_cached_only_summarizes_new_transcripts(catalog):
+    """Test cached topics are reused and merged in transcript order."""
+    # Given
+    cached = LectureTopics(lecture_topic="Evals", key_concepts=["Recall"])
+    catalog.insert_transcript_topics(
+        {checksum("# a.txt\n\nA"): cached.model_dump_json()},
+        'claude-test')
+
+    async def acreate(**kwargs):
+        return LectureTopics(lecture_topic="Evals",
+                             key_concepts=["Precision"])
+
+    with patch('minddb.MODEL', 'claude-test'), \
+         patch('minddb.llm.cache.ENABLED', True), \
+         patch('minddb.llm.acreate', side_effect=acreate) as mock_acreate:
+        # When
+        topics = asyncio.run(get_topics_cached(["# a.txt\n\nA",
+                                                "# b.txt\n\nB"]))
+
+    # Then
+    assert mock_acreate.call_count == 1
+    assert topics.key_concepts == ["Recall", "Precision"]
+    assert set(catalog.get_transcript_topics(
+        {checksum("# b.txt\n\nB")}, 'claude-test')) == \
+        {checksum("# b.txt\n\nB")}
+
+
+def test_get_topics_cached_skips_cache_when_disabled(catalog):
+    """Test every transcript is summarized when caching is off."""
+    # Given
+    catalog.insert_transcript_topics(
+        {checksum("A"): LectureTopics(lecture_topic="A").model_dump_json()},
+        'claude-test')
+
+    async def acreate(**kwargs):
+        return LectureTopics(lecture_topic="Fresh")
+
+    with patch('minddb.MODEL', 'claude-test'), \
+         patch('minddb.llm.cache.ENABLED', False), \
+         patch('minddb.llm.acreate', side_effect=acreate) as mock_acreate:
+        # When
+        topics = asyncio.run(get_topics_cached(["A"]))
+
+    # Then
+    assert mock_acreate.call_count == 1
+    assert topics.lecture_topic == "Fresh"
+
+
+def test_parse_summary_reverses_format_summary():
+    """Test a formatted summary parses back into the same topics."""
+    # Given
+    topics = LectureTopics(lecture_topic="Evals",
+                           key_concepts=["Recall", "Precision"],
+                           practical_recommendations=["Measure early"])
+
+    # When
+    parsed = parse_summary(format_summary(topics))
+
+    # Then
+    assert parsed == topics
+
+
+def test_split_topics_by_field_and_by_group_size():
+    """Test topics split per topic list or in groups of a given size."""
+    # Given
+    topics = LectureTopics(lecture_topic="Evals",
+                           key_concepts=["Recall", "Precision", "F1"],
+                           case_studies_examples=["Search"])
+
+    # When
+    by_field = split_topics(topics)
+    by_size = split_topics(topics, group_size=2)
+
+    # Then
+    assert [g.key_concepts for g in by_field] == [
+        ["Recall", "Precision", "F1"], []]
+    assert by_field[1].case_studies_examples == ["Search"]
+    assert [(g.key_concepts, g.case_studies_examples) for g in by_size] == [
+        (["Recall", "Precision"], []), (["F1"], ["Search"])]
+    assert all(g.lecture_topic == "Evals" for g in by_size)
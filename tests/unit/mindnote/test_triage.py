@@ -0,0 +1,73 @@
+from minddb.mindnote.notes import QuizQuestion
+from minddb.mindnote.triage import check, passes
+
+SUMMARY = "Gradient descent minimizes the training loss of neural networks."
+
+
+def question(options=None, explanation=None):
+    return QuizQuestion(
+        number=1,
+        question_text='What does gradient descent do?',
+        options=[{'letter': letter, 'text': text} for letter, text in zip(
+            'abcd', options or ['Minimizes the loss', 'Maximizes the loss',
+                                'Shuffles the data', 'Freezes the weights'])],
+        correct_answer='a',
+        explanation=explanation or ('Gradient descent follows the negative '
+                                    'gradient to minimize the training loss.'),
+    )
+
+
+def test_well_formed_note_passes():
+    """Test a note with balanced, distinct options passes all checks."""
+    assert check(question(), SUMMARY) == []
+    assert passes(question(), SUMMARY)
+
+
+def test_duplicate_options_fail():
+    """Test options differing only in case and punctuation are duplicates."""
+    # Given
+    note = question(options=['Minimizes the loss', 'minimizes the loss.',
+                             'Shuffles the data', 'Freezes the weights'])
+
+    # When/Then
+    assert check(note, SUMMARY) == ['duplicate_options']
+
+
+def test_unbalanced_option_lengths_fail():
+    """Test one very long option fails the length check."""
+    # Given
+    note = question(options=['Minimizes the training loss by following the '
+                             'negative gradient step by step', 'Max',
+                             'Shuffles', 'Freezes'])
+
+    # When/Then
+    assert 'option_lengths' in check(note, SUMMARY)
+
+
+def test_explanation_without_summary_terms_fails():
+    """Test an explanation unrelated to the summary fails."""
+    # Given
+    note = question(explanation='This is right because it is right.')
+
+    # When/Then
+    assert check(note, SUMMARY) == ['summary_terms']
+
+
+def test_empty_option_fails():
+    """Test an empty option does not count as one of four options."""
+    # Given
+    note = question(options=['Minimizes the loss', ' ', 'Shuffles the data',
+                             'Freezes the weights'])
+
+    # When/Then
+    assert 'four_options' in check(note, SUMMARY)
+
+
+def test_options_out_of_order_fail():
+    """Test options have to be lettered a to d in order."""
+    # Given
+    note = question()
+    note.options[0].letter, note.options[1].letter = 'b', 'a'
+
+    # When/Then
+    assert 'four_options' in check(note, SUMMARY)
@@ -0,0 +1,151 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+import minddb.storage
+from minddb.mindnote import dedupe, manifest, watch
+from minddb.mindnote.watch import Watcher
+
+
+async def collect(watcher, count, action=None):
+    """Collect the first changes of a watcher, running action after the
+    initial scan."""
+    changes = []
+    iterator = watcher.changes()
+    async for change in iterator:
+        changes.append(change)
+        if len(changes) == 1 and action is not None:
+            asyncio.get_running_loop().call_later(0.05, action)
+        if len(changes) == count:
+            break
+    await iterator.aclose()
+    return changes
+
+
+@pytest.mark.parametrize('polling', [True, None])
+def test_watcher_reports_existing_then_new_files(tmp_path, polling):
+    """Test existing files are reported first, then files written later."""
+    # Given
+    (tmp_path / 'old.md').write_text('Old')
+    (tmp_path / 'notes.pdf').write_text('Ignored')
+    watcher = Watcher([tmp_path], debounce=0.05, poll_interval=0.01,
+                      polling=polling)
+
+    # When
+    changes = asyncio.run(asyncio.wait_for(collect(
+        watcher, 2, lambda: (tmp_path / 'new.txt').write_text('New')), 5))
+
+    # Then
+    assert changes == [(str(tmp_path), {'old.md'}),
+                       (str(tmp_path), {'new.txt'})]
+
+
+def test_watcher_debounces_writes(tmp_path):
+    """Test a file written several times is reported once it settles."""
+    # Given
+    (tmp_path / 'old.md').write_text('Old')
+    path = tmp_path / 'lecture.md'
+    watcher = Watcher([tmp_path], debounce=0.2, poll_interval=0.01,
+                      polling=True)
+
+    def write():
+        loop = asyncio.get_running_loop()
+        for i in range(5):
+            loop.call_later(i * 0.05, path.write_text, 'x' * (i + 1))
+
+    # When
+    changes = asyncio.run(asyncio.wait_for(collect(watcher, 2, write), 5))
+
+    # Then
+    assert changes[1] == (str(tmp_path), {'lecture.md'})
+    assert path.read_text() == 'xxxxx'
+
+
+def test_watcher_rescans_after_inotify_overflow(tmp_path):
+    """Test files whose events the kernel dropped are found by a scan."""
+    # Given
+    (tmp_path / 'old.md').write_text('Old')
+    watcher = Watcher([tmp_path], polling=True)
+    watcher._snapshots[str(tmp_path)] = watcher._scan(tmp_path)
+    (tmp_path / 'new.md').write_text('New')
+
+    # When
+    watcher._handle(watch._EVENT.pack(-1, watch._IN_Q_OVERFLOW, 0, 0))
+
+    # Then
+    assert watcher._events.get_nowait() == (str(tmp_path), 'new.md')
+    assert watcher._events.empty()
+
+
+def test_watch_processes_changed_files(tmp_path):
+    """Test only the reported files of a library are processed."""
+    # Given
+    library = tmp_path / 'lectures'
+    library.mkdir()
+    (library / 'old.md').write_text('Old')
+    entry = manifest.DeckEntry(library=str(library), deck='Deck',
+                               catalog='Catalog', catalog_path=str(tmp_path))
+    processed = []
+
+    class Processor:
+        def __init__(self, library_path, filenames=None):
+            self.filenames = filenames
+
+        async def create(self, deck_name, **options):
+            processed.append((deck_name, self.filenames))
+
+    async def run():
+        task = asyncio.create_task(watch.watch(
+            [entry], debounce=0.05, poll_interval=0.01, polling=True))
+        await asyncio.sleep(0.1)
+        (library / 'new.md').write_text('New')
+        while len(processed) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    # When
+    with patch('minddb.mindnote.watch.Processor', Processor):
+        asyncio.run(asyncio.wait_for(run(), 5))
+
+    # Then
+    assert processed == [('Deck', {'old.md'}), ('Deck', {'new.md'})]
+
+
+def test_watch_drops_dedupe_index_after_each_run(tmp_path):
+    """Test the next run of a deck indexes its stored notes again."""
+    # Given
+    entry = manifest.DeckEntry(library=str(tmp_path), deck='Deck',
+                               catalog='Catalog', catalog_path=str(tmp_path))
+    (tmp_path / 'lecture.md').write_text('Lecture')
+    indexes = []
+
+    class Processor:
+        def __init__(self, library_path, filenames=None):
+            pass
+
+        async def create(self, deck_name, **options):
+            catalog = minddb.storage.get_catalog()
+            deck = catalog.get_or_create_deck(deck_name)
+            indexes.append(dedupe.get_index(deck.id))
+
+    async def run():
+        task = asyncio.create_task(watch.watch(
+            [entry], debounce=0.05, poll_interval=0.01, polling=True))
+        await asyncio.sleep(0.1)
+        (tmp_path / 'lecture.md').write_text('Lecture, revised')
+        while len(indexes) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    # When
+    with patch('minddb.mindnote.watch.Processor', Processor):
+        asyncio.run(asyncio.wait_for(run(), 5))
+    dedupe.reset()
+
+    # Then
+    assert indexes[0] is not indexes[1]
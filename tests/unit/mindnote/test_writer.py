@@ -0,0 +1,111 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from minddb.mindnote.checkpoint import Checkpoint
+from minddb.mindnote.review import RevisedQuizQuestion
+from minddb.mindnote.writer import NoteWriter, format_note
+from minddb.storage import DB
+
+
+def revised(text):
+    return RevisedQuizQuestion(
+        review_result='satisfactory',
+        justification_for_changes='None',
+        revised_quiz_question={
+            'question_text': text,
+            'options': [{'letter': letter, 'text': letter}
+                        for letter in 'abcd'],
+            'correct_answer': 'a',
+            'explanation': 'A **key** term',
+        },
+    )
+
+
+@pytest.fixture
+def catalog():
+    db = DB(':memory:')
+    db.create_tables()
+    with patch('minddb.storage.get_catalog', return_value=db):
+        yield db
+    db.close()
+
+
+def test_format_note_converts_bold():
+    """Test Markdown bold in the explanation becomes HTML bold."""
+    # When
+    note = format_note(revised('Q1'))
+
+    # Then
+    assert note['question'] == 'Q1'
+    assert note['explanation'] == 'A <b>key</b> term'
+
+
+def test_writer_stores_notes_in_batches(catalog):
+    """Test queued notes are stored in transactions of up to batch_size."""
+    # Given
+    deck_id = catalog.get_or_create_deck('Deck').id
+    insert_notes = Mock(wraps=catalog.insert_notes)
+
+    async def run():
+        with patch.object(catalog, 'insert_notes', insert_notes):
+            async with NoteWriter(deck_id, batch_size=2) as writer:
+                for i in range(5):
+                    await writer.put(i, revised(f'Q{i}'))
+            return writer.written
+
+    # When
+    written = asyncio.run(run())
+
+    # Then
+    assert written == 5
+    assert len(catalog.get_notes_by_deck_id(deck_id)) == 5
+    assert all(len(c.args[1]) <= 2 for c in insert_notes.call_args_list)
+    assert insert_notes.call_count < 5
+
+
+def test_writer_saves_review_checkpoints_with_notes(catalog):
+    """Test the reviews of stored notes are checkpointed with them."""
+    # Given
+    deck_id = catalog.get_or_create_deck('Deck').id
+    checkpoint = Checkpoint.start(deck_id, 'Transcript')
+
+    async def run():
+        async with NoteWriter(deck_id, checkpoint=checkpoint) as writer:
+            await writer.put(3, revised('Q3'))
+
+    # When
+    asyncio.run(run())
+
+    # Then
+    reviews = checkpoint.load_items('review', RevisedQuizQuestion)
+    assert reviews[3].revised_quiz_question.question_text == 'Q3'
+
+
+def test_writer_blocks_put_when_queue_is_full(catalog):
+    """Test producers wait while the queue is full."""
+    # Given
+    writer = NoteWriter(1, queue_size=1)
+
+    async def run():
+        await writer.put(0, revised('Q0'))
+        await asyncio.wait_for(writer.put(1, revised('Q1')), timeout=0.01)
+
+    # When/Then
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+
+
+def test_writer_raises_storage_errors(catalog):
+    """Test a storage failure is raised when the writer closes."""
+    # Given
+    async def run():
+        with patch.object(catalog, 'insert_notes',
+                          side_effect=RuntimeError('disk full')):
+            async with NoteWriter(1) as writer:
+                await writer.put(0, revised('Q0'))
+
+    # When/Then
+    with pytest.raises(RuntimeError, match='disk full'):
+        asyncio.run(run())
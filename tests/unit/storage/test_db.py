@@ -287,6 +287,9 @@ class TestDB:
         client_import_id = db.create_client_import("test_client")
         db.link_note_to_client_import(note_id, client_import_id)
 
+        # Store the signature of the note
+        db.insert_note_signatures({note_id: b'signature'})
+
         # Delete the deck
         result = db.delete_deck_and_notes(deck_id)
         assert result is True
@@ -312,3 +315,11 @@ class TestDB:
                 (note_id,)
             )
             assert cursor.fetchone() is None
+
+        # Verify the note signature is deleted
+        with closing(db.connect().cursor()) as cursor:
+            cursor.execute(
+                "SELECT 1 FROM note_signatures WHERE note_id = ?",
+                (note_id,)
+            )
+            assert cursor.fetchone() is None
@@ -0,0 +1,144 @@
+import pytest
+from contextlib import closing
+
+from minddb.storage import DB
+
+
+@pytest.fixture
+def db():
+    db = DB(':memory:')
+    db.create_tables()
+    yield db
+    db.close()
+
+
+def insert(db, key, response='{}', accessed_at=None):
+    db.insert_cached_response(key, 'model', 'LectureTopics', response)
+    if accessed_at:
+        with closing(db.connect().cursor()) as cursor:
+            cursor.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                (accessed_at, key))
+
+
+def test_get_cached_response_counts_hits(db):
+    """Test a cached response is returned and its hit count increased."""
+    # Given
+    insert(db, 'abc', '{"lecture_topic": "Evals"}')
+
+    # When
+    db.get_cached_response('abc')
+    cached = db.get_cached_response('abc')
+
+    # Then
+    assert cached.response == '{"lecture_topic": "Evals"}'
+    assert cached.size == len('{"lecture_topic": "Evals"}')
+    assert cached.hits == 2
+
+
+def test_get_cached_response_miss(db):
+    """Test a missing key returns None."""
+    assert db.get_cached_response('missing') is None
+
+
+def test_insert_replaces_existing_entry(db):
+    """Test inserting an existing key replaces the response."""
+    # Given
+    insert(db, 'abc', '{"a": 1}')
+
+    # When
+    insert(db, 'abc', '{"a": 2}')
+
+    # Then
+    assert db.get_cached_response('abc').response == '{"a": 2}'
+
+
+def test_prune_cache_evicts_least_recently_used(db):
+    """Test pruning to max_entries keeps the most recently used entries."""
+    # Given
+    insert(db, 'old', accessed_at='2020-01-01 00:00:00')
+    insert(db, 'mid', accessed_at='2021-01-01 00:00:00')
+    insert(db, 'new', accessed_at='2022-01-01 00:00:00')
+
+    # When
+    removed = db.prune_cache(max_entries=2)
+
+    # Then
+    assert removed == 1
+    assert db.get_cached_response('old') is None
+    assert db.get_cached_response('new') is not None
+
+
+def test_prune_cache_by_size(db):
+    """Test pruning to max_size removes least recently used entries."""
+    # Given
+    insert(db, 'old', 'x' * 10, accessed_at='2020-01-01 00:00:00')
+    insert(db, 'new', 'y' * 10, accessed_at='2022-01-01 00:00:00')
+
+    # When
+    db.prune_cache(max_size=15)
+
+    # Then
+    assert db.get_cached_response('old') is None
+    assert db.get_cached_response('new') is not None
+
+
+def test_prune_cache_older_than(db):
+    """Test pruning removes entries not used for a number of days."""
+    # Given
+    insert(db, 'old', accessed_at='2020-01-01 00:00:00')
+    insert(db, 'new')
+
+    # When
+    db.prune_cache(older_than_days=30)
+
+    # Then
+    assert db.get_cached_response('old') is None
+    assert db.get_cached_response('new') is not None
+
+
+def test_prune_cache_without_limits_clears(db):
+    """Test pruning without limits removes all entries."""
+    # Given
+    insert(db, 'a')
+    insert(db, 'b')
+
+    # When
+    removed = db.prune_cache()
+
+    # Then
+    assert removed == 2
+    assert db.get_cache_stats() == []
+
+
+def test_get_cache_stats(db):
+    """Test cache statistics are grouped by response model."""
+    # Given
+    insert(db, 'a', 'xx')
+    insert(db, 'b', 'yyy')
+    db.get_cached_response('a')
+
+    # When
+    stats = db.get_cache_stats()
+
+    # Then
+    assert len(stats) == 1
+    assert stats[0]['response_model'] == 'LectureTopics'
+    assert stats[0]['entries'] == 2
+    assert stats[0]['size'] == 5
+    assert stats[0]['hits'] == 1
+
+
+def test_transcript_topics_are_cached_per_model(db):
+    """Test cached topics are only returned for the model that made them."""
+    # Given
+    db.insert_transcript_topics({'a': '{"lecture_topic": "A"}',
+                                 'b': '{"lecture_topic": "B"}'}, 'model')
+
+    # When
+    cached = db.get_transcript_topics({'a', 'c'}, 'model')
+    other = db.get_transcript_topics({'a', 'b'}, 'other-model')
+
+    # Then
+    assert cached == {'a': '{"lecture_topic": "A"}'}
+    assert other == {}
@@ -0,0 +1,88 @@
+import pytest
+
+from minddb.storage import DB
+
+
+@pytest.fixture
+def db():
+    db = DB(':memory:')
+    db.create_tables()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def deck_id(db):
+    return db.get_or_create_deck('Deck').id
+
+
+def test_get_unfinished_run_returns_latest(db, deck_id):
+    """Test the latest running run for an input is returned."""
+    # Given
+    db.insert_run(deck_id, 'abc')
+    latest = db.insert_run(deck_id, 'abc')
+    db.insert_run(deck_id, 'other')
+
+    # When
+    run = db.get_unfinished_run(deck_id, 'abc')
+
+    # Then
+    assert run.id == latest
+    assert run.status == 'running'
+
+
+def test_complete_run_drops_checkpoints(db, deck_id):
+    """Test a completed run is no longer resumable and keeps no outputs."""
+    # Given
+    run_id = db.insert_run(deck_id, 'abc')
+    db.save_checkpoint(run_id, 'summary', 'Topics')
+
+    # When
+    db.complete_run(run_id)
+
+    # Then
+    assert db.get_unfinished_run(deck_id, 'abc') is None
+    assert db.get_checkpoints(run_id, 'summary') == {}
+
+
+def test_save_checkpoint_replaces_item(db, deck_id):
+    """Test saving an item twice keeps the latest output."""
+    # Given
+    run_id = db.insert_run(deck_id, 'abc')
+
+    # When
+    db.save_checkpoint(run_id, 'review', 'old', item=1)
+    db.save_checkpoint(run_id, 'review', 'new', item=1)
+    db.save_checkpoint(run_id, 'review', 'first', item=0)
+
+    # Then
+    assert db.get_checkpoints(run_id, 'review') == {0: 'first', 1: 'new'}
+
+
+def test_delete_checkpoints_of_one_stage(db, deck_id):
+    """Test deleting a stage leaves the other stages alone."""
+    # Given
+    run_id = db.insert_run(deck_id, 'abc')
+    db.save_checkpoint(run_id, 'summary', 'Topics')
+    db.save_checkpoint(run_id, 'review', 'Review')
+
+    # When
+    db.delete_checkpoints(run_id, 'review')
+
+    # Then
+    assert db.get_checkpoints(run_id, 'summary') == {0: 'Topics'}
+    assert db.get_checkpoints(run_id, 'review') == {}
+
+
+def test_delete_deck_removes_runs(db, deck_id):
+    """Test deleting a deck also deletes its runs."""
+    # Given
+    run_id = db.insert_run(deck_id, 'abc')
+    db.save_checkpoint(run_id, 'summary', 'Topics')
+
+    # When
+    db.delete_deck_and_notes(deck_id)
+
+    # Then
+    assert db.get_unfinished_run(deck_id, 'abc') is None
+    assert db.get_checkpoints(run_id, 'summary') == {}